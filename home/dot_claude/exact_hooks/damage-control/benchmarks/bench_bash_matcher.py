@@ -0,0 +1,181 @@
+# /// script
+# requires-python = ">=3.8"
+# dependencies = ["pyyaml"]
+# ///
+"""
+bashToolPatterns matching: per-call loop vs. compiled BashMatcher.
+
+Replays the Bash commands used in tests/ through three engines and reports
+per-command latency. All three must agree on the matched rule for every
+command; the script exits non-zero if they do not.
+
+  loop      handle_bash step 4 before BashMatcher: expand shorthands,
+            prepend the position prefix and re.search() every pattern on
+            every call (re's own compile cache is far smaller than the
+            pattern set, so most calls recompile)
+  combined  one alternation of all rules with a named group each, used to
+            find *a* matching rule, then a scan of the lower-numbered rules
+            to recover file order
+  scan      every rule compiled once, all of them scanned in file order
+  matcher   BashMatcher: an Aho-Corasick pass over the command selects the
+            rules whose required literals occur in it; anchored ones are
+            matched only at the segment starts dispatched to them by their
+            leading command word, the rest searched, in file order
+
+A second table times everyday commands against the real rules plus N
+synthetic "packs" of 100 rules each, to show the prefilter keeps their cost
+flat as packs are added; a third a long heredoc, where matching anchored
+rules at segment starts beats searching every offset.
+
+Usage (from the damage-control directory):
+
+    uv run benchmarks/bench_bash_matcher.py            # evenly spaced sample
+    uv run benchmarks/bench_bash_matcher.py --sample 0 # whole corpus (minutes)
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+import time
+
+from corpus import dc, harvest
+from timing import print_table, time_each
+
+
+def loop_engine(config: dict) -> object:
+    patterns = config["bashToolPatterns"]
+    shorthands = config["shorthands"]
+
+    def first(command: str) -> int | None:
+        for index, item in enumerate(patterns):
+            pattern = dc._expand_shorthands(item.get("pattern", ""), shorthands)
+            if not item.get("match_anywhere", False):
+                pattern = dc._CMD_POSITION_PREFIX + pattern
+            try:
+                if re.search(pattern, command, re.IGNORECASE):
+                    return index
+            except re.error:
+                continue
+        return None
+
+    return first
+
+
+def combined_engine(matcher: dc.BashMatcher) -> object:
+    rules = matcher.rules
+    combined = re.compile(
+        "|".join(f"(?P<r{n}>{rule.regex.pattern})" for n, rule in enumerate(rules)),
+        re.IGNORECASE,
+    )
+
+    def first(command: str) -> int | None:
+        m = combined.search(command)
+        if m is None:
+            return None
+        bound = int(m.lastgroup[1:])
+        for rule in rules[:bound]:
+            if rule.regex.search(command):
+                return rule.index
+        return rules[bound].index
+
+    return first
+
+
+def scan_engine(matcher: dc.BashMatcher) -> object:
+    rules = [(rule.index, rule.regex) for rule in matcher.rules]
+
+    def first(command: str) -> int | None:
+        for index, regex in rules:
+            if regex.search(command):
+                return index
+        return None
+
+    return first
+
+
+def synthetic_pack(n: int) -> list[dict]:
+    """100 rules shaped like a cloud/database pack, with their own keywords."""
+    return [
+        {"pattern": rf"\btool{n}x{i}\s+(?:delete|drop|destroy)\b", "reason": "pack"}
+        for i in range(100)
+    ]
+
+
+def matcher_engine(matcher: dc.BashMatcher) -> object:
+    def first(command: str) -> int | None:
+        rule = matcher.first(command)
+        return None if rule is None else rule.index
+
+    return first
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sample",
+        type=int,
+        default=300,
+        help="commands to replay, evenly spaced over the corpus (0 = all)",
+    )
+    args = parser.parse_args()
+
+    commands = harvest()["command"]
+    if args.sample and args.sample < len(commands):
+        step = len(commands) / args.sample
+        commands = [commands[int(i * step)] for i in range(args.sample)]
+    config = dc.load_config()
+
+    start = time.perf_counter()
+    matcher = dc.BashMatcher(config["bashToolPatterns"], config["shorthands"])
+    build = time.perf_counter() - start
+
+    engines = {
+        "loop": loop_engine(config),
+        "combined": combined_engine(matcher),
+        "scan": scan_engine(matcher),
+        "matcher": matcher_engine(matcher),
+    }
+    expected = [engines["loop"](c) for c in commands]
+    for name, engine in engines.items():
+        got = [engine(c) for c in commands]
+        if got != expected:
+            bad = next(c for c, a, b in zip(commands, expected, got) if a != b)
+            sys.exit(f"{name} disagrees with loop on {bad!r}")
+
+    re.purge()
+    rows = [(name, time_each(engine, commands)) for name, engine in engines.items()]
+    print(
+        f"{len(commands)} commands x {len(matcher.rules)} rules; "
+        f"BashMatcher build {build * 1e3:.1f} ms (once per config)"
+    )
+    print_table("Per-command latency", rows)
+
+    everyday = ["ls -la", "pytest -q", "git status", "npm run build"] * 50
+    rows = []
+    for packs in (0, 10, 50):
+        patterns = list(config["bashToolPatterns"])
+        for n in range(packs):
+            patterns += synthetic_pack(n)
+        grown = dc.BashMatcher(patterns, config["shorthands"])
+        rows.append((f"scan, +{packs} packs", time_each(scan_engine(grown), everyday)))
+        rows.append(
+            (f"matcher, +{packs} packs", time_each(matcher_engine(grown), everyday))
+        )
+    print_table("Everyday commands as packs are added", rows)
+
+    # A heredoc naming many tools: every line is a segment start, and the
+    # prefixed search has to try each offset of the 20 kB body.
+    heredoc = "cat > notes.md <<'EOF'\n" + (
+        "run kubectl get pods and git log, then terraform plan\n" * 400
+    )
+    rows = [
+        ("scan", time_each(scan_engine(matcher), [heredoc] * 20)),
+        ("matcher", time_each(matcher_engine(matcher), [heredoc] * 20)),
+    ]
+    print_table("Long multi-line command", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# /// script
+# requires-python = ">=3.8"
+# dependencies = ["pyyaml"]
+# ///
+"""
+handle_bash path checks (steps 1-3): every entry vs. mentioned entries only.
+
+Replays the Bash commands used in tests/ through the zero-access, read-only
+and no-delete checks and reports per-command latency. All engines must
+report the same first reason for every command; the script exits non-zero
+if they do not.
+
+  loop      handle_bash before PathMentions: every entry of all three
+            lists through zero_access_mention() / check_path_patterns()
+  mentions  one KeywordAutomaton pass picks the entries the command
+            mentions; only those run the same checks
+  gated     as mentions, and OperationGate drops the operation templates
+            the command cannot contain (steps 2-3 skipped with none left)
+
+A second table replays a read-heavy corpus: the commands an agent runs
+most, many of them naming protected paths without modifying them.
+
+Usage (from the damage-control directory):
+
+    uv run benchmarks/bench_bash_paths.py            # evenly spaced sample
+    uv run benchmarks/bench_bash_paths.py --sample 0 # whole corpus
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+
+from corpus import dc, harvest
+from timing import print_table, time_each
+
+READ_HEAVY = [
+    "git status",
+    "git diff -- package-lock.json",
+    "git log --oneline -- README.md",
+    "rg TODO src/ dist/",
+    "grep -rn import build/",
+    "pytest -q tests/",
+    "npm test",
+    "cat /etc/hosts",
+    "less ~/.bashrc",
+    "head -50 Cargo.lock",
+    "wc -l yarn.lock go.sum",
+    "ls -la node_modules/ .venv/",
+    "find . -name '*.pyc' -newer setup.py",
+    "jq .scripts package.json",
+    "stat /usr/bin/env",
+    "cargo test --workspace",
+]
+
+
+def _check(config: dict, command: str, indexes: dict, gate: object) -> str | None:
+    for index in indexes["zeroAccessPaths"]:
+        path, _ = dc._path_and_block(config["zeroAccessPaths"][index])
+        reason = dc.zero_access_mention(command, path)
+        if reason is not None:
+            return reason
+    read_only = gate(command)
+    no_delete = [op for op in read_only if op in dc.NO_DELETE_BLOCKED]
+    for key, templates, label in (
+        ("readOnlyPaths", read_only, "read-only path"),
+        ("noDeletePaths", no_delete, "no-delete path"),
+    ):
+        for index in indexes[key] if templates else ():
+            path, _ = dc._path_and_block(config[key][index])
+            matched, reason = dc.check_path_patterns(command, path, templates, label)
+            if matched:
+                return reason
+    return None
+
+
+def _every_template(command: str) -> list:
+    return dc.READ_ONLY_BLOCKED
+
+
+def loop_engine(config: dict) -> object:
+    every = {key: range(len(config[key])) for key in dc._BASH_PATH_KEYS}
+    return lambda command: _check(config, command, every, _every_template)
+
+
+def mentions_engine(config: dict) -> object:
+    mentions = dc.PathMentions(config)
+    return lambda command: _check(
+        config, command, mentions.find(command), _every_template
+    )
+
+
+def gated_engine(config: dict) -> object:
+    mentions = dc.PathMentions(config)
+    gate = dc.OperationGate(dc.READ_ONLY_BLOCKED).present
+    return lambda command: _check(config, command, mentions.find(command), gate)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sample",
+        type=int,
+        default=300,
+        help="commands to replay, evenly spaced over the corpus (0 = all)",
+    )
+    args = parser.parse_args()
+
+    commands = harvest()["command"]
+    if args.sample and args.sample < len(commands):
+        step = len(commands) / args.sample
+        commands = [commands[int(i * step)] for i in range(args.sample)]
+    config = dc.load_config()
+
+    engines = {
+        "loop": loop_engine(config),
+        "mentions": mentions_engine(config),
+        "gated": gated_engine(config),
+    }
+    read_heavy = READ_HEAVY * 20
+    for corpus in (commands, READ_HEAVY):
+        expected = [engines["loop"](c) for c in corpus]
+        for name, engine in engines.items():
+            got = [engine(c) for c in corpus]
+            if got != expected:
+                bad = next(c for c, a, b in zip(corpus, expected, got) if a != b)
+                sys.exit(f"{name} disagrees with loop on {bad!r}")
+
+    print(f"{len(commands)} test-corpus commands, {len(read_heavy)} read-heavy")
+    rows = [(name, time_each(engine, commands)) for name, engine in engines.items()]
+    print_table("Per-command latency, steps 1-3, test corpus", rows)
+    rows = [(name, time_each(engine, read_heavy)) for name, engine in engines.items()]
+    print_table("Per-command latency, steps 1-3, read-heavy", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# /// script
+# requires-python = ">=3.8"
+# dependencies = ["pyyaml"]
+# ///
+"""
+Cache format: JSON-decoded bash rules vs. the mapped binary RuleTable.
+
+Grows the bundled bashToolPatterns with synthetic packs (see
+bench_bash_matcher.py) to 500, 5,000 and 50,000 rules, writes the bash rules
+in both layouts and times a warm Bash hook in a fresh process for each:
+open the cache, build the matcher and match a few everyday commands. RSS
+is how far the load raises the process's peak resident size; a load that
+stays under the peak of interpreter startup and imports shows as 0.
+
+  json   the bash section as JSON: json.loads() of every rule record,
+         then a BashRule per record and the keyword automaton rebuilt
+  table  the "rules" section mapped from the cache file: only the header,
+         the automaton states the commands walk through and the rules they
+         select are decoded
+
+Both engines must agree on every command; the script exits non-zero if they
+do not.
+
+Usage (from the damage-control directory):
+
+    uv run benchmarks/bench_cache_format.py
+"""
+
+from __future__ import annotations
+
+import json
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from bench_bash_matcher import synthetic_pack
+from corpus import dc
+
+SIZES = (500, 5_000, 50_000)
+RUNS = 5
+COMMANDS = ["ls -la", "git status", "git push --force origin main", "rm -rf /"]
+
+
+def write_caches(config: dict, size: int, directory: Path) -> dict[str, Path]:
+    """Both cache layouts for the bundled rules grown to *size* rules."""
+    patterns = list(config["bashToolPatterns"])
+    pack = 0
+    while len(patterns) < size:
+        patterns += synthetic_pack(pack)
+        pack += 1
+    grown = {**config, "bashToolPatterns": patterns[:size]}
+    grown[dc._IR_KEY] = dc.compile_config(grown)
+
+    json_file = directory / f"json-{size}.json"
+    section = {k: grown[k] for k in ("bashToolPatterns", "shorthands")}
+    section[dc._IR_KEY] = {
+        "version": dc.IR_VERSION,
+        "bash": grown[dc._IR_KEY]["bash"],
+    }
+    json_file.write_text(json.dumps(section))
+
+    table_file = directory / f"table-{size}.json"
+    header = {"version": dc.IR_VERSION, "key": "", "manifest": {}}
+    table_file.write_bytes(dc._encode_cache(header, grown))
+    return {"json": json_file, "table": table_file}
+
+
+def _peak_rss() -> int:
+    """Peak RSS in bytes (ru_maxrss is kB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def child(kind: str, path: str) -> None:
+    """Load one cache like a warm Bash hook; print seconds, RSS and matches."""
+    before = _peak_rss()
+    start = time.perf_counter()
+    if kind == "json":
+        config = json.loads(Path(path).read_bytes())
+    else:
+        config = dc._decode_sections(
+            *dc._read_cache_header(Path(path)), [dc._RULES_SECTION]
+        )
+    matcher = dc.bash_matcher(config)
+    found = []
+    for command in COMMANDS:
+        rule = matcher.first(command)
+        found.append(None if rule is None else rule.index)
+    elapsed = time.perf_counter() - start
+    print(json.dumps([elapsed, _peak_rss() - before, found]))
+
+
+def run(*args: str) -> str:
+    return subprocess.run(  # noqa: S603
+        [sys.executable, __file__, *args], capture_output=True, text=True, check=True
+    ).stdout
+
+
+def main() -> None:
+    print(f"Warm Bash hook load, median of {RUNS} fresh processes")
+    print(
+        f"  {'rules':>8}{'json ms':>10}{'table ms':>10}{'json MB':>10}{'table MB':>10}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in SIZES:
+            # Peak RSS carries over fork: the caches are built in a process
+            # of their own so this one stays small.
+            files = json.loads(run("--write", str(size), tmp))
+            times: dict[str, list[float]] = {}
+            rss: dict[str, list[int]] = {}
+            found: dict[str, list] = {}
+            for kind, path in files.items():
+                for _ in range(RUNS):
+                    elapsed, peak, matches = json.loads(run("--child", kind, path))
+                    times.setdefault(kind, []).append(elapsed)
+                    rss.setdefault(kind, []).append(peak)
+                    found[kind] = matches
+            if found["json"] != found["table"]:
+                sys.exit(
+                    f"{size} rules: table found {found['table']}, json {found['json']}"
+                )
+            cells = [
+                statistics.median(times["json"]) * 1e3,
+                statistics.median(times["table"]) * 1e3,
+                statistics.median(rss["json"]) / 2**20,
+                statistics.median(rss["table"]) / 2**20,
+            ]
+            print(f"  {size:>8}" + "".join(f"{cell:>10.1f}" for cell in cells))
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        child(*sys.argv[2:4])
+    elif sys.argv[1:2] == ["--write"]:
+        files = write_caches(dc.load_config(), int(sys.argv[2]), Path(sys.argv[3]))
+        print(json.dumps({kind: str(path) for kind, path in files.items()}))
+    else:
+        main()
@@ -0,0 +1,212 @@
+# /// script
+# requires-python = ">=3.8"
+# dependencies = ["pyyaml"]
+# ///
+"""
+Hook latency per handler, in-process and end to end, cold and warm.
+
+Replays the commands and paths used in tests/ (see corpus.py) through each
+handler. Every run gets a temp dir of its own for the pattern cache and
+decision memo, so cold means no cache files at all and no warm call is
+answered from the memo.
+
+  in-process cold  load_config() rebuilding the cache, then the handler
+  in-process warm  the handler on a loaded config, as the daemon runs it
+  process cold     `python launcher.py` with no cache, as after a reboot
+  process warm     `python launcher.py` on a current cache
+
+`--check` compares the tracked percentiles (TRACKED) with baseline.json and
+exits non-zero when one is more than `--tolerance` times its baseline. On a
+machine slower than the one that recorded them (at a fixed workload and at
+starting Python) the baselines are scaled up to match, so a slow CI runner
+is not a regression. `--update` records new baselines.
+
+Usage (from the damage-control directory):
+
+    uv run benchmarks/bench_hook.py [--check [--tolerance 2] | --update]
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stderr, redirect_stdout, suppress
+from pathlib import Path
+
+from corpus import HERE, ROOT, dc, harvest, path_inputs
+from timing import print_table, summarize, time_each
+
+BASELINE = HERE / "baseline.json"
+LAUNCHER = str(ROOT / "launcher.py")
+HANDLERS = {
+    "handle_bash": ("Bash", "command"),
+    "handle_edit": ("Edit", "file_path"),
+    "handle_write": ("Write", "file_path"),
+    "handle_read": ("Read", "file_path"),
+    "handle_grep": ("Grep", "path"),
+}
+COLD_RUNS = 8
+PROCESS_RUNS = 30
+# Percentiles --check holds to the baseline. A cold row has COLD_RUNS
+# samples, too few for its p95 to be more than its slowest run.
+TRACKED = {"cold": ("p50",), "warm": ("p50", "p95")}
+TOLERANCE = 2.0
+
+
+def spread(values: list[str], count: int) -> list[str]:
+    """*count* values taken evenly across *values*."""
+    step = max(1, len(values) // count)
+    return values[::step][:count]
+
+
+def clear(directory: Path) -> None:
+    for path in directory.iterdir():
+        path.unlink()
+
+
+def call(handler: object, config: dict, field: str, value: str) -> None:
+    out = io.StringIO()
+    with redirect_stdout(out), redirect_stderr(out), suppress(SystemExit):
+        handler({field: value}, config)
+
+
+def in_process(inputs: dict[str, list[str]], cache: Path) -> dict[str, list]:
+    samples = {}
+    for name, (tool, field) in HANDLERS.items():
+        handler = getattr(dc, name)
+        sections = dc._TOOL_SECTIONS[tool]
+        cold = []
+        for value in spread(inputs[field], COLD_RUNS):
+            clear(cache)
+            dc._reset_compiled()
+            start = time.perf_counter()
+            call(handler, dc.load_config(sections), field, value)
+            cold.append(time.perf_counter() - start)
+        samples[f"in-process cold {name}"] = cold
+        warm = functools.partial(call, handler, dc.load_config(sections), field)
+        samples[f"in-process warm {name}"] = time_each(warm, inputs[field])
+    return samples
+
+
+def run_hook(payload: dict, env: dict) -> float:
+    start = time.perf_counter()
+    subprocess.run(  # noqa: S603
+        [sys.executable, LAUNCHER],
+        input=json.dumps(payload),
+        capture_output=True,
+        text=True,
+        env=env,
+        check=False,
+    )
+    return time.perf_counter() - start
+
+
+def end_to_end(inputs: dict[str, list[str]], cache: Path) -> dict[str, list]:
+    env = {k: v for k, v in os.environ.items() if k != "PYTHONDONTWRITEBYTECODE"}
+    env.pop("CLAUDE_PROJECT_DIR", None)
+    env["TMPDIR"] = str(cache)
+    samples = {}
+    for name, (tool, field) in HANDLERS.items():
+        values = spread(inputs[field], PROCESS_RUNS)
+        cold = []
+        for value in values[:COLD_RUNS]:
+            clear(cache)
+            cold.append(
+                run_hook({"tool_name": tool, "tool_input": {field: value}}, env)
+            )
+        clear(cache)
+        run_hook({"tool_name": tool, "tool_input": {field: "warm-up"}}, env)
+        samples[f"process cold {name}"] = cold
+        samples[f"process warm {name}"] = [
+            run_hook({"tool_name": tool, "tool_input": {field: value}}, env)
+            for value in values
+        ]
+    return samples
+
+
+def calibrate() -> dict[str, float]:
+    """Seconds this machine takes for a fixed workload and a bare Python.
+
+    The fastest of several runs: the slower ones measure other load.
+    """
+    data = [{"n": n, "s": str(n) * 8} for n in range(2000)]
+    work = time_each(lambda _: json.loads(json.dumps(data)), range(25))[5:]
+    bare = time_each(
+        lambda _: subprocess.run([sys.executable, "-c", "pass"], check=True), range(10)
+    )
+    return {"in-process": min(work), "process": min(bare)}
+
+
+def measure() -> tuple[dict[str, float], dict[str, dict[str, float]]]:
+    os.environ.pop("CLAUDE_PROJECT_DIR", None)
+    found = harvest()
+    inputs = {
+        "command": found["command"],
+        "file_path": path_inputs(found),
+        "path": path_inputs(found),
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        tempfile.tempdir = tmp  # where the pattern cache goes
+        try:
+            samples = in_process(inputs, Path(tmp))
+        finally:
+            tempfile.tempdir = None
+    with tempfile.TemporaryDirectory() as tmp:
+        samples.update(end_to_end(inputs, Path(tmp)))
+    for kind in ("in-process", "process"):
+        print_table(
+            f"{kind.capitalize()} latency",
+            [(label, s) for label, s in samples.items() if label.startswith(kind)],
+        )
+    return calibrate(), {label: summarize(s) for label, s in samples.items()}
+
+
+def regressions(
+    baseline: dict, calibration: dict[str, float], results: dict, tolerance: float
+) -> list[str]:
+    """One line per tracked percentile over *tolerance* times its baseline."""
+    found = []
+    for label, stats in baseline["results"].items():
+        kind, temperature, _ = label.split(" ")
+        scale = max(1.0, calibration[kind] / baseline["calibration"][kind])
+        for stat in TRACKED[temperature]:
+            limit = stats[stat] * scale * tolerance
+            if results[label][stat] > limit:
+                found.append(
+                    f"{label} {stat}: {results[label][stat] * 1e6:.0f} us, "
+                    f"limit {limit * 1e6:.0f} us"
+                )
+    return found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--check", action="store_true", help="compare with baseline")
+    mode.add_argument("--update", action="store_true", help="record new baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    calibration, results = measure()
+    if args.update:
+        baseline = {"calibration": calibration, "results": results}
+        BASELINE.write_text(json.dumps(baseline, indent=2) + "\n")
+        print(f"\nwrote {BASELINE}")
+    elif args.check:
+        found = regressions(
+            json.loads(BASELINE.read_text()), calibration, results, args.tolerance
+        )
+        if found:
+            sys.exit("Latency regressions:\n  " + "\n  ".join(found))
+        print(f"\nno tracked percentile over {args.tolerance}x its baseline")
+
+
+if __name__ == "__main__":
+    main()
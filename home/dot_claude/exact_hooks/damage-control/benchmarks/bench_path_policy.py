@@ -0,0 +1,75 @@
+# /// script
+# requires-python = ">=3.8"
+# dependencies = ["pyyaml"]
+# ///
+"""
+Path-list lookups: per-entry match_path() loop vs. compiled PathPolicy.
+
+Replays the file paths used in tests/ (plus each path under a few
+directories, so lookups see realistic depths) against zeroAccessPaths and
+readOnlyPaths. Both engines must report the same entry for every path; the
+script exits non-zero if they do not.
+
+  loop    the Edit/Write/Read/Grep handlers before PathPolicy: match_path()
+          on every entry in order, first hit wins
+  policy  PathPolicy.first(): component trie, suffix map, residual globs
+
+Usage (from the damage-control directory):
+
+    uv run benchmarks/bench_path_policy.py
+"""
+
+from __future__ import annotations
+
+import sys
+
+from corpus import dc, harvest, path_inputs
+from timing import print_table, time_each
+
+
+def loop_engine(entries: list) -> object:
+    def first(path: str) -> str | None:
+        for entry in entries:
+            pattern, _ = dc._path_and_block(entry)
+            if dc.match_path(path, pattern):
+                return pattern
+        return None
+
+    return first
+
+
+def policy_engine(entries: list) -> object:
+    policy = dc.PathPolicy(entries)
+
+    def first(path: str) -> str | None:
+        hit = policy.first(path)
+        return None if hit is None else hit.path
+
+    return first
+
+
+def main() -> None:
+    paths = path_inputs(harvest())
+    config = dc.load_config()
+
+    rows = []
+    for key in ("zeroAccessPaths", "readOnlyPaths"):
+        engines = {
+            "loop": loop_engine(config[key]),
+            "policy": policy_engine(config[key]),
+        }
+        expected = [engines["loop"](p) for p in paths]
+        got = [engines["policy"](p) for p in paths]
+        if got != expected:
+            bad = next(p for p, a, b in zip(paths, expected, got) if a != b)
+            sys.exit(f"policy disagrees with loop on {key} {bad!r}")
+        rows += [
+            (f"{name}, {key}", time_each(engine, paths))
+            for name, engine in engines.items()
+        ]
+    print(f"{len(paths)} paths")
+    print_table("Per-lookup latency", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# /// script
+# requires-python = ">=3.8"
+# dependencies = ["pyyaml"]
+# ///
+"""
+Hook payload parsing: json.load() of everything vs. read_payload().
+
+Builds Write payloads whose `content` is 1, 10 and 50 MB of Python source
+(this module repeated, so quotes, backslashes and newlines are escaped as
+often as in real code) and parses each from stdin in a fresh process.
+Peak memory is how far parsing raises the process's peak resident size.
+
+  json     main() before the scanner: json.load(sys.stdin), which decodes
+           the whole text and builds `content` as a str
+  scanner  read_payload(): chunked scan that decodes tool_name and
+           file_path and steps over `content`
+
+Both engines must report the same tool_name and file_path; the script exits
+non-zero if they do not.
+
+Usage (from the damage-control directory):
+
+    uv run benchmarks/bench_payload.py
+"""
+
+from __future__ import annotations
+
+import json
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from corpus import dc
+
+SIZES_MB = (1, 10, 50)
+RUNS = 5
+
+
+def write_payload(size_mb: int, path: Path) -> None:
+    source = Path(dc.__file__).read_text()
+    content = (source * (size_mb * 2**20 // len(source) + 1))[: size_mb * 2**20]
+    payload = {
+        "session_id": "bench",
+        "hook_event_name": "PreToolUse",
+        "tool_name": "Write",
+        "tool_input": {"file_path": "/tmp/generated.py", "content": content},  # noqa: S108
+    }
+    path.write_text(json.dumps(payload))
+
+
+def _peak_rss() -> int:
+    """Peak RSS in bytes (ru_maxrss is kB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def child(engine: str) -> None:
+    """Parse stdin with *engine*; print seconds, added peak RSS and fields."""
+    before = _peak_rss()
+    start = time.perf_counter()
+    data = json.load(sys.stdin) if engine == "json" else dc.read_payload(sys.stdin)
+    elapsed = time.perf_counter() - start
+    fields = [data["tool_name"], data["tool_input"]["file_path"]]
+    print(json.dumps([elapsed, _peak_rss() - before, fields]))
+
+
+def run(*args: str, stdin: Path | None = None) -> str:
+    with Path(stdin or "/dev/null").open("rb") as f:
+        return subprocess.run(  # noqa: S603
+            [sys.executable, __file__, *args],
+            stdin=f,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+
+
+def main() -> None:
+    print(f"Write payload parsing, median of {RUNS} fresh processes")
+    print(
+        f"  {'content':>8}{'json ms':>10}{'scan ms':>10}{'json MB':>10}{'scan MB':>10}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in SIZES_MB:
+            # Peak RSS carries over fork: payloads are built in a process of
+            # their own so this one stays small.
+            path = Path(tmp) / f"payload-{size}.json"
+            run("--write", str(size), str(path))
+            times: dict[str, list[float]] = {}
+            rss: dict[str, list[int]] = {}
+            found: dict[str, list] = {}
+            for engine in ("json", "scanner"):
+                for _ in range(RUNS):
+                    elapsed, peak, fields = json.loads(
+                        run("--child", engine, stdin=path)
+                    )
+                    times.setdefault(engine, []).append(elapsed)
+                    rss.setdefault(engine, []).append(peak)
+                    found[engine] = fields
+            if found["json"] != found["scanner"]:
+                sys.exit(f"{size} MB: scanner read {found['scanner']}")
+            cells = [
+                statistics.median(times["json"]) * 1e3,
+                statistics.median(times["scanner"]) * 1e3,
+                statistics.median(rss["json"]) / 2**20,
+                statistics.median(rss["scanner"]) / 2**20,
+            ]
+            label = f"{size} MB"
+            print(f"  {label:>8}" + "".join(f"{cell:>10.1f}" for cell in cells))
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        child(sys.argv[2])
+    elif sys.argv[1:2] == ["--write"]:
+        write_payload(int(sys.argv[2]), Path(sys.argv[3]))
+    else:
+        main()
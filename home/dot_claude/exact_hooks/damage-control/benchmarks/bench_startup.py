@@ -0,0 +1,100 @@
+# /// script
+# requires-python = ">=3.8"
+# dependencies = ["pyyaml"]
+# ///
+"""
+Hook startup: damage_control.py run as a script vs. launcher.py, and the
+cost of starting either through uv.
+
+Times whole hook processes on a warm pattern cache, with the decision memo
+on (a repeated `git status`) and off (a command not seen before, so the
+policy runs).
+
+  python   `python -c pass`: interpreter startup alone
+  script   `python damage_control.py`: __main__ is compiled every call
+  launcher `python launcher.py`: damage_control loads from __pycache__/
+  uv run   `uv run --script launcher.py`: the launcher after uv resolves
+           and checks its environment, as the hook ran before it could
+           start on plain python3
+
+The script, the launcher and uv run must give the same decisions; the
+script exits non-zero if they do not.
+
+Usage (from the damage-control directory):
+
+    uv run benchmarks/bench_startup.py
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+from corpus import ROOT
+from timing import print_table
+
+RUNS = 40
+SCRIPT = str(ROOT / "damage_control.py")
+LAUNCHER = str(ROOT / "launcher.py")
+
+
+def run(args: list[str], payload: str) -> tuple[float, tuple[int, str, str]]:
+    """Wall time of one process and its (exit code, stdout, stderr)."""
+    env = {k: v for k, v in os.environ.items() if k != "PYTHONDONTWRITEBYTECODE"}
+    start = time.perf_counter()
+    result = subprocess.run(  # noqa: S603
+        args,
+        input=payload,
+        capture_output=True,
+        text=True,
+        env=env,
+        check=False,
+    )
+    elapsed = time.perf_counter() - start
+    return elapsed, (result.returncode, result.stdout, result.stderr)
+
+
+def main() -> None:
+    repeated = json.dumps(
+        {"tool_name": "Bash", "tool_input": {"command": "git status"}}
+    )
+    engines = {
+        "python": [sys.executable, "-c", "pass"],
+        "script": [sys.executable, SCRIPT],
+        "launcher": [sys.executable, LAUNCHER],
+        "uv run": ["uv", "run", "--script", LAUNCHER],
+    }
+    for args in engines.values():
+        run(args, repeated)  # warm the pattern cache, memo and __pycache__/
+
+    for title, payloads in (
+        ("Memo hit (repeated command)", lambda n: repeated),
+        (
+            "Memo miss (new command each call)",
+            lambda n: json.dumps(
+                {"tool_name": "Bash", "tool_input": {"command": f"ls dir{n}"}}
+            ),
+        ),
+    ):
+        rows = []
+        decisions: dict[str, list] = {}
+        for name, args in engines.items():
+            samples = []
+            # Each engine gets payload numbers of its own, so a command the
+            # script just decided is still new to the launcher.
+            offset = RUNS * list(engines).index(name)
+            for n in range(RUNS):
+                elapsed, decision = run(args, payloads(n + offset))
+                samples.append(elapsed)
+                decisions.setdefault(name, []).append(decision[:2])
+            rows.append((name, samples))
+        if not decisions["script"] == decisions["launcher"] == decisions["uv run"]:
+            sys.exit(f"{title}: launcher and script decide differently")
+        print_table(f"{title}, {RUNS} processes", rows)
+
+
+if __name__ == "__main__":
+    main()
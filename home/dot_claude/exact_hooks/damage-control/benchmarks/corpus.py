@@ -0,0 +1,74 @@
+"""
+Benchmark corpus: the tool inputs already exercised by tests/.
+
+Every `{"command": ...}`, `{"file_path": ...}` and `{"path": ...}` literal in
+the test suite is collected by walking the test modules' syntax trees, so
+the corpus grows with the tests and needs no separate maintenance. f-strings
+that interpolate `HOME` (see tests/conftest.py) are resolved against the
+current user's home directory; any other dynamic value is skipped.
+"""
+
+from __future__ import annotations
+
+import ast
+import sys
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+ROOT = HERE.parent
+TESTS = ROOT / "tests"
+HOME = str(Path("~").expanduser())
+
+# Benchmark scripts run from this directory; they get the hook module via
+# `from corpus import dc` so the import always follows this path setup.
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+import damage_control as dc  # noqa: E402, F401
+
+FIELDS = ("command", "file_path", "path")
+
+
+def _literal(node: ast.expr) -> str | None:
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    if isinstance(node, ast.JoinedStr):
+        parts = []
+        for value in node.values:
+            if isinstance(value, ast.Constant):
+                parts.append(value.value)
+            elif (
+                isinstance(value, ast.FormattedValue)
+                and isinstance(value.value, ast.Name)
+                and value.value.id == "HOME"
+            ):
+                parts.append(HOME)
+            else:
+                return None
+        return "".join(parts)
+    return None
+
+
+def harvest(tests_dir: Path = TESTS) -> dict[str, list[str]]:
+    """Unique tool-input values per field, in first-seen order."""
+    found: dict[str, dict[str, None]] = {field: {} for field in FIELDS}
+    for test_file in sorted(tests_dir.rglob("test_*.py")):
+        tree = ast.parse(test_file.read_text(), str(test_file))
+        for node in ast.walk(tree):
+            if not isinstance(node, ast.Dict):
+                continue
+            for key, value in zip(node.keys, node.values):
+                if not (isinstance(key, ast.Constant) and key.value in FIELDS):
+                    continue
+                literal = _literal(value)
+                if literal:
+                    found[key.value][literal] = None
+    return {field: list(values) for field, values in found.items()}
+
+
+def path_inputs(found: dict[str, list[str]]) -> list[str]:
+    """The harvested file_path and path values, plus each one's basename
+    under a few directories so lookups see realistic depths."""
+    paths = found["file_path"] + found["path"]
+    for base in (f"{HOME}/src/project", "src/app/components", "/opt/data"):
+        paths += [f"{base}/{path.rsplit('/', 1)[-1]}" for path in paths]
+    return paths
@@ -0,0 +1,48 @@
+"""Small timing and reporting helpers shared by the benchmark scripts."""
+
+from __future__ import annotations
+
+import time
+from typing import Any, Callable, Iterable
+
+STATS = ("mean", "p50", "p95", "p99")
+
+
+def time_each(fn: Callable[[Any], Any], inputs: Iterable[Any]) -> list[float]:
+    """Seconds spent in fn(x) for each input, in input order."""
+    clock = time.perf_counter
+    samples = []
+    for x in inputs:
+        start = clock()
+        fn(x)
+        samples.append(clock() - start)
+    return samples
+
+
+def percentile(samples: list[float], q: float) -> float:
+    """Nearest-rank percentile (q in 0..100) of a non-empty sample list."""
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, round(q / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize(samples: list[float]) -> dict[str, float]:
+    """Mean and tail percentiles of a sample list, in seconds."""
+    return {
+        "mean": sum(samples) / len(samples),
+        "p50": percentile(samples, 50),
+        "p95": percentile(samples, 95),
+        "p99": percentile(samples, 99),
+    }
+
+
+def print_table(title: str, rows: list[tuple[str, list[float]]]) -> None:
+    """Print one row of mean/p50/p95/p99 (in microseconds) per labelled sample."""
+    print(f"\n{title}")
+    print(f"  {'':<28}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}   (us)")
+    for label, samples in rows:
+        stats = summarize(samples)
+        cells = "".join(
+            f"{stats[k] * 1e6:>10.1f}" for k in ("mean", "p50", "p95", "p99")
+        )
+        print(f"  {label:<28}{cells}")
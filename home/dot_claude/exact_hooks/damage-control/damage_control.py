@@ -28,26 +28,71 @@ Decision model:
 Exit codes:
   0 = Allow (or JSON stdout for "ask" decisions)
   2 = Block (stderr message fed back to Claude)
+
+Daemon mode:
+  `damage_control.py serve` keeps the merged config and compiled regexes
+  resident behind a Unix domain socket; hook.py forwards each payload to it
+  and falls back to evaluating in-process when no daemon is listening.
+
+Compiled rules:
+  `damage_control.py compile` parses the pattern files and writes the merged
+  config with its compiled rules to the cache ahead of time; otherwise the
+  first hook call after a change does it. Entries that can never decide
+  (duplicates, paths prefix-matched by an earlier, broader entry) are left
+  out of the compiled rules; lint.py lists them, with broken and shadowed
+  patterns.
+
+Batch mode:
+  `damage_control.py batch` reads hook payloads as JSON lines on stdin and
+  writes one decision per line ({"action", "reason", "rule"}) to stdout,
+  all against one loaded config: for tests and tooling that replay many
+  tool calls.
+
+Launcher:
+  settings.json runs launcher.py, which imports this module: a script run
+  directly is compiled to bytecode on every call, an imported module is
+  compiled once and loaded from __pycache__/ afterwards. It runs under plain
+  python3: PyYAML is only needed to rebuild the cache, so launcher.py
+  re-execs itself through `uv run` only when the cache is not current.
+
+Decision memo:
+  Recent decisions are remembered per policy in a private per-user dir
+  ($XDG_CACHE_HOME/damage-control, default ~/.cache/damage-control), so a
+  repeated command or path is answered without evaluating it again.
+  Editing any pattern file forgets them all.
 """
 
 from __future__ import annotations
 
-import fnmatch
+import contextlib
+import functools
+import io
 import json
 import os
 import re
 import sys
+import time
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator, NamedTuple
 
 # NOTE: yaml is imported lazily inside the config loaders — on a warm cache
-# the hook never pays the PyYAML import or parse cost.
+# the hook never pays the PyYAML import or parse cost. The same goes for
+# every other module a warm call does not need (tempfile, fnmatch, socket,
+# ...): import them where they are used. tests/test_import_time.py holds the
+# list of modules importing this one may load.
 
 # ============================================================================
 # PATTERN UTILITIES
 # ============================================================================
 
 
+# Compiled-regex memo. `re` keeps only a few hundred compiled patterns, far
+# fewer than the command patterns plus per-path templates checked on every
+# call, so plain re.search() recompiles most of them each time. A resident
+# daemon clears this when the config changes.
+_compile = functools.lru_cache(maxsize=None)(re.compile)
+
+
 def is_glob_pattern(pattern: str) -> bool:
     """Check if pattern contains glob wildcards."""
     return "*" in pattern or "?" in pattern or "[" in pattern
@@ -75,6 +120,8 @@ _GLOB_BOUNDARY = r'(?=[/\s;|&"\')\]]|$)'
 
 def match_path(file_path: str, pattern: str) -> bool:
     """Match a file path against a pattern (glob or prefix)."""
+    import fnmatch
+
     expanded_pattern = str(Path(pattern).expanduser())
     normalized = os.path.normpath(file_path)
     expanded_normalized = str(Path(normalized).expanduser())
@@ -157,9 +204,14 @@ NO_DELETE_BLOCKED = DELETE_PATTERNS
 # ============================================================================
 
 
-def get_patterns_dir() -> Path | None:
-    """Get path to patterns/ directory, checking multiple locations."""
-    project_dir = os.environ.get("CLAUDE_PROJECT_DIR")
+def get_patterns_dir(project_dir: str | None = None) -> Path | None:
+    """Get path to patterns/ directory, checking multiple locations.
+
+    *project_dir* defaults to $CLAUDE_PROJECT_DIR; the daemon passes the
+    calling hook's value explicitly.
+    """
+    if project_dir is None:
+        project_dir = os.environ.get("CLAUDE_PROJECT_DIR")
     if project_dir:
         project_patterns = (
             Path(project_dir) / ".claude" / "hooks" / "damage-control" / "patterns"
@@ -179,9 +231,10 @@ def get_patterns_dir() -> Path | None:
     return None
 
 
-def get_config_path() -> Path:
+def get_config_path(project_dir: str | None = None) -> Path:
     """Get path to patterns.yaml, checking multiple locations."""
-    project_dir = os.environ.get("CLAUDE_PROJECT_DIR")
+    if project_dir is None:
+        project_dir = os.environ.get("CLAUDE_PROJECT_DIR")
     if project_dir:
         project_config = (
             Path(project_dir) / ".claude" / "hooks" / "damage-control" / "patterns.yaml"
@@ -246,46 +299,407 @@ def _pattern_files(patterns_dir: Path) -> list[Path]:
     return files
 
 
-def _cache_paths(patterns_dir: Path, files: list[Path]) -> tuple[Path, str]:
-    """Cache file location (per-user temp dir) and invalidation key."""
+@functools.lru_cache(maxsize=None)
+def _source_hash() -> str:
+    """Hash of this file: shorthands, prefixes and templates live here."""
     import hashlib
+
+    return hashlib.sha256(Path(__file__).read_bytes()).hexdigest()
+
+
+def _environment() -> list[Any]:
+    """What the compiled rules depend on besides the pattern files.
+
+    IR_VERSION, $HOME (path entries are stored expanded) and the Python
+    version (regex parse trees); this file itself is covered separately.
+    """
+    return [IR_VERSION, str(Path.home()), list(sys.version_info[:2])]
+
+
+def _temp_dir() -> str:
+    """tempfile.gettempdir(), without importing tempfile on a warm call.
+
+    tempfile pulls in shutil and random, several milliseconds per call. Its
+    usual answer, the first of $TMPDIR, $TEMP, $TMP and /tmp that is set, is
+    taken directly when writable; any other case is left to tempfile.
+    """
+    tempfile = sys.modules.get("tempfile")
+    if tempfile is not None and tempfile.tempdir is not None:
+        return tempfile.tempdir
+    names = ("TMPDIR", "TEMP", "TMP")
+    candidate = next(filter(None, map(os.environ.get, names)), "/tmp")  # noqa: S108
+    if os.access(candidate, os.W_OK | os.X_OK):
+        return os.path.abspath(candidate)  # noqa: PTH100 - as tempfile has it
     import tempfile
 
+    return tempfile.gettempdir()
+
+
+def _cache_file(patterns_dir: Path) -> Path:
+    """Cache file location for *patterns_dir* in the per-user temp dir."""
+    import hashlib
+
+    name = hashlib.sha256(str(patterns_dir).encode()).hexdigest()[:16]
+    return Path(_temp_dir()) / f"damage-control-{name}.json"
+
+
+def _cache_paths(patterns_dir: Path, files: list[Path]) -> tuple[Path, str]:
+    """Cache file location (per-user temp dir) and invalidation key.
+
+    The key covers the pattern files and everything else the compiled rules
+    depend on: _environment() and the hash of this source file.
+    """
+    import hashlib
+
+    stats = [(p, p.stat()) for p in files]
     state = json.dumps(
-        [[str(p), p.stat().st_mtime_ns, p.stat().st_size] for p in files]
+        [_environment(), _source_hash()]
+        + [[str(p), st.st_mtime_ns, st.st_size] for p, st in stats]
     )
     key = hashlib.sha256(state.encode()).hexdigest()
-    name = hashlib.sha256(str(patterns_dir).encode()).hexdigest()[:16]
-    cache_file = Path(tempfile.gettempdir()) / f"damage-control-{name}.json"
-    return cache_file, key
+    return _cache_file(patterns_dir), key
 
 
-def load_patterns_dir(patterns_dir: Path) -> dict[str, Any]:
-    """Load and merge all YAML files from a patterns directory.
+def _manifest(patterns_dir: Path, files: list[Path]) -> dict[str, Any]:
+    """Stats that prove a cache entry current without walking the tree.
 
-    Parsing ~25 YAML files dominates hook latency, and the hook runs on every
-    tool call. The merged config is cached as JSON in the per-user temp dir,
-    keyed by file paths, sizes, and mtimes — editing any pattern file
-    invalidates the cache.
+    A directory's mtime changes when an entry is added, removed or renamed
+    in it, so matching directory mtimes mean _pattern_files() would list
+    the same files; matching file stats mean none was edited in place.
     """
-    files = _pattern_files(patterns_dir)
-    cache_file, key = _cache_paths(patterns_dir, files)
+    dirs = [patterns_dir] + sorted(p for p in patterns_dir.rglob("*") if p.is_dir())
+    stats = []
+    for path in [Path(__file__), *files]:
+        st = path.stat()
+        stats.append([str(path), st.st_mtime_ns, st.st_size])
+    return {
+        "environment": _environment(),
+        "dirs": [[str(d), d.stat().st_mtime_ns] for d in dirs],
+        "files": stats,
+    }
+
+
+def _manifest_current(manifest: Any) -> bool:
+    """True if nothing recorded in *manifest* changed: one stat per entry."""
+    try:
+        if manifest["environment"] != _environment():
+            return False
+        for path, mtime_ns in manifest["dirs"]:
+            if Path(path).stat().st_mtime_ns != mtime_ns:
+                return False
+        for path, mtime_ns, size in manifest["files"]:
+            st = Path(path).stat()
+            if st.st_mtime_ns != mtime_ns or st.st_size != size:
+                return False
+    except (OSError, KeyError, TypeError, ValueError):
+        return False
+    return True
+
+
+def _read_cache(cache_file: Path) -> Any:
     try:
         with cache_file.open() as f:
-            cached = json.load(f)
-        if cached.get("key") == key:
-            return cached["config"]
-    except (OSError, ValueError, KeyError):
-        pass
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _publish(path: Path, data: bytes) -> None:
+    """Write *data* to *path* atomically: readers see the old file or the new one.
+
+    Each writer gets its own temp file, so concurrent writers never
+    interleave their bytes in a shared one before the rename. It is named
+    here rather than by tempfile.mkstemp(): decision memo updates publish
+    too, and they are warm calls (see _temp_dir()).
+    """
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{os.urandom(4).hex()}.tmp")
+    try:
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        tmp.replace(path)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+
+
+# The cache file is a JSON header line followed by one blob per section, so
+# a hook decodes only the sections its tool needs: a Read call skips the
+# ~550 bash rules. The "rules" section is the binary RuleTable of the bash
+# rules and comes first, with the header line padded so the table is
+# word-aligned in the mapped file; every other section is JSON holding
+# config keys plus compiled-rule (IR) keys. The header maps section names to
+# (offset, length) after the header line.
+_RULES_SECTION = "rules"
+_SECTIONS: dict[str, tuple[tuple[str, ...], tuple[str, ...]]] = {
+    _RULES_SECTION: ((), ("bash",)),
+    "bash": (("bashToolPatterns", "shorthands"), ()),
+    "zeroAccessPaths": (("zeroAccessPaths",), ("zeroAccessPaths",)),
+    "readOnlyPaths": (("readOnlyPaths",), ("readOnlyPaths",)),
+    "noDeletePaths": (("noDeletePaths",), ()),
+    "mentions": ((), ("mentions", "operations")),
+}
+
+
+def _encode_cache(header: dict[str, Any], config: dict[str, Any]) -> bytes:
+    """Header line plus section blobs (see _SECTIONS) for *config*."""
+    ir = config.get(_IR_KEY) or {}
+    blobs = []
+    offsets = {}
+    position = 0
+    for name, (keys, ir_keys) in _SECTIONS.items():
+        if name == _RULES_SECTION:
+            blob = encode_rule_table(_bash_rules(ir.get("bash", [])))
+        else:
+            part = {k: config[k] for k in keys if k in config}
+            part[_IR_KEY] = {k: ir[k] for k in ir_keys if k in ir}
+            blob = json.dumps(part).encode()
+        offsets[name] = [position, len(blob)]
+        position += len(blob)
+        blobs.append(blob)
+    return _cache_bytes({**header, "sections": offsets}, b"".join(blobs))
+
+
+def _cache_bytes(header: dict[str, Any], body: bytes) -> bytes:
+    line = json.dumps(header).encode()
+    return line + b" " * (-(len(line) + 1) % 4) + b"\n" + body
+
+
+def _read_cache_header(cache_file: Path) -> tuple[dict[str, Any], Any] | None:
+    """(header, section bytes) of a cache file, None if absent or unreadable.
+
+    The file is memory-mapped: sections a call never decodes are never
+    read. Caches are replaced by rename, never rewritten in place, so a
+    mapping stays valid for as long as a config refers to it.
+    """
+    import mmap
+
+    try:
+        with cache_file.open("rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        end = data.find(b"\n")
+        header = json.loads(data[:end]) if end >= 0 else None
+    except (OSError, ValueError):
+        return None
+    if not isinstance(header, dict):
+        return None
+    return header, memoryview(data)[end + 1 :]
+
+
+def _decode_sections(
+    header: dict[str, Any], body: Any, sections: Any
+) -> dict[str, Any]:
+    """The config made of *sections* (names from _SECTIONS) of a cache body."""
+    config: dict[str, Any] = {}
+    ir: dict[str, Any] = {"version": header["version"]}
+    for name in sections:
+        offset, length = header["sections"][name]
+        blob = body[offset : offset + length]
+        if name == _RULES_SECTION:
+            ir["bash"] = RuleTable(blob)
+            continue
+        part = json.loads(bytes(blob))
+        ir.update(part.pop(_IR_KEY))
+        config.update(part)
+    config[_IR_KEY] = ir
+    return config
 
-    import yaml
+
+# How long a hook waits for another process's rebuild before parsing the
+# pattern files itself. A cold rebuild takes a few hundred milliseconds.
+_LOCK_WAIT = 2.0
+
+
+@contextlib.contextmanager
+def _rebuild_lock(cache_file: Path, wait: float = _LOCK_WAIT) -> Iterator[bool | None]:
+    """Hold the advisory rebuild lock of *cache_file* for the block.
+
+    Yields True while held, False if another process held it for *wait*
+    seconds, and None where flock() is unavailable (no fcntl, or a lock
+    file owned by someone else).
+    """
+    try:
+        import fcntl
+    except ImportError:
+        yield None
+        return
+    try:
+        fd = os.open(cache_file.with_suffix(".lock"), os.O_RDWR | os.O_CREAT, 0o600)
+    except OSError:
+        yield None
+        return
+    try:
+        deadline = time.monotonic() + wait
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    yield False
+                    return
+                time.sleep(0.01)
+        try:
+            yield True
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+
+# Cache headers found current during one hook call, by cache file: the
+# launcher's needs_yaml(), the decision memo and load_config() each need the
+# header, and each would read it and stat its manifest again. None outside a
+# hook call (see _hook_call()), so a long-lived process such as the daemon
+# checks the manifest every time.
+_current_caches: dict[Path, tuple[dict[str, Any], Any]] | None = None
+
+
+def _hook_call(begin: bool) -> None:
+    """Start (or end) reusing current cache headers within one hook call."""
+    global _current_caches  # noqa: PLW0603 - per-call state, reset by main()
+    _current_caches = {} if begin else None
+
+
+def _current_cache(patterns_dir: Path) -> tuple[dict[str, Any], Any] | None:
+    """(header, section bytes) of *patterns_dir*'s cache if it is current."""
+    cache_file = _cache_file(patterns_dir)
+    if _current_caches is not None and cache_file in _current_caches:
+        return _current_caches[cache_file]
+    cached = _read_cache_header(cache_file)
+    if cached is None or not _manifest_current(cached[0].get("manifest")):
+        return None
+    if _current_caches is not None:
+        _current_caches[cache_file] = cached
+    return cached
+
+
+def load_patterns_dir(patterns_dir: Path, sections: Any = None) -> dict[str, Any]:
+    """Load and merge all YAML files from a patterns directory.
+
+    *sections* (names from _SECTIONS, default all) limits what a warm call
+    decodes; other keys may be absent from the result.
+
+    Parsing ~25 YAML files and compiling their rules dominates hook latency,
+    and the hook runs on every tool call. The merged config and its compiled
+    rules (compile_config()) are cached in the per-user temp dir,
+    keyed by file paths, sizes, and mtimes plus this file's hash — editing
+    any pattern file or upgrading the hook invalidates the cache.
+
+    A warm call only stats what the cache's manifest lists (the pattern
+    directories, the pattern files and this file); the tree walk and key
+    hash run only when one of those stats changed.
+
+    Rebuilds are single-flight: concurrent hooks that miss the cache queue
+    on an advisory lock, and all but the first find the fresh cache once
+    they get it. A hook that waits longer than _LOCK_WAIT parses the files
+    itself without publishing.
+    """
+    if sections is None:
+        sections = tuple(_SECTIONS)
+    cache_file = _cache_file(patterns_dir)
+    cached = _current_cache(patterns_dir)
+    if cached is not None:
+        try:
+            return _decode_sections(*cached, sections)
+        except (ValueError, KeyError, TypeError, AttributeError):
+            cached = None  # damaged: rebuild it
+            if _current_caches is not None:
+                _current_caches.pop(cache_file, None)
+    else:
+        cached = _read_cache_header(cache_file)  # stale, unless only touched
+
+    files = _pattern_files(patterns_dir)
+    _, key = _cache_paths(patterns_dir, files)
+    if cached is not None and cached[0].get("key") == key:
+        # Touched but unchanged (e.g. a file saved without edits): keep the
+        # config and record the new stats so the fast path applies again.
+        header, body = cached
+        header["manifest"] = _manifest(patterns_dir, files)
+        _publish(cache_file, _cache_bytes(header, bytes(body)))
+        return _decode_sections(header, body, sections)
+    with _rebuild_lock(cache_file) as locked:
+        if locked:
+            cached = _read_cache_header(cache_file)
+            if cached is not None and cached[0].get("key") == key:
+                return _decode_sections(*cached, sections)  # rebuilt meanwhile
+        return _rebuild_cache(
+            patterns_dir, files, cache_file, key, publish=locked is not False
+        )
+
+
+def policy_key(patterns_dir: Path) -> str | None:
+    """Cache key of *patterns_dir* if its cache is current, else None.
+
+    The key changes with any pattern file, this file, $HOME or the Python
+    version: it identifies the policy a decision was made under.
+    """
+    cached = _current_cache(patterns_dir)
+    if cached is None:
+        return None
+    key = cached[0].get("key")
+    return key if isinstance(key, str) else None
+
+
+def needs_yaml() -> bool:
+    """True if load_config() may have to parse YAML rather than read the cache.
+
+    The cache counts as current only for the Python version that wrote it
+    (see _environment()), so an interpreter other than the one that built
+    it needs YAML too.
+
+    Call it right before main(): the header it finds current is reused by
+    that call, which ends the reuse when it returns.
+    """
+    _hook_call(begin=True)
+    patterns_dir = get_patterns_dir()
+    return patterns_dir is None or policy_key(patterns_dir) is None
+
+
+def _rebuild_cache(
+    patterns_dir: Path,
+    files: list[Path],
+    cache_file: Path,
+    key: str,
+    publish: bool = True,
+) -> dict[str, Any]:
+    """Parse and merge *files*, compile them and (if *publish*) write the cache.
+
+    Parsed files and analysed patterns are kept as fragments beside the
+    cache: a file whose content hash is unchanged is not parsed again and a
+    pattern seen before is not analysed again, so editing one file costs
+    one YAML parse plus that file's new patterns.
+    """
+    import hashlib
+
+    # Stat before reading, so an edit racing the parse shows up as stale.
+    manifest = _manifest(patterns_dir, files)
+
+    fragments_file = cache_file.with_suffix(".fragments.json")
+    producer = [_environment(), _source_hash(), _yaml_parser()]
+    fragments = _read_cache(fragments_file)
+    if not isinstance(fragments, dict) or fragments.get("producer") != producer:
+        fragments = {}
+    old_files = fragments.get("files", {})
+    memo = fragments.get("rules", {})
+    new_files = {}
 
     merged: dict[str, list] = {k: [] for k in _CONFIG_KEYS}
     shorthands: dict[str, str] = {}
 
     for filepath in files:
-        with filepath.open() as f:
-            data = yaml.safe_load(f) or {}
+        st = filepath.stat()
+        raw = filepath.read_bytes()
+        digest = hashlib.sha256(raw).hexdigest()
+        fragment = old_files.get(str(filepath))
+        if fragment is not None and fragment[2] == digest:
+            data = fragment[3]
+        else:
+            data = _parse_yaml(raw) or {}
+            data = {k: data[k] for k in (*_CONFIG_KEYS, "shorthands") if k in data}
+        new_files[str(filepath)] = [st.st_size, st.st_mtime_ns, digest, data]
         for key_name in _CONFIG_KEYS:
             items = data.get(key_name)
             if isinstance(items, list):
@@ -295,34 +709,55 @@ def load_patterns_dir(patterns_dir: Path) -> dict[str, Any]:
             shorthands.update(file_shorthands)
 
     merged["shorthands"] = shorthands
+    if len(memo) > 2 * len(merged["bashToolPatterns"]) + 64:
+        memo = {}  # mostly analyses of patterns edited away since
+    merged[_IR_KEY] = compile_config(merged, memo)
+
+    if publish:
+        fragments = {"producer": producer, "files": new_files, "rules": memo}
+        _publish(fragments_file, json.dumps(fragments).encode())
+        header = {"version": IR_VERSION, "key": key, "manifest": manifest}
+        _publish(cache_file, _encode_cache(header, merged))
+    return merged
 
-    tmp = cache_file.with_suffix(".tmp")
-    try:
-        with tmp.open("w") as f:
-            json.dump({"key": key, "config": merged}, f)
-        tmp.replace(cache_file)
-    except OSError:
-        pass
 
-    return merged
+def _parse_yaml(stream: Any) -> Any:
+    """yaml.safe_load(), through libyaml when PyYAML was built with it."""
+    import yaml
+
+    if getattr(yaml, "__with_libyaml__", False):
+        return yaml.load(stream, Loader=yaml.CSafeLoader)
+    return yaml.safe_load(stream)
 
 
-def load_config() -> dict[str, Any]:
-    """Load patterns from patterns/ directory or single YAML file."""
+def _yaml_parser() -> str:
+    """PyYAML version and loader, part of the fragment cache key."""
+    import yaml
+
+    libyaml = getattr(yaml, "__with_libyaml__", False)
+    return f"{yaml.__version__}/{'libyaml' if libyaml else 'python'}"
+
+
+def load_config(sections: Any = None) -> dict[str, Any]:
+    """Load patterns from patterns/ directory or single YAML file.
+
+    *sections* is passed on to load_patterns_dir(); a single YAML file is
+    always loaded whole.
+    """
     patterns_dir = get_patterns_dir()
     if patterns_dir is not None:
-        return load_patterns_dir(patterns_dir)
+        return load_patterns_dir(patterns_dir, sections)
+    return load_config_file(get_config_path())
 
-    config_path = get_config_path()
 
+def load_config_file(config_path: Path) -> dict[str, Any]:
+    """Load a single patterns.yaml, warning (not failing) when it is missing."""
     if not config_path.exists():
         print(f"Warning: Config not found at {config_path}", file=sys.stderr)
         return {k: [] for k in _CONFIG_KEYS}
 
-    import yaml
-
     with config_path.open() as f:
-        data = yaml.safe_load(f) or {}
+        data = _parse_yaml(f) or {}
 
     shorthands = data.get("shorthands")
     if isinstance(shorthands, dict):
@@ -338,6 +773,41 @@ def load_config() -> dict[str, Any]:
 # ============================================================================
 
 
+def zero_access_mention(command: str, zero_path: str) -> str | None:
+    """Reason if *command* mentions the zero-access entry at all, else None."""
+    if is_glob_pattern(zero_path):
+        glob_regex = glob_to_regex(zero_path) + _GLOB_BOUNDARY
+        try:
+            if _compile(glob_regex, re.IGNORECASE).search(command):
+                return f"zero-access pattern {zero_path}"
+        except re.error:
+            pass
+        return None
+
+    expanded = str(Path(zero_path).expanduser())
+    # Path() strips trailing slashes; preserve them so directory
+    # patterns like "secrets/" don't match the bare word "secrets"
+    # inside commit messages or other free-form text.
+    if zero_path.endswith("/") and not expanded.endswith("/"):
+        expanded += "/"
+    escaped_expanded = re.escape(expanded)
+    escaped_original = re.escape(zero_path)
+    # Use path-component boundary to avoid matching inside
+    # longer names (e.g. "secrets/" inside "external-secrets/").
+    # Absolute paths already start with "/" so the boundary is
+    # implicit; relative paths need an explicit anchor.
+    if expanded.startswith("/"):
+        exp_pat = escaped_expanded
+        orig_pat = escaped_original
+    else:
+        boundary = r"(?:^|(?<=\s)|(?<=/))"
+        exp_pat = boundary + escaped_expanded
+        orig_pat = boundary + escaped_original
+    if _compile(exp_pat).search(command) or _compile(orig_pat).search(command):
+        return f"zero-access path {zero_path}"
+    return None
+
+
 def check_path_patterns(
     command: str, path: str, patterns: list[tuple[str, str]], path_type: str
 ) -> tuple[bool, str]:
@@ -347,9 +817,9 @@ def check_path_patterns(
         for pattern_template, operation in patterns:
             try:
                 cmd_prefix = pattern_template.replace("{path}", "")
-                if cmd_prefix and re.search(
-                    cmd_prefix + glob_regex, command, re.IGNORECASE
-                ):
+                if cmd_prefix and _compile(
+                    cmd_prefix + glob_regex, re.IGNORECASE
+                ).search(command):
                     return True, f"{operation} operation on {path_type} {path}"
             except re.error:
                 continue
@@ -365,9 +835,9 @@ def check_path_patterns(
             pattern_expanded = pattern_template.replace("{path}", escaped_expanded)
             pattern_original = pattern_template.replace("{path}", escaped_original)
             try:
-                if re.search(pattern_expanded, command) or re.search(
-                    pattern_original, command
-                ):
+                if _compile(pattern_expanded).search(command) or _compile(
+                    pattern_original
+                ).search(command):
                     return True, f"{operation} operation on {path_type} {path}"
             except re.error:
                 continue
@@ -375,6 +845,49 @@ def check_path_patterns(
     return False, ""
 
 
+class OperationGate:
+    """Which operation templates can match a command, found once per command.
+
+    A template only matches where its operation part (the template without
+    `{path}`) matches, and that part needs a literal (`rm`, `>`, `sed`) to
+    be in the command. present() tests the literals with substring
+    searches, confirms the survivors with the operation part alone, and
+    returns the templates left in their original order. Most commands an
+    agent runs (`git status`, `rg`, `pytest`) name no operation at all, and
+    then no path has to go through the templates.
+    """
+
+    def __init__(self, templates: list[tuple[str, str]]) -> None:
+        self.checks: list[list[Any]] = []
+        for pattern, operation in templates:
+            operation_part = pattern.replace("{path}", "")
+            literals = sorted(required_literals(operation_part) or ())
+            self.checks.append([pattern, operation, literals, operation_part])
+
+    @classmethod
+    def from_checks(cls, checks: list[list[Any]]) -> OperationGate:
+        """A gate over precomputed checks (e.g. loaded from the IR)."""
+        gate = cls.__new__(cls)
+        gate.checks = checks
+        return gate
+
+    def present(self, command: str) -> list[tuple[str, str]]:
+        folded = _fold(command)
+        return [
+            (pattern, operation)
+            for pattern, operation, literals, operation_part in self.checks
+            if (not literals or any(word in folded for word in literals))
+            # IGNORECASE covers the glob checks and is a superset of the
+            # case-sensitive plain-path ones.
+            and _compile(operation_part, re.IGNORECASE).search(command)
+        ]
+
+
+def operation_gate(config: dict[str, Any]) -> OperationGate:
+    """The gate over READ_ONLY_BLOCKED (NO_DELETE_BLOCKED is a subset)."""
+    return _compiled(config, "operations", _build_operation_gate)
+
+
 # ============================================================================
 # COMMAND POSITION ANCHORING
 # ============================================================================
@@ -396,211 +909,1588 @@ _CMD_POSITION_PREFIX = r"(?:^|[;|&({\n\r]\s*(?:(?:do|then|else|elif)\s+)?)"
 
 
 # ============================================================================
-# TOOL HANDLERS
+# KEYWORD PREFILTER
 # ============================================================================
 
+# What re.IGNORECASE lets match an ASCII letter besides its two cases: the
+# dotted/dotless I, the Kelvin sign and the long s. Folding them first keeps
+# str.lower() a sound stand-in for the regex's case-insensitive comparison.
+_FOLD = str.maketrans({"İ": "i", "ı": "i", "K": "k", "ſ": "s"})
 
-def handle_bash(tool_input: dict[str, Any], config: dict[str, Any]) -> None:
-    """Handle Bash tool: patterns, zero-access, read-only, no-delete checks."""
+
+def _fold(text: str) -> str:
+    return text.translate(_FOLD).lower()
+
+
+def _parse_regex(source: str) -> Any:
+    try:
+        from re import _parser as sre_parse  # Python 3.11+
+    except ImportError:
+        import sre_parse
+    return sre_parse.parse(source)
+
+
+def _literals_in(items: Any) -> frozenset[str] | None:
+    """Best set of literals one of which every match of `items` contains."""
+    best: frozenset[str] | None = None
+    run: list[str] = []
+
+    def consider(candidate: frozenset[str] | None) -> None:
+        nonlocal best
+        if candidate and (best is None or _strength(candidate) > _strength(best)):
+            best = candidate
+
+    for op, av in items:
+        name = op.name
+        if name == "LITERAL" and 32 <= av < 127:
+            run.append(chr(av))
+            continue
+        if run:
+            consider(frozenset({"".join(run).lower()}))
+            run = []
+        if name == "SUBPATTERN":
+            consider(_literals_in(av[-1]))
+        elif name == "ATOMIC_GROUP":
+            consider(_literals_in(av))
+        elif name == "BRANCH":
+            branches = [_literals_in(branch) for branch in av[1]]
+            if all(branches):
+                consider(frozenset().union(*branches))
+        elif name.endswith("_REPEAT") and av[0] >= 1:
+            consider(_literals_in(av[2]))
+    if run:
+        consider(frozenset({"".join(run).lower()}))
+    return best
+
+
+def _strength(literals: frozenset[str]) -> tuple[int, int]:
+    # A set filters better the longer its shortest member and the fewer members.
+    return min(map(len, literals)), -len(literals)
+
+
+def required_literals(source: str) -> frozenset[str] | None:
+    """Lower-cased ASCII literals, at least one of which any match contains.
+
+    None when no such set exists (e.g. a pattern made only of classes and
+    optional parts); such a pattern has to be tried against every command.
+    Raises re.error for a pattern that does not parse.
+    """
+    return _literals_in(_parse_regex(source))
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton: every keyword occurring in a text in one pass."""
+
+    def __init__(self, keywords: Any) -> None:
+        goto: list[dict[str, int]] = [{}]
+        out: list[tuple[str, ...]] = [()]
+        for word in keywords:
+            state = 0
+            for ch in word:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append(())
+                state = nxt
+            if word not in out[state]:
+                out[state] += (word,)
+
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        for state in queue:  # breadth-first: the list grows as we go
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                back = fail[state]
+                while back and ch not in goto[back]:
+                    back = fail[back]
+                fail[nxt] = goto[back].get(ch, 0)
+                out[nxt] += out[fail[nxt]]
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+
+    @classmethod
+    def from_tables(cls, goto: Any, fail: Any, out: Any) -> KeywordAutomaton:
+        """An automaton over prebuilt transition, fail and output tables."""
+        automaton = cls.__new__(cls)
+        automaton._goto = goto
+        automaton._fail = fail
+        automaton._out = out
+        return automaton
+
+    def find(self, text: str) -> set[str]:
+        goto, fail, out = self._goto, self._fail, self._out
+        found: set[str] = set()
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+
+# ============================================================================
+# COMMAND SEGMENTS
+# ============================================================================
+
+# The separators and shell keywords of _CMD_POSITION_PREFIX, for finding the
+# offsets it lets an anchored pattern start at without running it.
+_SEGMENT_SEPARATOR_RE = re.compile(r"[;|&({\n\r]")
+_SEGMENT_KEYWORDS = ("do", "then", "else", "elif")
+
+
+def _space_run(command: str, start: int) -> int:
+    end = start
+    while end < len(command) and command[end].isspace():
+        end += 1
+    return end
+
+
+def segment_starts(command: str) -> list[int]:
+    """Offsets at which _CMD_POSITION_PREFIX lets an anchored pattern begin.
+
+    The start of the command, and after every separator each offset its
+    optional whitespace can stop at, plus the same after a do/then/else/elif
+    keyword. Quotes are deliberately not honoured: the prefix never did, and
+    a separator inside `bash -c "...; rm -rf /"` must still start a segment.
+    """
+    starts = {0}
+    for sep in _SEGMENT_SEPARATOR_RE.finditer(command):
+        word = _space_run(command, sep.end())
+        starts.update(range(sep.end(), word + 1))
+        for keyword in _SEGMENT_KEYWORDS:
+            after = word + len(keyword)
+            if _fold(command[word:after]) == keyword:
+                end = _space_run(command, after)
+                starts.update(range(after + 1, end + 1))
+    return sorted(starts)
+
+
+def _leading_literals(items: Any) -> frozenset[str] | None:
+    """Lower-cased literal prefixes one of which every match starts with."""
+    items = list(items)
+    for i, (op, av) in enumerate(items):
+        name = op.name
+        if name in ("AT", "ASSERT", "ASSERT_NOT"):  # zero-width
+            continue
+        rest = items[i + 1 :]
+        if name == "LITERAL":
+            run = []
+            for lit_op, lit in items[i:]:
+                if lit_op.name != "LITERAL" or not 32 <= lit < 127:
+                    break
+                run.append(chr(lit))
+            return frozenset({"".join(run).lower()}) if run else None
+        if name == "SUBPATTERN":
+            return _leading_literals(list(av[-1]) + rest)
+        if name == "ATOMIC_GROUP":
+            return _leading_literals(list(av) + rest)
+        if name == "BRANCH":
+            return _union([_leading_literals(list(b) + rest) for b in av[1]])
+        if name.endswith("_REPEAT"):
+            # Stop at the repeated part: a second iteration, not `rest`,
+            # may follow the first.
+            leads = _leading_literals(av[2])
+            return leads if av[0] else _union([leads, _leading_literals(rest)])
+        return None
+    return None
+
+
+def _union(sets: list[frozenset[str] | None]) -> frozenset[str] | None:
+    if not all(sets):
+        return None
+    return frozenset().union(*sets)
+
+
+# ============================================================================
+# COMPILED COMMAND PATTERNS
+# ============================================================================
+
+
+class BashRule(NamedTuple):
+    """One bashToolPatterns entry, shorthand-expanded and anchored.
+
+    `body` is the pattern without _CMD_POSITION_PREFIX when the rule is
+    position-anchored; it is matched at segment starts instead of searching
+    `source`. `leads` are the literals a body match must begin with.
+    """
+
+    index: int
+    source: str
+    reason: str
+    block: bool
+    keywords: frozenset[str] | None
+    body: str | None
+    leads: tuple[str, ...] | None
+
+    @property
+    def regex(self) -> re.Pattern[str]:
+        return _compile(self.source, re.IGNORECASE)
+
+
+def _analyze_pattern(pattern: str, anchored: bool) -> list[Any] | None:
+    """[keywords, body, leads] of one expanded pattern, None if it does not parse."""
+    source = _CMD_POSITION_PREFIX + pattern if anchored else pattern
+    try:
+        tree = _parse_regex(source)
+        keywords = _literals_in(tree)
+        # The prefix parses to one leading node; a lone node means a
+        # top-level `|` in the pattern took the prefix into its first
+        # alternative only.
+        body = pattern if anchored and len(tree) > 1 else None
+        leads = _leading_literals(tree[1:]) if body is not None else None
+    except (re.error, RecursionError):
+        return None
+    return [
+        None if keywords is None else sorted(keywords),
+        body,
+        sorted(leads) if leads else None,
+    ]
+
+
+def compile_bash_rules(
+    patterns: list[Any],
+    shorthands: dict[str, str],
+    memo: dict[str, Any] | None = None,
+) -> list[BashRule]:
+    """bashToolPatterns entries as BashRules; entries that do not parse are dropped.
+
+    *memo* maps an expanded pattern (JSON [pattern, anchored]) to its
+    _analyze_pattern() result; hits skip the regex parse and misses are
+    added to it.
+    """
+    rules: list[BashRule] = []
+    for index, item in enumerate(patterns):
+        pattern = _expand_shorthands(item.get("pattern", ""), shorthands)
+        anchored = not item.get("match_anywhere", False)
+        memo_key = json.dumps([pattern, anchored])
+        if memo is not None and memo_key in memo:
+            analysis = memo[memo_key]
+        else:
+            analysis = _analyze_pattern(pattern, anchored)
+            if memo is not None:
+                memo[memo_key] = analysis
+        if analysis is None:
+            continue
+        keywords, body, leads = analysis
+        source = _CMD_POSITION_PREFIX + pattern if anchored else pattern
+        reason = item.get("reason", "Matched damage-control pattern")
+        block = bool(item.get("block", False))
+        rules.append(
+            BashRule(
+                index,
+                source,
+                reason,
+                block,
+                None if keywords is None else frozenset(keywords),
+                body,
+                None if leads is None else tuple(leads),
+            )
+        )
+    return rules
+
+
+class BashMatcher:
+    """All bashToolPatterns of a config, indexed once.
+
+    first() reports the same rule the original per-call loop did: the first
+    entry in file order whose pattern matches anywhere in the command.
+    Entries whose regex fails to parse are dropped, as the loop skipped them
+    on re.error. reference.py keeps that loop, and equivalence.py checks
+    the two against each other.
+
+    Nearly every pattern requires some literal text ("reset", "delete",
+    "terraform"), so a single Aho-Corasick pass over the case-folded command
+    selects the few rules that can match at all; only those, plus the rules
+    without a usable literal, are tried, still in file order. Regexes are
+    compiled on first use, so a one-shot hook process pays for the handful
+    of rules its command names rather than for the whole set.
+
+    Position-anchored rules are not searched with the prefix: the command is
+    split into segment starts once, and a rule's body is only matched at the
+    starts whose command word begins with one of the rule's leading literals
+    (`kubectl`, `git`, `sudo`, ...). match_anywhere rules, and anchored rules
+    whose top-level `|` leaves later alternatives unanchored, are searched
+    over the whole string.
+
+    A single combined alternation was measured and rejected: `re` tries every
+    branch at every candidate position and cannot use the literal-prefix
+    skip an individual search gets, so it is several times slower than
+    scanning rules in order (see benchmarks/).
+    """
+
+    def __init__(self, patterns: list[Any], shorthands: dict[str, str]) -> None:
+        self._index(compile_bash_rules(patterns, shorthands))
+
+    @classmethod
+    def from_rules(cls, rules: list[BashRule]) -> BashMatcher:
+        """A matcher over already compiled rules (e.g. loaded from the IR)."""
+        matcher = cls.__new__(cls)
+        matcher._index(rules)
+        return matcher
+
+    @classmethod
+    def from_table(cls, table: RuleTable) -> BashMatcher:
+        """A matcher reading rules and index from *table* as it needs them.
+
+        Keywords are numbered rather than spelled: the automaton reports
+        keyword ids, which index the table's postings lists.
+        """
+        matcher = cls.__new__(cls)
+        matcher.rules = _LazyRecords(table.n_rules, table.rule)
+        matcher._always = table.always
+        matcher._by_keyword = _LazyRecords(table.n_keywords, table.postings)
+        matcher._automaton = KeywordAutomaton.from_tables(
+            _LazyRecords(table.n_states, table.goto),
+            _LazyRecords(table.n_states, table.fail),
+            _LazyRecords(table.n_states, table.out),
+        )
+        return matcher
+
+    def _index(self, rules: list[BashRule]) -> None:
+        self.rules = rules
+        self._always: list[int] = []
+        self._by_keyword: dict[str, list[int]] = {}
+        for position, rule in enumerate(self.rules):
+            if rule.keywords is None:
+                self._always.append(position)
+            else:
+                for word in rule.keywords:
+                    self._by_keyword.setdefault(word, []).append(position)
+        self._automaton = KeywordAutomaton(self._by_keyword)
+
+    def _candidate_positions(self, folded: str) -> list[int]:
+        positions = set(self._always)
+        for word in self._automaton.find(folded):
+            positions.update(self._by_keyword[word])
+        return sorted(positions)
+
+    def candidates(self, command: str) -> list[BashRule]:
+        """Rules that may match `command`, in file order."""
+        return [self.rules[p] for p in self._candidate_positions(_fold(command))]
+
+    def first(self, command: str) -> BashRule | None:
+        folded = _fold(command)  # same length as command: offsets carry over
+        starts = None
+        for position in self._candidate_positions(folded):
+            rule = self.rules[position]
+            try:
+                if rule.body is None:
+                    if rule.regex.search(command):
+                        return rule
+                    continue
+                if starts is None:
+                    starts = segment_starts(command)
+                body = _compile(rule.body, re.IGNORECASE)
+                leads = rule.leads
+                for start in starts:
+                    if (leads is None or folded.startswith(leads, start)) and (
+                        body.match(command, start)
+                    ):
+                        return rule
+            except re.error:
+                continue
+        return None
+
+
+# Compiled views of a config, built on first use and reused for as long as
+# the same config object is passed in: once per hook process, once per
+# resident config in the daemon.
+_COMPILED: dict[tuple[int, str], tuple[dict[str, Any], Any]] = {}
+
+
+def _compiled(config: dict[str, Any], name: str, build: Any) -> Any:
+    """Return build(config), cached per config object."""
+    key = (id(config), name)
+    cached = _COMPILED.get(key)
+    if cached is None or cached[0] is not config:
+        if len(_COMPILED) >= 64:
+            _COMPILED.clear()
+        cached = (config, build(config))
+        _COMPILED[key] = cached
+    return cached[1]
+
+
+def _reset_compiled() -> None:
+    """Forget every compiled regex and matcher (the config was replaced)."""
+    _compile.cache_clear()
+    _COMPILED.clear()
+
+
+def bash_matcher(config: dict[str, Any]) -> BashMatcher:
+    """The compiled bashToolPatterns of *config*."""
+    return _compiled(config, "bash", _build_bash_matcher)
+
+
+# ============================================================================
+# COMPILED PATH POLICY
+# ============================================================================
+
+
+class PathEntry(NamedTuple):
+    """One path-list entry, as written in the YAML."""
+
+    index: int
+    path: str
+    block: bool
+
+
+_GLOB_CHARS = frozenset("*?[")
+
+
+class PathPolicy:
+    """One path list (zeroAccessPaths, readOnlyPaths, ...) indexed once.
+
+    first() reports the same entry as the original loop calling match_path()
+    on each entry in order, without redoing expanduser(), lowercasing and
+    fnmatch() per entry:
+
+      - plain entries go into a trie of path components; match_path() tests
+        them with a character-level startswith(), so the last component of
+        the entry only has to be a prefix (`~/.ssh` also covers `~/.sshx`)
+      - `*SUFFIX` globs become a suffix -> entry map probed with the
+        basename's tails, one lookup per distinct suffix length
+      - any other glob keeps its three fnmatch() tests, precompiled
+
+    Every entry carries its list position; the lowest one matched wins.
+    """
+
+    def __init__(self, entries: list[Any]) -> None:
+        self._index(path_records(entries))
+
+    @classmethod
+    def from_records(cls, records: list[Any]) -> PathPolicy:
+        """A policy over path_records() output (e.g. loaded from the IR)."""
+        policy = cls.__new__(cls)
+        policy._index(records)
+        return policy
+
+    def _index(self, records: list[Any]) -> None:
+        self.entries: list[PathEntry] = []
+        self._trie: tuple[dict[str, Any], list[tuple[str, int]]] = ({}, [])
+        self._suffixes: dict[str, int] = {}
+        self._globs: list[tuple[int, Any, Any]] = []
+        for index, record in enumerate(records):
+            if record is None:
+                self.entries.append(PathEntry(index, "", False))  # never matched
+                continue
+            path, block, expanded = record
+            self.entries.append(PathEntry(index, path, block))
+            if not is_glob_pattern(path):
+                self._add_prefix(expanded, index)
+                continue
+            expanded_lower, path_lower = expanded.lower(), path.lower()
+            suffix = self._suffix_of(expanded_lower)
+            if suffix is not None and "/" not in suffix:
+                # fnmatch(full, *SUFFIX) is the basename test again when the
+                # suffix holds no slash; a raw spelling whose suffix does
+                # can never match a basename.
+                self._suffixes.setdefault(suffix, index)
+                raw = self._suffix_of(path_lower)
+                if raw is not None and "/" not in raw:
+                    self._suffixes.setdefault(raw, index)
+                elif raw is None:
+                    self._globs.append((index, None, _fnmatcher(path_lower)))
+            else:
+                self._globs.append(
+                    (index, _fnmatcher(expanded_lower), _fnmatcher(path_lower))
+                )
+        self._suffix_lengths = sorted({len(s) for s in self._suffixes})
+
+    @staticmethod
+    def _suffix_of(pattern: str) -> str | None:
+        if pattern.startswith("*") and not _GLOB_CHARS.intersection(pattern[1:]):
+            return pattern[1:]
+        return None
+
+    def _add_prefix(self, expanded: str, index: int) -> None:
+        *parents, last = expanded.split("/")
+        node = self._trie
+        for part in parents:
+            node = node[0].setdefault(part, ({}, []))
+        node[1].append((last, index))
+
+    def first(self, file_path: str) -> PathEntry | None:
+        """The first entry match_path() accepts for *file_path*, if any."""
+        full = str(Path(os.path.normpath(file_path)).expanduser())
+        best = len(self.entries)
+
+        node: Any = self._trie
+        for part in full.split("/"):
+            for last, index in node[1]:
+                if index < best and part.startswith(last):
+                    best = index
+            node = node[0].get(part)
+            if node is None:
+                break
+
+        full_lower = full.lower()
+        base_lower = Path(full).name.lower()
+        if full_lower.rpartition("/")[2] == base_lower:
+            for length in self._suffix_lengths:
+                if length > len(base_lower):
+                    break
+                index = self._suffixes.get(base_lower[len(base_lower) - length :])
+                if index is not None and index < best:
+                    best = index
+            globs = self._globs
+        else:
+            # Path.name disagrees with the last component ("." and the
+            # like): test the suffix entries the slow way as well.
+            globs = [(i, None, None) for i in sorted(set(self._suffixes.values()))]
+            globs += self._globs
+
+        for index, expanded_match, raw_match in globs:
+            if index >= best:
+                continue
+            if expanded_match is None and raw_match is None:
+                if match_path(file_path, self.entries[index].path):
+                    best = index
+            elif (
+                (expanded_match and expanded_match(base_lower))
+                or raw_match(base_lower)
+                or (expanded_match and expanded_match(full_lower))
+            ):
+                best = index
+        return self.entries[best] if best < len(self.entries) else None
+
+
+def path_records(entries: list[Any], skip: Any = ()) -> list[list[Any] | None]:
+    """[path, block, expanded path] per entry, in list order; None for the
+    indexes in *skip* (entries that can never decide)."""
+    records: list[list[Any] | None] = []
+    for index, entry in enumerate(entries):
+        if index in skip:
+            records.append(None)
+            continue
+        path, block = _path_and_block(entry)
+        records.append([path, block, str(Path(path).expanduser())])
+    return records
+
+
+def _fnmatcher(pattern: str) -> Any:
+    """fnmatch.fnmatch(name, pattern) for POSIX names, as a bound match()."""
+    import fnmatch
+
+    return re.compile(fnmatch.translate(pattern)).match
+
+
+def path_policy(config: dict[str, Any], key: str) -> PathPolicy:
+    """The compiled path list *key* of *config*."""
+    return _compiled(config, key, lambda c: _build_path_policy(c, key))
+
+
+_BASH_PATH_KEYS = ("zeroAccessPaths", "readOnlyPaths", "noDeletePaths")
+
+
+class PathMentions:
+    """Which path entries a Bash command can touch at all, in one pass.
+
+    Every check handle_bash runs for an entry needs the entry's text in the
+    command: the expanded or the original spelling of a plain path, or the
+    literals of its glob regex. Those literals go into one KeywordAutomaton
+    over all three lists, so a command is scanned once and only the entries
+    it mentions go on to the operation templates. Entries without a usable
+    literal are always checked.
+    """
+
+    def __init__(self, config: dict[str, Any]) -> None:
+        self._index(
+            {
+                key: [
+                    self._keywords(_path_and_block(entry)[0])
+                    for entry in config.get(key, [])
+                ]
+                for key in _BASH_PATH_KEYS
+            }
+        )
+
+    @classmethod
+    def from_keywords(cls, keywords: dict[str, list[Any]]) -> PathMentions:
+        """An index over per-entry keyword sets (e.g. loaded from the IR)."""
+        mentions = cls.__new__(cls)
+        mentions._index(keywords)
+        return mentions
+
+    def _index(self, keywords: dict[str, list[Any]]) -> None:
+        self.keywords = keywords
+        self._always: dict[str, list[int]] = {key: [] for key in _BASH_PATH_KEYS}
+        self._by_keyword: dict[str, list[tuple[str, int]]] = {}
+        for key in _BASH_PATH_KEYS:
+            for index, words in enumerate(keywords.get(key, [])):
+                if words is None:
+                    self._always[key].append(index)
+                    continue
+                for word in words:
+                    self._by_keyword.setdefault(word, []).append((key, index))
+        self._automaton = KeywordAutomaton(self._by_keyword)
+
+    @staticmethod
+    def _keywords(path: str) -> frozenset[str] | None:
+        if is_glob_pattern(path):
+            try:
+                return required_literals(glob_to_regex(path) + _GLOB_BOUNDARY)
+            except re.error:
+                return None
+        expanded = str(Path(path).expanduser())
+        spellings = {expanded, path}
+        # The ASCII check keeps str.lower() from shifting offsets or
+        # context-folding (final sigma) a literal differently from the command.
+        if not all(spellings) or not all(s.isascii() for s in spellings):
+            return None
+        return frozenset(s.lower() for s in spellings)
+
+    def find(self, command: str) -> dict[str, list[int]]:
+        """Entry indexes per list that *command* mentions, in list order."""
+        found = {key: set(always) for key, always in self._always.items()}
+        for word in self._automaton.find(_fold(command)):
+            for key, index in self._by_keyword[word]:
+                found[key].add(index)
+        return {key: sorted(indexes) for key, indexes in found.items()}
+
+
+def path_mentions(config: dict[str, Any]) -> PathMentions:
+    """The Bash path-mention index of *config*."""
+    return _compiled(config, "mentions", _build_path_mentions)
+
+
+# ============================================================================
+# UNREACHABLE ENTRIES
+# ============================================================================
+
+# An entry that only ever matches where an entry checked before it matches
+# too can never decide, so compile_config() leaves it out of the compiled
+# rules. Only what can be shown from the config alone counts: a command
+# pattern repeating an earlier one once shorthands are expanded, a glob
+# repeating an earlier glob (globs match without case), and a plain path
+# under an earlier, broader plain path. lint.py reports these along with the
+# rules a corpus suggests are shadowed.
+
+
+class _Span(NamedTuple):
+    """What a path entry matches, for _covers()."""
+
+    key: str
+    index: int
+    glob: str | None  # lowercased glob; the rest is unused for globs
+    expanded: str  # as match_path() expands it
+    spellings: tuple[str, str]  # (expanded, original) as the Bash checks search
+
+
+def _span(key: str, index: int, path: str) -> _Span:
+    expanded = str(Path(path).expanduser())
+    spelled = (
+        expanded + "/" if path.endswith("/") and expanded[-1:] != "/" else expanded
+    )
+    glob = path.lower() if is_glob_pattern(path) else None
+    return _Span(key, index, glob, expanded, (spelled, path))
+
+
+def _covers(broad: _Span, narrow: _Span) -> bool:
+    """True if *broad*, checked first, matches every input *narrow* does.
+
+    Plain entries match as prefixes: match_path() of the expanded path for
+    the file tools, either spelling in the command for Bash. A relative
+    zero-access entry needs a path-component boundary before its mention,
+    which another entry's match does not promise unless it is a relative
+    zero-access entry too.
+    """
+    if broad.glob is not None or narrow.glob is not None:
+        return broad.glob == narrow.glob
+    if not narrow.expanded.startswith(broad.expanded):
+        return False
+    if not all(s.startswith(broad.spellings) for s in narrow.spellings):
+        return False
+    if broad.key != "zeroAccessPaths" or broad.spellings[0].startswith("/"):
+        return True
+    return narrow.key == broad.key and not narrow.spellings[0].startswith("/")
+
+
+def unreachable_entries(config: dict[str, Any]) -> dict[str, dict[int, str]]:
+    """Entries of *config* that can never decide, per list: index -> the
+    id of the entry that always matches first."""
+    found: dict[str, dict[int, str]] = {
+        key: {} for key in ("bashToolPatterns", *_BASH_PATH_KEYS)
+    }
+    shorthands = config.get("shorthands", {})
+    first: dict[str, int] = {}
+    for index, item in enumerate(config.get("bashToolPatterns", [])):
+        pattern = _expand_shorthands(item.get("pattern", ""), shorthands)
+        anchored = not item.get("match_anywhere", False)
+        earlier = first.setdefault(json.dumps([pattern, anchored]), index)
+        if earlier != index:
+            found["bashToolPatterns"][index] = f"bashToolPatterns[{earlier}]"
+
+    # Lists in the order the Bash checks (and the file tools) try them.
+    reachable: list[_Span] = []
+    for key in _BASH_PATH_KEYS:
+        for index, entry in enumerate(config.get(key, [])):
+            path = _path_and_block(entry)[0]
+            if not path:
+                continue
+            span = _span(key, index, path)
+            broad = next((b for b in reachable if _covers(b, span)), None)
+            if broad is None:
+                reachable.append(span)
+            else:
+                found[key][index] = f"{broad.key}[{broad.index}]"
+    return found
+
+
+# ============================================================================
+# COMPILED RULE ARTIFACT
+# ============================================================================
+
+# Everything the matchers above derive from a config — expanded and parsed
+# bash patterns, required literals, segment leads, expanded path entries —
+# depends only on the pattern files, this source file (shorthands, the
+# command-position prefix, operation templates), $HOME and the Python
+# version. compile_config() flattens it to JSON once per cache miss;
+# load_patterns_dir() stores it with the merged config (the bash rules as a
+# RuleTable), and the builders below index it instead of parsing regexes
+# again. Bump IR_VERSION whenever the record or table layouts change.
+IR_VERSION = 4
+_IR_KEY = "_compiled"
+
+
+def compile_config(
+    config: dict[str, Any], memo: dict[str, Any] | None = None
+) -> dict[str, Any]:
+    """The JSON-ready compiled form of *config* (*memo*: see compile_bash_rules).
+
+    Unreachable entries (unreachable_entries()) are left out: no bash rule
+    record, a null path record and no mention keywords.
+    """
+    unreachable = unreachable_entries(config)
+    rules = [
+        rule
+        for rule in compile_bash_rules(
+            config.get("bashToolPatterns", []), config.get("shorthands", {}), memo
+        )
+        if rule.index not in unreachable["bashToolPatterns"]
+    ]
+    mentions = PathMentions(config)
+    return {
+        "version": IR_VERSION,
+        "bash": [
+            [
+                rule.index,
+                rule.source,
+                rule.reason,
+                rule.block,
+                None if rule.keywords is None else sorted(rule.keywords),
+                rule.body,
+                None if rule.leads is None else list(rule.leads),
+            ]
+            for rule in rules
+        ],
+        "zeroAccessPaths": path_records(
+            config.get("zeroAccessPaths", []), unreachable["zeroAccessPaths"]
+        ),
+        "readOnlyPaths": path_records(
+            config.get("readOnlyPaths", []), unreachable["readOnlyPaths"]
+        ),
+        "mentions": {
+            key: [
+                []
+                if index in unreachable[key]
+                else None
+                if words is None
+                else sorted(words)
+                for index, words in enumerate(keywords)
+            ]
+            for key, keywords in mentions.keywords.items()
+        },
+        "operations": OperationGate(READ_ONLY_BLOCKED).checks,
+    }
+
+
+def _ir(config: dict[str, Any], part: str) -> Any:
+    """*part* of the compiled rules attached to *config*, None if absent."""
+    ir = config.get(_IR_KEY)
+    if isinstance(ir, dict) and ir.get("version") == IR_VERSION:
+        return ir.get(part)
+    return None
+
+
+def _bash_rules(records: list[list[Any]]) -> list[BashRule]:
+    """BashRules from the "bash" records of compile_config()."""
+    return [
+        BashRule(
+            index,
+            source,
+            reason,
+            block,
+            None if keywords is None else frozenset(keywords),
+            body,
+            None if leads is None else tuple(leads),
+        )
+        for index, source, reason, block, keywords, body, leads in records
+    ]
+
+
+def _build_bash_matcher(config: dict[str, Any]) -> BashMatcher:
+    records = _ir(config, "bash")
+    if records is None:
+        return BashMatcher(
+            config.get("bashToolPatterns", []), config.get("shorthands", {})
+        )
+    if isinstance(records, RuleTable):
+        return BashMatcher.from_table(records)
+    return BashMatcher.from_rules(_bash_rules(records))
+
+
+def _build_path_policy(config: dict[str, Any], key: str) -> PathPolicy:
+    records = _ir(config, key)
+    if records is None:
+        return PathPolicy(config.get(key, []))
+    return PathPolicy.from_records(records)
+
+
+def _build_path_mentions(config: dict[str, Any]) -> PathMentions:
+    keywords = _ir(config, "mentions")
+    if keywords is None:
+        return PathMentions(config)
+    return PathMentions.from_keywords(keywords)
+
+
+def _build_operation_gate(config: dict[str, Any]) -> OperationGate:
+    checks = _ir(config, "operations")
+    if checks is None:
+        return OperationGate(READ_ONLY_BLOCKED)
+    return OperationGate.from_checks(checks)
+
+
+# ============================================================================
+# BINARY RULE TABLE
+# ============================================================================
+
+# The bash rules are most of the cache and grow with every pattern pack, so
+# the cache stores them in a layout a hook maps instead of decoding: a
+# Bash call reads the automaton states its command walks through and the
+# rules those select, and nothing else. The table is an array of native
+# u32 words followed by a UTF-8 string blob:
+#
+#   header    _TABLE_HEADER: magic, then the counts of the tables below
+#   strings   n + 1 byte offsets into the blob; string i is [off[i], off[i+1])
+#   rules     7 words per BashRule, in field order; strings and lists by ref
+#   states    3 words per automaton state: edges list, fail state, out list
+#   keywords  1 word per keyword: its postings list (rule positions)
+#   lists     [count, item, ...] runs, referenced by word offset into lists
+#
+# _NONE stands for None in any string or list reference. The cache lives in
+# the per-user temp dir, so native byte order and word size are fine.
+_TABLE_MAGIC = 0x44435254  # "DCRT"
+_TABLE_HEADER = 7  # magic, strings, rules, states, keywords, always, lists
+_RULE_WORDS = 7
+_NONE = 0xFFFFFFFF
+
+
+def encode_rule_table(rules: list[BashRule]) -> bytes:
+    """*rules* and their BashMatcher index as a RuleTable buffer."""
+    import array
+
+    matcher = BashMatcher.from_rules(rules)
+    strings: dict[str, int] = {}
+    lists = array.array("I")
+
+    def string(text: str | None) -> int:
+        return _NONE if text is None else strings.setdefault(text, len(strings))
+
+    def run(items: Any) -> int:
+        if items is None:
+            return _NONE
+        offset = len(lists)
+        lists.append(len(items))
+        lists.extend(items)
+        return offset
+
+    def strings_run(texts: Any) -> int:
+        return run(None if texts is None else [string(t) for t in texts])
+
+    keyword_ids = {word: n for n, word in enumerate(matcher._by_keyword)}
+    rule_words = []
+    for rule in rules:
+        rule_words += [
+            rule.index,
+            string(rule.source),
+            string(rule.reason),
+            int(rule.block),
+            strings_run(None if rule.keywords is None else sorted(rule.keywords)),
+            string(rule.body),
+            strings_run(rule.leads),
+        ]
+    automaton = matcher._automaton
+    state_words = []
+    for edges, fail, out in zip(automaton._goto, automaton._fail, automaton._out):
+        pairs = [item for ch, nxt in edges.items() for item in (ord(ch), nxt)]
+        state_words += [run(pairs), fail, run([keyword_ids[w] for w in out])]
+    keyword_words = [run(positions) for positions in matcher._by_keyword.values()]
+    always = run(matcher._always)
+
+    blob = bytearray()
+    offsets = array.array("I", [0])
+    for text in strings:
+        blob += text.encode()
+        offsets.append(len(blob))
+    blob += b"\0" * (-len(blob) % 4)
+    header = [
+        _TABLE_MAGIC,
+        len(strings),
+        len(rules),
+        len(automaton._goto),
+        len(keyword_ids),
+        always,
+        len(lists),
+    ]
+    words = array.array("I", header)
+    words += offsets
+    words.extend(rule_words)
+    words.extend(state_words)
+    words.extend(keyword_words)
+    words += lists
+    return words.tobytes() + bytes(blob)
+
+
+class RuleTable:
+    """Read-only view of an encode_rule_table() buffer, decoded on access.
+
+    The buffer is usually a slice of the memory-mapped cache file, so
+    opening a table costs a few header reads whatever the rule count.
+    """
+
+    def __init__(self, buffer: Any) -> None:
+        words = memoryview(buffer).cast("B").cast("I")
+        magic, n_strings, n_rules, n_states, n_keywords, always, n_lists = words[
+            :_TABLE_HEADER
+        ]
+        if magic != _TABLE_MAGIC:
+            raise ValueError("not a damage-control rule table")
+        self._words = words
+        self._strings = _TABLE_HEADER
+        self._rules = self._strings + n_strings + 1
+        self._states = self._rules + _RULE_WORDS * n_rules
+        self._keywords = self._states + 3 * n_states
+        self._lists = self._keywords + n_keywords
+        self._blob = memoryview(buffer)[4 * (self._lists + n_lists) :]
+        self._memo: dict[int, str] = {}
+        self.n_rules = n_rules
+        self.n_states = n_states
+        self.n_keywords = n_keywords
+        self.always = self._list(always)
+
+    def __len__(self) -> int:
+        return self.n_rules
+
+    def _string(self, ref: int) -> str | None:
+        if ref == _NONE:
+            return None
+        text = self._memo.get(ref)
+        if text is None:
+            start, end = self._words[self._strings + ref : self._strings + ref + 2]
+            text = self._memo[ref] = str(self._blob[start:end], "utf-8")
+        return text
+
+    def _list(self, ref: int) -> list[int]:
+        start = self._lists + ref
+        return self._words[start + 1 : start + 1 + self._words[start]].tolist()
+
+    def _strings_of(self, ref: int) -> list[str] | None:
+        return None if ref == _NONE else [self._string(r) for r in self._list(ref)]
+
+    def rule(self, position: int) -> BashRule:
+        start = self._rules + _RULE_WORDS * position
+        index, source, reason, block, keywords, body, leads = self._words[
+            start : start + _RULE_WORDS
+        ]
+        keyword_list = self._strings_of(keywords)
+        lead_list = self._strings_of(leads)
+        return BashRule(
+            index,
+            self._string(source),
+            self._string(reason),
+            bool(block),
+            None if keyword_list is None else frozenset(keyword_list),
+            self._string(body),
+            None if lead_list is None else tuple(lead_list),
+        )
+
+    def goto(self, state: int) -> dict[str, int]:
+        pairs = self._list(self._words[self._states + 3 * state])
+        return {chr(ch): nxt for ch, nxt in zip(pairs[::2], pairs[1::2])}
+
+    def fail(self, state: int) -> int:
+        return self._words[self._states + 3 * state + 1]
+
+    def out(self, state: int) -> tuple[int, ...]:
+        return tuple(self._list(self._words[self._states + 3 * state + 2]))
+
+    def postings(self, keyword: int) -> list[int]:
+        return self._list(self._words[self._keywords + keyword])
+
+
+class _LazyRecords:
+    """Sequence whose item i is decode(i), computed on first access."""
+
+    def __init__(self, count: int, decode: Any) -> None:
+        self._count = count
+        self._decode = decode
+        self._memo: dict[int, Any] = {}
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, i: int) -> Any:
+        try:
+            return self._memo[i]
+        except KeyError:
+            if not 0 <= i < self._count:
+                raise IndexError(i) from None
+            item = self._memo[i] = self._decode(i)
+            return item
+
+    def __iter__(self) -> Iterator[Any]:
+        return (self[i] for i in range(self._count))
+
+
+# ============================================================================
+# EVALUATION
+# ============================================================================
+
+
+class Decision(NamedTuple):
+    """What the policy says about one tool call.
+
+    *rule* names the entry that decided it as `<config key>[<index>]`, e.g.
+    "bashToolPatterns[12]" or "zeroAccessPaths[3]"; None for an allow.
+    """
+
+    action: str  # "allow", "ask" or "block"
+    reason: str = ""
+    rule: str | None = None
+    target: str = ""
+
+    def output(self) -> tuple[int, str, str]:
+        """(exit code, stdout, stderr) the hook reports this decision with."""
+        if self.action == "block":
+            target = self.target
+            truncated = target[:100] + "..." if len(target) > 100 else target
+            return 2, "", f"SECURITY: Blocked: {self.reason}\nTarget: {truncated}\n"
+        if self.action == "ask":
+            output = {
+                "hookSpecificOutput": {
+                    "hookEventName": "PreToolUse",
+                    "permissionDecision": "ask",
+                    "permissionDecisionReason": self.reason,
+                }
+            }
+            return 0, json.dumps(output) + "\n", ""
+        return 0, "", ""
+
+
+ALLOW = Decision("allow")
+
+
+def evaluate_bash(tool_input: dict[str, Any], config: dict[str, Any]) -> Decision:
+    """Bash tool: patterns, zero-access, read-only, no-delete checks."""
     command = tool_input.get("command", "")
     if not command:
-        sys.exit(0)
+        return ALLOW
 
-    patterns = config.get("bashToolPatterns", [])
     zero_access_paths = config.get("zeroAccessPaths", [])
     read_only_paths = config.get("readOnlyPaths", [])
     no_delete_paths = config.get("noDeletePaths", [])
-    shorthands = config.get("shorthands", {})
 
     # Path protections run BEFORE command patterns so the prompt names the
     # specific protected path. Both ask by default; an entry can opt into a
     # hard block with `block: true`.
 
+    mentioned = path_mentions(config).find(command)
+
     # 1. Zero-access paths: match ANY mention
-    for entry in zero_access_paths:
-        zero_path, blk = _path_and_block(entry)
-        if is_glob_pattern(zero_path):
-            glob_regex = glob_to_regex(zero_path) + _GLOB_BOUNDARY
-            try:
-                if re.search(glob_regex, command, re.IGNORECASE):
-                    _decide_path(blk, f"zero-access pattern {zero_path}", command)
-            except re.error:
-                continue
-        else:
-            expanded = str(Path(zero_path).expanduser())
-            # Path() strips trailing slashes; preserve them so directory
-            # patterns like "secrets/" don't match the bare word "secrets"
-            # inside commit messages or other free-form text.
-            if zero_path.endswith("/") and not expanded.endswith("/"):
-                expanded += "/"
-            escaped_expanded = re.escape(expanded)
-            escaped_original = re.escape(zero_path)
-            # Use path-component boundary to avoid matching inside
-            # longer names (e.g. "secrets/" inside "external-secrets/").
-            # Absolute paths already start with "/" so the boundary is
-            # implicit; relative paths need an explicit anchor.
-            if expanded.startswith("/"):
-                exp_pat = escaped_expanded
-                orig_pat = escaped_original
-            else:
-                boundary = r"(?:^|(?<=\s)|(?<=/))"
-                exp_pat = boundary + escaped_expanded
-                orig_pat = boundary + escaped_original
-            if re.search(exp_pat, command) or re.search(orig_pat, command):
-                _decide_path(blk, f"zero-access path {zero_path}", command)
+    for index in mentioned["zeroAccessPaths"]:
+        zero_path, blk = _path_and_block(zero_access_paths[index])
+        reason = zero_access_mention(command, zero_path)
+        if reason is not None:
+            return _ask_or_block(blk, reason, f"zeroAccessPaths[{index}]", command)
+
+    # Steps 2 and 3 only try the operations the command can contain; with
+    # none (the common read-only command) both are skipped.
+    read_only_ops = operation_gate(config).present(command)
+    no_delete_ops = [op for op in read_only_ops if op in NO_DELETE_BLOCKED]
 
     # 2. Read-only paths: modifications
-    for entry in read_only_paths:
-        readonly, blk = _path_and_block(entry)
+    for index in mentioned["readOnlyPaths"] if read_only_ops else ():
+        readonly, blk = _path_and_block(read_only_paths[index])
         matched, reason = check_path_patterns(
-            command, readonly, READ_ONLY_BLOCKED, "read-only path"
+            command, readonly, read_only_ops, "read-only path"
         )
         if matched:
-            _decide_path(blk, reason, command)
+            return _ask_or_block(blk, reason, f"readOnlyPaths[{index}]", command)
 
     # 3. No-delete paths: deletions only
-    for entry in no_delete_paths:
-        no_delete, blk = _path_and_block(entry)
+    for index in mentioned["noDeletePaths"] if no_delete_ops else ():
+        no_delete, blk = _path_and_block(no_delete_paths[index])
         matched, reason = check_path_patterns(
-            command, no_delete, NO_DELETE_BLOCKED, "no-delete path"
+            command, no_delete, no_delete_ops, "no-delete path"
         )
         if matched:
-            _decide_path(blk, reason, command)
+            return _ask_or_block(blk, reason, f"noDeletePaths[{index}]", command)
 
     # 4. Command patterns from YAML: ask by default so the user stays in the
     # loop on side-effecting commands; `block: true` opts into a hard block.
-    for item in patterns:
-        pattern = item.get("pattern", "")
-        reason = item.get("reason", "Matched damage-control pattern")
-        should_block = item.get("block", False)
+    rule = bash_matcher(config).first(command)
+    if rule is not None:
+        return _ask_or_block(
+            rule.block, rule.reason, f"bashToolPatterns[{rule.index}]", command
+        )
 
-        # Expand {name} shorthand placeholders
-        pattern = _expand_shorthands(pattern, shorthands)
+    return ALLOW
 
-        if not item.get("match_anywhere", False):
-            pattern = _CMD_POSITION_PREFIX + pattern
 
-        try:
-            if re.search(pattern, command, re.IGNORECASE):
-                if should_block:
-                    _block(f"Blocked: {reason}", command)
-                _ask(reason)
-        except re.error:
-            continue
+def evaluate_edit(tool_input: dict[str, Any], config: dict[str, Any]) -> Decision:
+    """Edit tool: gate zero-access and read-only paths."""
+    return _evaluate_path(
+        tool_input.get("file_path", ""),
+        config,
+        "edit to",
+        ("zeroAccessPaths", "readOnlyPaths"),
+    )
 
-    sys.exit(0)
 
+def evaluate_write(tool_input: dict[str, Any], config: dict[str, Any]) -> Decision:
+    """Write tool: gate zero-access and read-only paths."""
+    return _evaluate_path(
+        tool_input.get("file_path", ""),
+        config,
+        "write to",
+        ("zeroAccessPaths", "readOnlyPaths"),
+    )
 
-def handle_edit(tool_input: dict[str, Any], config: dict[str, Any]) -> None:
-    """Handle Edit tool: gate zero-access and read-only paths."""
-    file_path = tool_input.get("file_path", "")
-    if not file_path:
-        sys.exit(0)
 
-    for entry in config.get("zeroAccessPaths", []):
-        zero_path, blk = _path_and_block(entry)
-        if match_path(file_path, zero_path):
-            _decide_path(blk, f"edit to zero-access path {zero_path}", file_path)
+def evaluate_read(tool_input: dict[str, Any], config: dict[str, Any]) -> Decision:
+    """Read tool: gate zero-access paths only (reads of read-only are fine)."""
+    return _evaluate_path(
+        tool_input.get("file_path", ""), config, "read of", ("zeroAccessPaths",)
+    )
 
-    for entry in config.get("readOnlyPaths", []):
-        readonly, blk = _path_and_block(entry)
-        if match_path(file_path, readonly):
-            _decide_path(blk, f"edit to read-only path {readonly}", file_path)
 
-    sys.exit(0)
+def evaluate_grep(tool_input: dict[str, Any], config: dict[str, Any]) -> Decision:
+    """Grep tool: gate searching in zero-access paths."""
+    return _evaluate_path(
+        tool_input.get("path", ""), config, "grep in", ("zeroAccessPaths",)
+    )
 
 
-def handle_write(tool_input: dict[str, Any], config: dict[str, Any]) -> None:
-    """Handle Write tool: gate zero-access and read-only paths."""
-    file_path = tool_input.get("file_path", "")
-    if not file_path:
-        sys.exit(0)
+_PATH_LABELS = {"zeroAccessPaths": "zero-access", "readOnlyPaths": "read-only"}
 
-    for entry in config.get("zeroAccessPaths", []):
-        zero_path, blk = _path_and_block(entry)
-        if match_path(file_path, zero_path):
-            _decide_path(blk, f"write to zero-access path {zero_path}", file_path)
 
-    for entry in config.get("readOnlyPaths", []):
-        readonly, blk = _path_and_block(entry)
-        if match_path(file_path, readonly):
-            _decide_path(blk, f"write to read-only path {readonly}", file_path)
+def _evaluate_path(
+    path: str, config: dict[str, Any], verb: str, keys: tuple[str, ...]
+) -> Decision:
+    """The first of the *keys* path lists with an entry matching *path*."""
+    if not path:
+        return ALLOW
+    for key in keys:
+        hit = path_policy(config, key).first(path)
+        if hit is not None:
+            reason = f"{verb} {_PATH_LABELS[key]} path {hit.path}"
+            return _ask_or_block(hit.block, reason, f"{key}[{hit.index}]", path)
+    return ALLOW
 
-    sys.exit(0)
 
+def _path_and_block(entry: Any) -> tuple[str, bool]:
+    """Normalize a path entry: a bare string asks; {path, block} can hard-block."""
+    if isinstance(entry, dict):
+        return entry.get("path", ""), bool(entry.get("block", False))
+    return entry, False
 
-def handle_read(tool_input: dict[str, Any], config: dict[str, Any]) -> None:
-    """Handle Read tool: gate zero-access paths only (reads of read-only are fine)."""
-    file_path = tool_input.get("file_path", "")
-    if not file_path:
-        sys.exit(0)
 
-    for entry in config.get("zeroAccessPaths", []):
-        zero_path, blk = _path_and_block(entry)
-        if match_path(file_path, zero_path):
-            _decide_path(blk, f"read of zero-access path {zero_path}", file_path)
+def _ask_or_block(block: bool, reason: str, rule: str, target: str) -> Decision:
+    """Hard-block when the entry opts in, otherwise ask."""
+    return Decision("block" if block else "ask", reason, rule, target)
 
-    sys.exit(0)
+
+# ============================================================================
+# TOOL HANDLERS
+# ============================================================================
+
+# The hook's view of the evaluators: report the decision and exit.
+
+
+def handle_bash(tool_input: dict[str, Any], config: dict[str, Any]) -> None:
+    """Handle Bash tool: report evaluate_bash() and exit."""
+    _report(evaluate_bash(tool_input, config))
+
+
+def handle_edit(tool_input: dict[str, Any], config: dict[str, Any]) -> None:
+    """Handle Edit tool: report evaluate_edit() and exit."""
+    _report(evaluate_edit(tool_input, config))
+
+
+def handle_write(tool_input: dict[str, Any], config: dict[str, Any]) -> None:
+    """Handle Write tool: report evaluate_write() and exit."""
+    _report(evaluate_write(tool_input, config))
+
+
+def handle_read(tool_input: dict[str, Any], config: dict[str, Any]) -> None:
+    """Handle Read tool: report evaluate_read() and exit."""
+    _report(evaluate_read(tool_input, config))
 
 
 def handle_grep(tool_input: dict[str, Any], config: dict[str, Any]) -> None:
-    """Handle Grep tool: gate searching in zero-access paths."""
-    search_path = tool_input.get("path", "")
-    if not search_path:
-        sys.exit(0)
+    """Handle Grep tool: report evaluate_grep() and exit."""
+    _report(evaluate_grep(tool_input, config))
 
-    for entry in config.get("zeroAccessPaths", []):
-        zero_path, blk = _path_and_block(entry)
-        if match_path(search_path, zero_path):
-            _decide_path(blk, f"grep in zero-access path {zero_path}", search_path)
 
-    sys.exit(0)
+def _report(decision: Decision) -> None:
+    """Write *decision* the way the hook reports it and exit with its code."""
+    code, stdout, stderr = decision.output()
+    sys.stdout.write(stdout)
+    sys.stderr.write(stderr)
+    sys.exit(code)
 
 
 # ============================================================================
-# OUTPUT HELPERS
+# DECISION MEMO
 # ============================================================================
 
+# Agents repeat themselves: `git status`, `pytest -q` and re-reads of the
+# same files make up most tool calls. A decision depends only on the policy
+# (policy_key()) and on the one input field its handler reads, so main()
+# keeps recent decisions in a small JSON file beside the pattern cache. A
+# hit costs the policy check a warm call makes anyway, one read of that
+# file and a dict lookup.
+_DECISION_FIELDS = {
+    "Bash": "command",
+    "Edit": "file_path",
+    "Write": "file_path",
+    "Read": "file_path",
+    "Grep": "path",
+}
+_DECISION_ENTRIES = 256
+_DECISION_MAX_AGE = 24 * 3600.0
+# A hit rewrites the file to renew its entry only this long after the last
+# renewal, so a burst of repeats costs no writes.
+_DECISION_REFRESH = 60.0
 
-def _block(reason: str, context: str) -> None:
-    """Print block message to stderr and exit with code 2."""
-    truncated = context[:100] + "..." if len(context) > 100 else context
-    print(f"SECURITY: {reason}", file=sys.stderr)
-    print(f"Target: {truncated}", file=sys.stderr)
-    sys.exit(2)
 
+def decision_key(input_data: dict[str, Any]) -> str:
+    """Hash of the tool name and the input field its handler decides on."""
+    import hashlib
 
-def _ask(reason: str) -> None:
-    """Emit an "ask" permission decision and exit 0."""
-    output = {
-        "hookSpecificOutput": {
-            "hookEventName": "PreToolUse",
-            "permissionDecision": "ask",
-            "permissionDecisionReason": reason,
-        }
-    }
-    print(json.dumps(output))
-    sys.exit(0)
+    tool_name = input_data.get("tool_name", "")
+    tool_input = input_data.get("tool_input", {})
+    field = _DECISION_FIELDS.get(tool_name, "")
+    value = tool_input.get(field) if isinstance(tool_input, dict) else None
+    text = json.dumps([tool_name, value], sort_keys=True)
+    return hashlib.sha256(text.encode()).hexdigest()[:32]
 
 
-def _path_and_block(entry: Any) -> tuple[str, bool]:
-    """Normalize a path entry: a bare string asks; {path, block} can hard-block."""
-    if isinstance(entry, dict):
-        return entry.get("path", ""), bool(entry.get("block", False))
-    return entry, False
+def _user_cache_dir() -> Path | None:
+    """$XDG_CACHE_HOME/damage-control (default ~/.cache/damage-control).
+
+    Created with mode 0700. Unlike the shared temp dir, no other user can
+    plant a file there. None if it cannot be created, or if it is not ours
+    and private.
+    """
+    base = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    directory = Path(base) / "damage-control"
+    try:
+        try:
+            st = directory.stat()
+        except FileNotFoundError:
+            directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+            st = directory.stat()
+    except OSError:
+        return None
+    if hasattr(os, "getuid") and st.st_uid != os.getuid():
+        return None
+    if st.st_mode & 0o077:
+        return None
+    return directory
+
+
+class DecisionMemo:
+    """Recent decisions (exit code, stdout, stderr) under one policy.
+
+    The file maps decision_key() to [code, stdout, stderr, last used] for
+    the policy it names; under any other policy it reads as empty and the
+    next store replaces it, so editing a pattern file drops every entry.
+    Entries expire after _DECISION_MAX_AGE and the least recently used go
+    beyond _DECISION_ENTRIES. Writers publish atomically under a lock they
+    do not wait for: one that finds it taken skips its update.
+
+    It replays allow decisions, so it lives in the private
+    _user_cache_dir(), not beside the pattern cache in the shared temp dir.
+    """
+
+    def __init__(self, path: Path, policy: str) -> None:
+        self.path = path
+        self.policy = policy
+
+    @classmethod
+    def active(cls) -> DecisionMemo | None:
+        """The memo of the active patterns dir; None without a current cache."""
+        patterns_dir = get_patterns_dir()
+        if patterns_dir is None:
+            return None
+        policy = policy_key(patterns_dir)
+        if policy is None:
+            return None
+        directory = _user_cache_dir()
+        if directory is None:
+            return None
+        name = _cache_file(patterns_dir).with_suffix(".decisions.json").name
+        return cls(directory / name, policy)
+
+    def _entries(self) -> dict[str, list[Any]]:
+        data = _read_cache(self.path)
+        if isinstance(data, dict) and data.get("policy") == self.policy:
+            entries = data.get("entries")
+            if isinstance(entries, dict):
+                return entries
+        return {}
+
+    def get(self, key: str) -> tuple[int, str, str] | None:
+        """The decision remembered for *key*, if any and not expired."""
+        try:
+            code, stdout, stderr, used = self._entries()[key]
+            age = time.time() - used
+        except (KeyError, TypeError, ValueError):
+            return None
+        if age > _DECISION_MAX_AGE:
+            return None
+        if age > _DECISION_REFRESH:
+            self.put(key, (code, stdout, stderr))
+        return code, stdout, stderr
+
+    def put(self, key: str, decision: tuple[int, str, str]) -> None:
+        """Remember *decision* for *key*, evicting expired and surplus entries."""
+        with _rebuild_lock(self.path, wait=0) as locked:
+            if locked is False:
+                return
+            now = time.time()
+            entries = self._entries()
+            entries[key] = [*decision, now]
+            live = [
+                item
+                for item in entries.items()
+                if isinstance(item[1], list)
+                and len(item[1]) == 4
+                and now - item[1][3] <= _DECISION_MAX_AGE
+            ]
+            live.sort(key=lambda item: item[1][3], reverse=True)
+            data = {"policy": self.policy, "entries": dict(live[:_DECISION_ENTRIES])}
+            _publish(self.path, json.dumps(data).encode())
 
 
-def _decide_path(block: bool, reason: str, context: str) -> None:
-    """Hard-block when the entry opts in, otherwise ask. Exits the process."""
-    if block:
-        _block(f"Blocked: {reason}", context)
-    _ask(reason)
+# ============================================================================
+# HOOK PAYLOAD
+# ============================================================================
+
+# A Write payload carries the whole file as `content` and an Edit payload
+# its old and new strings: megabytes when an agent writes a generated file.
+# The handlers read one field each (_DECISION_FIELDS), so read_payload()
+# scans the payload in chunks and decodes only tool_name and those fields;
+# every other value is stepped over without becoming a Python object.
+_PAYLOAD_FIELDS = frozenset(_DECISION_FIELDS.values())
+# Small chunks keep the masking passes of _skip_string() in the CPU cache:
+# 8 kB scans a 1 MB payload about four times faster than 1 MB chunks.
+_PAYLOAD_CHUNK = 1 << 13
+_STRUCTURE_RE = re.compile(rb'["{}\[\]]')
+_SCALAR_END_RE = re.compile(rb"[\s,:\]}]")
+_WHITESPACE = b" \t\n\r"
+
+
+class _PayloadScanner:
+    """Just enough of a JSON reader to pick fields out of a byte stream.
+
+    Values that are kept, and skipped scalars, are checked by json.loads();
+    skipped strings, objects and arrays only as far as finding their end
+    needs. Bytes before the current value are
+    dropped as chunks are read, so memory stays at about one chunk plus the
+    kept values whatever the payload size.
+    """
+
+    def __init__(self, stream: Any) -> None:
+        self._stream = stream
+        self._buf = b""
+        self._pos = 0
+        self._mark: int | None = None
+        self._offset = 0  # payload offset of _buf[0], for error messages
+
+    def _fill(self) -> bool:
+        data = self._stream.read(_PAYLOAD_CHUNK)
+        start = self._pos if self._mark is None else self._mark
+        self._offset += start
+        self._buf = self._buf[start:] + data
+        self._pos -= start
+        if self._mark is not None:
+            self._mark = 0
+        return bool(data)
+
+    def _error(self, message: str) -> json.JSONDecodeError:
+        return json.JSONDecodeError(message, "", self._offset + self._pos)
+
+    def _peek(self) -> bytes:
+        """The next non-whitespace byte, b"" at the end of the payload."""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos : self._pos + 1]
+            if not self._fill():
+                return b""
+
+    def _expect(self, char: bytes) -> None:
+        if self._peek() != char:
+            raise self._error(f"Expecting {char.decode()!r}")
+        self._pos += 1
+
+    def _skip_string(self) -> None:
+        """Move past a string whose opening quote has been consumed."""
+        while True:
+            # With every escaped backslash and quote masked, the first quote
+            # left closes the string; masking keeps offsets unchanged.
+            window = self._buf[self._pos :].replace(b"\\\\", b"..")
+            end = window.replace(b'\\"', b"..").find(b'"')
+            if end >= 0:
+                self._pos += end + 1
+                return
+            # A lone backslash at the end escapes the first byte of the next
+            # chunk: leave it to be scanned again with that byte.
+            self._pos += len(window) - window.endswith(b"\\")
+            if not self._fill():
+                raise self._error("Unterminated string")
+
+    def _skip_value(self) -> None:
+        char = self._peek()
+        if char == b'"':
+            self._pos += 1
+            self._skip_string()
+        elif char in (b"{", b"["):
+            depth = 0
+            while True:
+                match = _STRUCTURE_RE.search(self._buf, self._pos)
+                if match is None:
+                    self._pos = len(self._buf)
+                    if not self._fill():
+                        raise self._error("Unterminated value")
+                    continue
+                self._pos = match.end()
+                if match.group() == b'"':
+                    self._skip_string()
+                elif match.group() in b"{[":
+                    depth += 1
+                else:
+                    depth -= 1
+                    if depth == 0:
+                        return
+        elif char:
+            # Scalars are short: keep this one in the buffer and check it.
+            outer = self._mark
+            if outer is None:
+                self._mark = self._pos
+            start = self._pos - self._mark
+            try:
+                while True:
+                    match = _SCALAR_END_RE.search(self._buf, self._pos)
+                    if match is not None:
+                        self._pos = match.start()
+                        break
+                    self._pos = len(self._buf)
+                    if not self._fill():
+                        break
+                scalar = self._buf[self._mark + start : self._pos]
+            finally:
+                self._mark = outer
+            try:
+                json.loads(scalar)
+            except ValueError:
+                raise self._error("Invalid value") from None
+        else:
+            raise self._error("Expecting value")
+
+    def _value(self) -> Any:
+        self._peek()
+        self._mark = self._pos
+        try:
+            self._skip_value()
+            raw = self._buf[self._mark : self._pos]
+        finally:
+            self._mark = None
+        return json.loads(raw)
+
+    def _members(self) -> Iterator[str]:
+        """Keys of the object at the current position, leaving each value next."""
+        self._expect(b"{")
+        if self._peek() == b"}":
+            self._pos += 1
+            return
+        while True:
+            if self._peek() != b'"':
+                raise self._error("Expecting property name enclosed in double quotes")
+            key = self._value()
+            self._expect(b":")
+            yield key
+            char = self._peek()
+            self._pos += 1
+            if char == b"}":
+                return
+            if char != b",":
+                raise self._error("Expecting ',' delimiter")
+
+    def payload(self) -> dict[str, Any]:
+        """tool_name and the _PAYLOAD_FIELDS of tool_input; the rest skipped."""
+        if self._peek() != b"{":
+            raise self._error("Expecting object")
+        data: dict[str, Any] = {}
+        for key in self._members():
+            if key == "tool_name":
+                data[key] = self._value()
+            elif key == "tool_input" and self._peek() == b"{":
+                tool_input: dict[str, Any] = {}
+                for field in self._members():
+                    if field in _PAYLOAD_FIELDS:
+                        tool_input[field] = self._value()
+                    else:
+                        self._skip_value()
+                data[key] = tool_input
+            else:
+                self._skip_value()
+        if self._peek():
+            raise self._error("Extra data")
+        return data
+
+
+def read_payload(stream: Any) -> dict[str, Any]:
+    """The parts of a hook payload the handlers read (see _PayloadScanner).
+
+    Raises json.JSONDecodeError when the payload is not a JSON object.
+    """
+    binary = getattr(stream, "buffer", None)
+    if binary is None:  # a text stream without a byte layer (tests, daemon)
+        binary = io.BytesIO(stream.read().encode())
+    return _PayloadScanner(binary).payload()
 
 
 # ============================================================================
 # MAIN DISPATCHER
 # ============================================================================
 
+EVALUATORS = {
+    "Bash": evaluate_bash,
+    "Edit": evaluate_edit,
+    "Write": evaluate_write,
+    "Read": evaluate_read,
+    "Grep": evaluate_grep,
+}
+
 HANDLERS = {
     "Bash": handle_bash,
     "Edit": handle_edit,
@@ -610,11 +2500,74 @@ HANDLERS = {
 }
 
 
+# Cache sections (see _SECTIONS) each handler reads; main() loads only
+# those, after it knows the tool.
+_TOOL_SECTIONS = {
+    "Bash": (
+        _RULES_SECTION,
+        "zeroAccessPaths",
+        "readOnlyPaths",
+        "noDeletePaths",
+        "mentions",
+    ),
+    "Edit": ("zeroAccessPaths", "readOnlyPaths"),
+    "Write": ("zeroAccessPaths", "readOnlyPaths"),
+    "Read": ("zeroAccessPaths",),
+    "Grep": ("zeroAccessPaths",),
+}
+
+
 def main() -> None:
-    config = load_config()
+    if _current_caches is None:
+        _hook_call(begin=True)
+    try:
+        _main()
+    finally:
+        _hook_call(begin=False)
+
+
+def _main() -> None:
+    input_data = _read_input(sys.stdin)
+    sections = _TOOL_SECTIONS.get(input_data.get("tool_name", ""))
+    if sections is None:
+        sys.exit(0)
+    key = decision_key(input_data)
+    memo = DecisionMemo.active()
+    decision = memo.get(key) if memo is not None else None
+    if decision is None:
+        decision = _decide(input_data, sections)
+        memo = memo or DecisionMemo.active()  # a cold call built the cache
+        if memo is not None:
+            memo.put(key, decision)
+    code, stdout, stderr = decision
+    sys.stdout.write(stdout)
+    sys.stderr.write(stderr)
+    sys.exit(code)
+
+
+def _decide(input_data: dict[str, Any], sections: Any) -> tuple[int, str, str]:
+    """(exit code, stdout, stderr) of evaluating *input_data*."""
+    return evaluate(input_data, load_config(sections)).output()
+
+
+def evaluate(input_data: dict[str, Any], config: dict[str, Any]) -> Decision:
+    """Decision on one hook payload; tools without an evaluator are allowed."""
+    evaluator = EVALUATORS.get(input_data.get("tool_name", ""))
+    if evaluator is None:
+        return ALLOW
+    return evaluator(input_data.get("tool_input", {}), config)
+
 
+def _exit_code(e: SystemExit) -> int:
+    if e.code is None or isinstance(e.code, int):
+        return e.code or 0
+    return 1
+
+
+def _read_input(stream: Any) -> dict[str, Any]:
+    """Parse the hook payload; exits 1 on malformed input."""
     try:
-        input_data = json.load(sys.stdin)
+        return read_payload(stream)
     except json.JSONDecodeError as e:
         print(f"Error: Invalid JSON input: {e}", file=sys.stderr)
         sys.exit(1)
@@ -622,15 +2575,281 @@ def main() -> None:
         print(f"Error reading input: {e}", file=sys.stderr)
         sys.exit(1)
 
-    tool_name = input_data.get("tool_name", "")
-    tool_input = input_data.get("tool_input", {})
 
-    handler = HANDLERS.get(tool_name)
-    if handler:
-        handler(tool_input, config)
+def _dispatch(input_data: dict[str, Any], config: dict[str, Any]) -> None:
+    """Report the payload's decision. Always exits the process."""
+    _report(evaluate(input_data, config))
+
+
+# ============================================================================
+# DAEMON MODE
+# ============================================================================
+
+# A hook process pays interpreter startup, config loading and regex
+# compilation before it can decide anything. `serve` keeps all of that
+# resident behind a Unix domain socket; hook.py forwards payloads to it and
+# evaluates in-process whenever it cannot get an answer. One JSON line each
+# way per connection:
+#   -> {"payload": "<raw hook stdin>", "project_dir": "<$CLAUDE_PROJECT_DIR>"}
+#   <- {"code": <exit code>, "stdout": "...", "stderr": "..."}
+
+
+def socket_path() -> Path:
+    """Daemon socket: $DAMAGE_CONTROL_SOCKET, else in the per-user runtime dir.
+
+    hook.py duplicates this lookup so the client never imports this module
+    on the fast path; keep the two in sync.
+    """
+    override = os.environ.get("DAMAGE_CONTROL_SOCKET")
+    if override:
+        return Path(override)
+    runtime_dir = (
+        os.environ.get("XDG_RUNTIME_DIR") or os.environ.get("TMPDIR") or "/tmp"  # noqa: S108
+    )
+    return Path(runtime_dir) / f"damage-control-{os.getuid()}.sock"
+
+
+class _ThreadLocalStream:
+    """sys.stdout/sys.stderr stand-in that writes to the calling thread's buffer.
+
+    Handlers report decisions by printing and exiting; routing the streams
+    per thread lets concurrent requests run those handlers unchanged.
+    """
+
+    def __init__(self, default: Any) -> None:
+        import threading
+
+        self._local = threading.local()
+        self._default = default
+
+    def bind(self, buffer: Any) -> None:
+        self._local.buffer = buffer
+
+    def _target(self) -> Any:
+        buffer = getattr(self._local, "buffer", None)
+        return self._default if buffer is None else buffer
+
+    def write(self, text: str) -> int:
+        return self._target().write(text)
+
+    def flush(self) -> None:
+        self._target().flush()
+
+
+def _config_source(project_dir: str) -> tuple[Path, Path | None]:
+    """The config source for *project_dir*: (source, patterns dir or None)."""
+    patterns_dir = get_patterns_dir(project_dir)
+    if patterns_dir is not None:
+        return patterns_dir, patterns_dir
+    return get_config_path(project_dir), None
+
+
+def _config_stamp(source: Path, patterns_dir: Path | None) -> Any:
+    """Stats taken before loading *source*, for _stamp_current() to check.
+
+    A patterns dir gets the manifest its cache header would carry, so a
+    resident config costs what a warm cache hit does: one stat per entry.
+    """
+    if patterns_dir is not None:
+        try:
+            return _manifest(patterns_dir, _pattern_files(patterns_dir))
+        except OSError:
+            return None
+    try:
+        st = source.stat()
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _stamp_current(source: Path, patterns_dir: Path | None, stamp: Any) -> bool:
+    """True if nothing *stamp* (from _config_stamp()) recorded changed."""
+    if patterns_dir is not None:
+        return _manifest_current(stamp)
+    return _config_stamp(source, None) == stamp
+
+
+def _make_server(path: Path | None = None) -> Any:
+    """Bind the daemon socket and return a threading server (not yet serving).
+
+    Configs stay resident per source (patterns dir or patterns.yaml) and are
+    reloaded when a pattern file's size or mtime changes, or a pattern file
+    or directory is added or removed (_stamp_current()).
+    """
+    import socket
+    import socketserver
+    import threading
+
+    path = path or socket_path()
+    if path.exists():
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(str(path))
+        except OSError:
+            try:
+                path.unlink()  # stale socket from a daemon that did not clean up
+            except OSError as e:
+                print(f"Error: cannot remove stale socket {path}: {e}", file=sys.stderr)
+                sys.exit(1)
+        else:
+            print(f"Error: daemon already listening on {path}", file=sys.stderr)
+            sys.exit(1)
+        finally:
+            probe.close()
+
+    lock = threading.Lock()
+    resident: dict[str, tuple[Any, dict[str, Any]]] = {}
+
+    def config_for(project_dir: str) -> dict[str, Any]:
+        source, patterns_dir = _config_source(project_dir)
+        with lock:
+            cached = resident.get(str(source))
+            if cached is not None and _stamp_current(source, patterns_dir, cached[0]):
+                return cached[1]
+            stamp = _config_stamp(source, patterns_dir)
+            if patterns_dir is not None:
+                config = load_patterns_dir(patterns_dir)
+            else:
+                config = load_config_file(source)
+            if cached is not None:
+                _reset_compiled()  # drop regexes of the replaced patterns
+            resident[str(source)] = (stamp, config)
+            return config
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            try:
+                request = json.loads(self.rfile.readline())
+                payload = request["payload"]
+                project_dir = request.get("project_dir") or ""
+            except (ValueError, KeyError, TypeError):
+                return  # no answer: the client falls back to in-process
+
+            out, err = io.StringIO(), io.StringIO()
+            sys.stdout.bind(out)
+            sys.stderr.bind(err)
+            try:
+                code = _run_captured(payload, lambda: config_for(project_dir))
+            finally:
+                sys.stdout.bind(None)
+                sys.stderr.bind(None)
+            response = {
+                "code": code,
+                "stdout": out.getvalue(),
+                "stderr": err.getvalue(),
+            }
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+
+    class Server(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+        # Parallel tool calls and agent teams connect in bursts; the default
+        # backlog of 5 would turn a burst into in-process fallbacks.
+        request_queue_size = 128
+
+    old_umask = os.umask(0o177)  # socket is created 0600: owner-only
+    try:
+        return Server(str(path), Handler)
+    finally:
+        os.umask(old_umask)
+
+
+def _run_captured(payload: str, config_for: Any) -> int:
+    """Evaluate one payload the way main() would, returning its exit code."""
+    try:
+        config = config_for()
+        _dispatch(_read_input(io.StringIO(payload)), config)
+    except SystemExit as e:
+        return _exit_code(e)
+    return 0
+
+
+def serve() -> None:
+    """Run the daemon in the foreground until interrupted or terminated."""
+    import signal
+
+    server = _make_server()
+    path = Path(server.server_address)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    sys.stdout = _ThreadLocalStream(sys.stdout)
+    sys.stderr = _ThreadLocalStream(sys.stderr)
+    print(f"damage-control: listening on {path}", file=sys.__stderr__)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        path.unlink(missing_ok=True)
+
+
+def compile_patterns() -> None:
+    """Rebuild the compiled-rule cache for the active patterns directory."""
+    patterns_dir = get_patterns_dir()
+    if patterns_dir is None:
+        print("Error: no patterns/ directory to compile", file=sys.stderr)
+        sys.exit(1)
+    files = _pattern_files(patterns_dir)
+    cache_file, key = _cache_paths(patterns_dir, files)
+    # Publishing is atomic, so this writes even if the lock wait times out.
+    with _rebuild_lock(cache_file):
+        config = _rebuild_cache(patterns_dir, files, cache_file, key)
+    ir = config[_IR_KEY]
+    unreachable = unreachable_entries(config)
+    left_out = sum(len(v) for v in unreachable.values())
+    kept = {record[0] for record in ir["bash"]}
+    broken = sum(
+        index not in kept and index not in unreachable["bashToolPatterns"]
+        for index in range(len(config["bashToolPatterns"]))
+    )
+    paths = sum(len(config[key]) - len(unreachable[key]) for key in _BASH_PATH_KEYS)
+    print(
+        f"damage-control: compiled {len(ir['bash'])} command patterns and "
+        f"{paths} path entries from {len(files)} files -> {cache_file}"
+    )
+    if left_out or broken:
+        print(
+            f"damage-control: left out {left_out} unreachable entries and "
+            f"{broken} patterns that do not compile; `uv run lint.py` lists them",
+            file=sys.stderr,
+        )
+
+
+def batch() -> None:
+    """Decide the JSON-lines hook payloads on stdin, one result line each.
+
+    The config is loaded, and its rules compiled, once for the whole stream.
+    A line that is not a payload gets {"error": ...} and the rest go on.
+    """
+    config = load_config()
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            input_data = json.loads(line)
+            decision = evaluate(input_data, config)
+        except Exception as e:
+            result: dict[str, Any] = {"error": f"{type(e).__name__}: {e}"}
+        else:
+            result = {
+                "action": decision.action,
+                "reason": decision.reason,
+                "rule": decision.rule,
+            }
+        sys.stdout.write(json.dumps(result) + "\n")
+        sys.stdout.flush()
+
+
+def run(argv: list[str]) -> None:
+    """Command line of damage_control.py and launcher.py."""
+    if argv == ["serve"]:
+        serve()
+    elif argv == ["compile"]:
+        compile_patterns()
+    elif argv == ["batch"]:
+        batch()
     else:
-        sys.exit(0)
+        main()
 
 
 if __name__ == "__main__":
-    main()
+    run(sys.argv[1:])
@@ -0,0 +1,316 @@
+# /// script
+# requires-python = ">=3.8"
+# dependencies = ["pyyaml"]
+# ///
+"""
+Differential check of damage_control.evaluate() against reference.py.
+
+Every input is decided by both engines, and any difference in action,
+reason, rule or target is a divergence. Inputs come from:
+
+  the test corpus   the tool inputs in tests/ (benchmarks/corpus.py)
+  fuzzing           corpus commands and the config's own paths, spliced and
+                    mutated (separators, prefixes, quoting, case, globs
+                    filled in, path components added or normalized away)
+  transcripts       the calls recorded in session logs (replay.py)
+
+A divergence is shrunk, token by token and then character by character,
+to a short input that still diverges, and reported as a line that can be
+pasted into a test: `assert_equivalent("Bash", "...")`.
+
+tests/test_equivalence.py runs the corpus and a fixed amount of fuzzing
+(`pytest -m equivalence`). Run alone, this script fuzzes until a divergence
+or the time limit, across a process pool; each batch is generated from
+(seed, batch number), so a reported batch can be generated again.
+
+Usage (from the damage-control directory):
+
+    uv run equivalence.py [--seconds N] [--seed N] [--jobs N]
+        [--transcripts DIR] [--patterns DIR]
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import os
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Iterator, NamedTuple
+
+import damage_control as dc
+import reference
+
+BATCH = 200
+
+_SEPARATORS = [" ; ", " && ", " || ", " | ", "\n", " & ", ";", "|", "\n\t"]
+_PREFIXES = ["sudo ", "env A=1 ", "time ", "nohup ", "command ", "( ", "{ ", "do "]
+_QUOTES = ['"', "'", "$(", "`"]
+
+
+class Divergence(NamedTuple):
+    tool_name: str
+    value: str
+    reference: dc.Decision
+    optimized: dc.Decision
+
+    def report(self, original: str | None = None) -> str:
+        lines = [f"{self.tool_name} input decided differently:"]
+        if original is not None and original != self.value:
+            lines.append(f"  original:  {original!r}")
+        lines += [
+            f"  input:     {self.value!r}",
+            f"  reference: {tuple(self.reference)}",
+            f"  optimized: {tuple(self.optimized)}",
+            f"  reproduce: assert_equivalent({self.tool_name!r}, {self.value!r})",
+        ]
+        return "\n".join(lines)
+
+
+def check(tool_name: str, value: str, config: dict[str, Any]) -> Divergence | None:
+    """The divergence on one input, or None when both engines agree."""
+    payload = {"tool_name": tool_name, "tool_input": {_field(tool_name): value}}
+    expected = _outcome(reference.evaluate, payload, config)
+    actual = _outcome(dc.evaluate, payload, config)
+    if actual == expected:
+        return None
+    return Divergence(tool_name, value, expected, actual)
+
+
+def _outcome(evaluate: Any, payload: dict[str, Any], config: dict[str, Any]) -> Any:
+    """The engine's Decision; an exception is an "error" Decision, so engines
+    that fail on the same input the same way agree."""
+    try:
+        return evaluate(payload, config)
+    except Exception as e:
+        return dc.Decision("error", f"{type(e).__name__}: {e}")
+
+
+def _field(tool_name: str) -> str:
+    return dc._DECISION_FIELDS[tool_name]
+
+
+def minimize(divergence: Divergence, config: dict[str, Any]) -> Divergence:
+    """A shorter input that still diverges: greedy removal of token runs,
+    then of characters."""
+    best = divergence
+    for split in (re.compile(r"(\s+)").split, list):
+        parts = split(best.value)
+        size = len(parts) // 2
+        while size:
+            start = 0
+            while start < len(parts):
+                candidate = parts[:start] + parts[start + size :]
+                found = check(best.tool_name, "".join(candidate), config)
+                if found is not None:
+                    best, parts = found, candidate
+                else:
+                    start += size
+            size //= 2
+    return best
+
+
+def assert_equivalent(
+    tool_name: str, value: str, config: dict[str, Any] | None = None
+) -> None:
+    """Fail with a minimized reproducer when the engines disagree on *value*."""
+    config = dc.load_config() if config is None else config
+    found = check(tool_name, value, config)
+    if found is not None:
+        raise AssertionError(minimize(found, config).report(value))
+
+
+def config_paths(config: dict[str, Any]) -> list[str]:
+    """Every path entry of *config*, as written."""
+    return [
+        dc._path_and_block(entry)[0]
+        for key in dc._BASH_PATH_KEYS
+        for entry in config.get(key, [])
+    ]
+
+
+class Fuzzer:
+    """Random tool inputs grown from corpus commands and the config's paths."""
+
+    def __init__(self, rng: random.Random, commands: list[str], paths: list[str]):
+        self.rng = rng
+        self.commands = commands
+        self.paths = paths
+        self.words = sorted({word for c in commands for word in c.split()})
+
+    def path(self) -> str:
+        rng = self.rng
+        path = rng.choice(self.paths)
+        # Fill in glob characters the way a real file name would.
+        path = re.sub(r"\[([^\]]+)\]", lambda m: rng.choice(m.group(1)), path)
+        path = re.sub(r"\*+", lambda _: rng.choice(["", "x", "prod", "a.b"]), path)
+        path = path.replace("?", rng.choice("aZ1."))
+        for _ in range(rng.randrange(3)):
+            mutate = rng.randrange(8)
+            if mutate == 0:
+                path = (
+                    path.rstrip("/")
+                    + "/"
+                    + rng.choice(["x", "id_rsa", ".env", "a/b.txt"])
+                )
+            elif mutate == 1 and path.startswith("~/"):
+                path = str(Path.home()) + path[1:]
+            elif mutate == 2:
+                path = path.upper() if rng.random() < 0.5 else path.swapcase()
+            elif mutate == 3:
+                path = rng.choice(["./", "../", "/", "~/", "src/"]) + path.lstrip("/")
+            elif mutate == 4:
+                path = path.replace("/", rng.choice(["//", "/./", "/x/../"]), 1)
+            elif mutate == 5:
+                path = path.rstrip("/")
+            elif mutate == 6:
+                path += rng.choice(["/", "~", ".bak", " ", "\n"])
+            else:
+                cut = rng.randrange(len(path) + 1)
+                path = path[:cut] + path[cut + 1 :]
+        return path
+
+    def command(self) -> str:
+        rng = self.rng
+        command = rng.choice(self.commands)
+        for _ in range(rng.randrange(1, 4)):
+            mutate = rng.randrange(9)
+            if mutate == 0:
+                command += rng.choice(_SEPARATORS) + rng.choice(self.commands)
+            elif mutate == 1:
+                command += " " + self.path()
+            elif mutate == 2:
+                command = rng.choice(_PREFIXES) + command
+            elif mutate == 3:
+                command = self._replace_word(command, rng.choice(self.words))
+            elif mutate == 4:
+                command = self._replace_word(command, "")
+            elif mutate == 5:
+                command = self._replace_word(command, None)
+            elif mutate == 6:
+                quote = rng.choice(_QUOTES)
+                cut = rng.randrange(len(command) + 1)
+                command = command[:cut] + quote + command[cut:]
+            elif mutate == 7:
+                command = command.replace(" ", rng.choice(["  ", "\t", " \\\n "]), 1)
+            else:
+                command = rng.choice(self.commands) + rng.choice(_SEPARATORS) + command
+        return command
+
+    def _replace_word(self, command: str, word: str | None) -> str:
+        """*command* with one word replaced by *word*; None flips its case."""
+        words = command.split(" ")
+        index = self.rng.randrange(len(words))
+        words[index] = words[index].swapcase() if word is None else word
+        return " ".join(words)
+
+    def inputs(self, count: int) -> Iterator[tuple[str, str]]:
+        for _ in range(count):
+            if self.rng.random() < 0.7:
+                yield "Bash", self.command()
+            else:
+                yield self.rng.choice(["Edit", "Write", "Read", "Grep"]), self.path()
+
+
+@functools.lru_cache(maxsize=None)
+def corpus() -> tuple[list[str], list[str]]:
+    """(commands, paths) of the test corpus."""
+    from policy_diff import corpus_inputs
+
+    inputs = list(dict.fromkeys(corpus_inputs()))
+    commands = [value for tool_name, value in inputs if tool_name == "Bash"]
+    paths = list(
+        dict.fromkeys(value for tool_name, value in inputs if tool_name != "Bash")
+    )
+    return commands, paths
+
+
+def fuzzer(seed: int, batch: int, config: dict[str, Any]) -> Fuzzer:
+    """The fuzzer for batch *batch* of a run seeded with *seed*."""
+    commands, paths = corpus()
+    rng = random.Random(f"{seed}:{batch}")  # noqa: S311
+    return Fuzzer(rng, commands, config_paths(config) + paths)
+
+
+def first_divergence(
+    inputs: Iterator[tuple[str, str]], config: dict[str, Any]
+) -> tuple[int, str | None]:
+    """(inputs checked, minimized report of the first divergence or None)."""
+    checked = 0
+    for tool_name, value in inputs:
+        checked += 1
+        found = check(tool_name, value, config)
+        if found is not None:
+            return checked, minimize(found, config).report(value)
+    return checked, None
+
+
+# Set in each worker by _init_worker().
+_config: dict[str, Any] = {}
+
+
+def _init_worker(patterns: Path | None) -> None:
+    global _config
+    _config = dc.load_config() if patterns is None else dc.load_patterns_dir(patterns)
+
+
+def _fuzz_batch(task: tuple[int, int]) -> tuple[int, str | None]:
+    seed, batch = task
+    checked, found = first_divergence(
+        fuzzer(seed, batch, _config).inputs(BATCH), _config
+    )
+    if found is not None:
+        found += f"\n  (seed {seed}, batch {batch})"
+    return checked, found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--seconds", type=float, default=0, help="0: until stopped")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--jobs", type=int, default=0, help="worker processes")
+    parser.add_argument("--transcripts", type=Path, action="append", default=[])
+    parser.add_argument("--patterns", type=Path)
+    args = parser.parse_args()
+
+    seed = random.randrange(2**32) if args.seed is None else args.seed  # noqa: S311
+    _init_worker(args.patterns)
+    from policy_diff import corpus_inputs, transcript_inputs
+
+    sources = [("test corpus", corpus_inputs())]
+    sources += [(f"transcripts {p}", transcript_inputs(p)) for p in args.transcripts]
+    for name, inputs in sources:
+        checked, found = first_divergence(
+            (item for item in dict.fromkeys(inputs) if item[0]), _config
+        )
+        print(f"{name}: {checked} inputs", flush=True)
+        if found is not None:
+            sys.exit(found)
+
+    import multiprocessing
+
+    print(f"fuzzing with seed {seed}", flush=True)
+    start = last = time.monotonic()
+    checked = batch = 0
+    jobs = args.jobs or os.cpu_count() or 1
+    with multiprocessing.Pool(jobs, _init_worker, (args.patterns,)) as pool:
+        # A few batches per worker at a time: Pool queues a whole iterable.
+        while not args.seconds or time.monotonic() - start < args.seconds:
+            tasks = [(seed, batch + i) for i in range(jobs * 4)]
+            batch += len(tasks)
+            for count, found in pool.imap_unordered(_fuzz_batch, tasks):
+                checked += count
+                if found is not None:
+                    sys.exit(found)
+            if time.monotonic() - last >= 10:
+                rate = checked / (time.monotonic() - start)
+                print(f"{checked} fuzzed inputs, {rate:.0f}/s", flush=True)
+                last = time.monotonic()
+    print(f"no divergence in {checked} fuzzed inputs (seed {seed})")
+
+
+if __name__ == "__main__":
+    main()
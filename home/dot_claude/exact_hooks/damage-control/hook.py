@@ -0,0 +1,138 @@
+# /// script
+# requires-python = ">=3.8"
+# dependencies = ["pyyaml"]
+# ///
+"""
+Damage Control Hook Client
+==========================
+
+Thin PreToolUse entry point. Forwards the hook payload to a running
+`damage_control.py serve` daemon and relays its decision verbatim (stdout,
+stderr, exit code). When no daemon answers, the payload is evaluated
+in-process by damage_control.main(), so the decision is the same either way
+and only the latency differs.
+
+settings.json runs launcher.py on every call by default. To use the
+daemon instead, keep it running (login item, tmux pane, ...); the launcher
+re-execs `serve` through `uv run`, which provides PyYAML:
+
+    python3 ~/.claude/hooks/damage-control/launcher.py serve
+
+and change the PreToolUse hook command in settings.json from launcher.py to
+`python3 ~/.claude/hooks/damage-control/hook.py`. Like launcher.py, the
+client runs under plain python3. Its in-process fallback needs PyYAML only
+when the pattern cache is not current; it then evaluates the payload
+through `uv run --script launcher.py` instead, and blocks the call (exit 2)
+when that is not possible either.
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import os
+import socket
+import sys
+from typing import NoReturn
+
+# Seconds to wait for the daemon before evaluating in-process instead; the
+# hook as a whole gets 30s in settings.json.
+_TIMEOUT = 10
+
+
+def _socket_path() -> str:
+    """Mirror of damage_control.socket_path(), kept import-light."""
+    override = os.environ.get("DAMAGE_CONTROL_SOCKET")
+    if override:
+        return override
+    runtime_dir = (
+        os.environ.get("XDG_RUNTIME_DIR") or os.environ.get("TMPDIR") or "/tmp"  # noqa: S108
+    )
+    return os.path.join(runtime_dir, f"damage-control-{os.getuid()}.sock")  # noqa: PTH118
+
+
+def forward(payload: str, path: str | None = None) -> tuple[int, str, str] | None:
+    """Ask the daemon for a decision; None when it is unavailable."""
+    path = path or _socket_path()
+    request = {
+        "payload": payload,
+        "project_dir": os.environ.get("CLAUDE_PROJECT_DIR", ""),
+    }
+    try:
+        # Only trust a socket we own: in a shared /tmp another user could
+        # otherwise plant one that answers "allow" to everything.
+        if os.stat(path).st_uid != os.getuid():  # noqa: PTH116
+            return None
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(_TIMEOUT)
+            sock.connect(path)
+            sock.sendall(json.dumps(request).encode() + b"\n")
+            with sock.makefile("rb") as reader:
+                response = json.loads(reader.readline())
+        return int(response["code"]), response["stdout"], response["stderr"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _block(message: str) -> NoReturn:
+    """Block the call: exit 1 would let it run unchecked."""
+    print(f"SECURITY: {message}", file=sys.stderr)
+    sys.exit(2)
+
+
+def _relay(code: int, stdout: str, stderr: str) -> NoReturn:
+    sys.stdout.write(stdout)
+    sys.stderr.write(stderr)
+    sys.exit(code)
+
+
+def _evaluate_under_uv(payload: str) -> NoReturn:
+    """Evaluate *payload* through `uv run` of launcher.py, which provides PyYAML."""
+    import subprocess
+
+    here = os.path.dirname(os.path.abspath(__file__))  # noqa: PTH100, PTH120
+    launcher = os.path.join(here, "launcher.py")  # noqa: PTH118
+    env = {**os.environ, "DAMAGE_CONTROL_UV": "1"}
+    try:
+        result = subprocess.run(  # noqa: S603
+            ["uv", "run", "--script", launcher],  # noqa: S607
+            check=False,
+            input=payload,
+            capture_output=True,
+            text=True,
+            env=env,
+        )
+    except OSError as e:
+        _block(f"cannot evaluate without PyYAML or uv: {e}")
+    _relay(result.returncode, result.stdout, result.stderr)
+
+
+def evaluate(payload: str) -> None:
+    """Evaluate *payload* in-process, the way launcher.py would."""
+    import damage_control
+
+    if damage_control.needs_yaml():
+        try:
+            import yaml  # noqa: F401
+        except ImportError:
+            _evaluate_under_uv(payload)
+    sys.stdin = io.StringIO(payload)
+    try:
+        damage_control.main()
+    except ModuleNotFoundError as e:
+        if e.name != "yaml":
+            raise
+        _block("pattern files changed during this call")
+
+
+def main() -> None:
+    payload = sys.stdin.read()
+    result = forward(payload)
+    if result is None:
+        evaluate(payload)
+        return
+    _relay(*result)
+
+
+if __name__ == "__main__":
+    main()
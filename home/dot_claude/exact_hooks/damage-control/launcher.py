@@ -0,0 +1,44 @@
+# /// script
+# requires-python = ">=3.8"
+# dependencies = ["pyyaml"]
+# ///
+"""PreToolUse entry point: damage_control.py, from cached bytecode.
+
+Takes the same arguments as damage_control.py (`serve`, `compile`,
+`batch`). Runs under plain python3 while the pattern cache is current and
+re-execs itself through `uv run`, which provides PyYAML, when it has
+patterns to parse.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+
+import damage_control
+
+
+def _reexec_under_uv(argv: list[str]) -> None:
+    """Replace this process with `uv run` of this script if PyYAML is missing."""
+    try:
+        import yaml  # noqa: F401
+    except ImportError:
+        if os.environ.get("DAMAGE_CONTROL_UV"):
+            sys.exit("damage-control: PyYAML is missing even under uv run")
+        os.environ["DAMAGE_CONTROL_UV"] = "1"
+        os.execvp("uv", ["uv", "run", "--script", __file__, *argv])  # noqa: S606, S607
+
+
+if __name__ == "__main__":
+    argv = sys.argv[1:]
+    if argv or damage_control.needs_yaml():
+        _reexec_under_uv(argv)
+    try:
+        damage_control.run(argv)
+    except ModuleNotFoundError as e:
+        if e.name != "yaml":
+            raise
+        # A pattern file changed after the check above; stdin is spent, so
+        # block this one call rather than let it through unchecked.
+        print("SECURITY: pattern files changed during this call", file=sys.stderr)
+        sys.exit(2)
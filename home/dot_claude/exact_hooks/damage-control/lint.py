@@ -0,0 +1,219 @@
+# /// script
+# requires-python = ">=3.8"
+# dependencies = ["pyyaml"]
+# ///
+"""
+Pattern entries that are broken or can never decide.
+
+Loads each pattern file on its own, so every finding names the file its
+entry comes from, and reports:
+
+  broken      command patterns whose regex does not compile; the hook
+              skips them, so the rule silently does nothing
+  duplicate   an entry repeating an earlier one, as written or once
+              shorthands are expanded (globs: ignoring case)
+  subsumed    a plain path that is a prefix-match of an earlier, broader
+              one: everything it matches, the earlier one matches first
+              (~/.aws/credentials after ~/.aws/, .secrets after .secret,
+              or after a zero-access ~/.aws/ when it is a read-only entry)
+  shadowed    a command pattern that matches commands of the corpus, but an
+              earlier pattern matches every one of them too
+
+Duplicate and subsumed entries are unreachable whatever the input:
+`damage_control.py compile`, and every cache rebuild, leaves them out of
+the compiled rules the hook loads (unreachable_entries()), and so are
+broken patterns. A shadowed pattern is only shadowed on the inputs seen,
+so it is kept; it is a hint to reorder, narrow or delete the rule.
+
+The corpus is the tool inputs in tests/ (benchmarks/corpus.py), plus the
+calls in session transcripts with --transcripts. Exits 1 on a broken
+pattern, or with --strict on any finding. pre-commit runs it on commits
+that touch patterns/.
+
+Usage (from the damage-control directory):
+
+    uv run lint.py [--patterns DIR] [--transcripts DIR] [--strict]
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Any, Iterable, NamedTuple
+
+import damage_control as dc
+
+HERE = Path(__file__).resolve().parent
+
+
+class Finding(NamedTuple):
+    kind: str  # broken, duplicate, subsumed or shadowed
+    rule: str  # the entry's id, e.g. "bashToolPatterns[12]"
+    file: str
+    message: str
+
+    def __str__(self) -> str:
+        return f"{self.file}: {self.rule}: {self.kind}: {self.message}"
+
+
+def load(patterns_dir: Path) -> tuple[dict[str, Any], dict[str, list[str]]]:
+    """The merged config of *patterns_dir* and, per list, each entry's file.
+
+    Merges like damage_control._rebuild_cache(), so entry ids are the ones
+    the hook reports.
+    """
+    config: dict[str, Any] = {key: [] for key in dc._CONFIG_KEYS}
+    files: dict[str, list[str]] = {key: [] for key in dc._CONFIG_KEYS}
+    shorthands: dict[str, str] = {}
+    for path in dc._pattern_files(patterns_dir):
+        data = dc._parse_yaml(path.read_bytes()) or {}
+        name = str(path.relative_to(patterns_dir.parent))
+        for key in dc._CONFIG_KEYS:
+            items = data.get(key)
+            if isinstance(items, list):
+                config[key].extend(items)
+                files[key].extend([name] * len(items))
+        if isinstance(data.get("shorthands"), dict):
+            shorthands.update(data["shorthands"])
+    config["shorthands"] = shorthands
+    return config, files
+
+
+def _entry(config: dict[str, Any], rule: str) -> str:
+    """The text of entry *rule* ("key[index]"): its pattern or path."""
+    key, _, index = rule.rstrip("]").partition("[")
+    item = config[key][int(index)]
+    if key == "bashToolPatterns":
+        return repr(item.get("pattern", ""))
+    return repr(dc._path_and_block(item)[0])
+
+
+def broken(config: dict[str, Any], files: dict[str, list[str]]) -> list[Finding]:
+    """Command patterns whose regex does not compile."""
+    found = []
+    for index, item in enumerate(config["bashToolPatterns"]):
+        pattern = dc._expand_shorthands(item.get("pattern", ""), config["shorthands"])
+        if not item.get("match_anywhere", False):
+            pattern = dc._CMD_POSITION_PREFIX + pattern
+        try:
+            re.compile(pattern, re.IGNORECASE)
+        except (re.error, RecursionError) as e:
+            rule = f"bashToolPatterns[{index}]"
+            message = f"{_entry(config, rule)} does not compile: {e}"
+            found.append(
+                Finding("broken", rule, files["bashToolPatterns"][index], message)
+            )
+    return found
+
+
+def unreachable(config: dict[str, Any], files: dict[str, list[str]]) -> list[Finding]:
+    """Duplicate and subsumed entries (damage_control.unreachable_entries())."""
+    found = []
+    for key, entries in dc.unreachable_entries(config).items():
+        for index, earlier in sorted(entries.items()):
+            rule = f"{key}[{index}]"
+            earlier_key, _, earlier_index = earlier.rstrip("]").partition("[")
+            item = config[key][index]
+            earlier_item = config[earlier_key][int(earlier_index)]
+            where = (
+                f"{earlier} {_entry(config, earlier)} "
+                f"({files[earlier_key][int(earlier_index)]})"
+            )
+            if item == earlier_item:
+                kind, message = "duplicate", f"repeats {where}"
+            elif key == "bashToolPatterns":
+                kind = "duplicate"
+                message = f"{_entry(config, rule)} expands like {where}"
+            elif _same_path(item, earlier_item):
+                kind, message = "duplicate", f"{_entry(config, rule)} is {where}"
+            else:
+                kind = "subsumed"
+                message = f"{_entry(config, rule)} is a prefix-match of {where}"
+            found.append(Finding(kind, rule, files[key][index], message))
+    return found
+
+
+def _same_path(entry: Any, other: Any) -> bool:
+    path, other_path = dc._path_and_block(entry)[0], dc._path_and_block(other)[0]
+    if dc.is_glob_pattern(path):
+        return path.lower() == other_path.lower()
+    return Path(path).expanduser() == Path(other_path).expanduser()
+
+
+def shadowed(
+    config: dict[str, Any], files: dict[str, list[str]], commands: Iterable[str]
+) -> list[Finding]:
+    """Command patterns that match some of *commands*, never first."""
+    dead = dc.unreachable_entries(config)["bashToolPatterns"]
+    rules = dc.compile_bash_rules(config["bashToolPatterns"], config["shorthands"])
+    matcher = dc.BashMatcher.from_rules([r for r in rules if r.index not in dead])
+    first: set[int] = set()
+    winners: dict[int, Counter[int]] = {}
+    for command in commands:
+        hits = [
+            rule.index
+            for rule in matcher.candidates(command)
+            if rule.regex.search(command)
+        ]
+        if hits:
+            first.add(hits[0])
+            for index in hits[1:]:
+                winners.setdefault(index, Counter())[hits[0]] += 1
+    found = []
+    for index in sorted(set(winners) - first):
+        rule = f"bashToolPatterns[{index}]"
+        by = ", ".join(
+            f"bashToolPatterns[{winner}] ({count})"
+            for winner, count in winners[index].most_common()
+        )
+        message = (
+            f"{_entry(config, rule)} matches {sum(winners[index].values())} "
+            f"corpus commands, all matched first by {by}"
+        )
+        found.append(
+            Finding("shadowed", rule, files["bashToolPatterns"][index], message)
+        )
+    return found
+
+
+def lint(patterns_dir: Path, commands: Iterable[str] = ()) -> list[Finding]:
+    """Every finding for *patterns_dir*; shadowing is judged on *commands*."""
+    config, files = load(patterns_dir)
+    return [
+        *broken(config, files),
+        *unreachable(config, files),
+        *shadowed(config, files, commands),
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--patterns", type=Path, default=HERE / "patterns")
+    parser.add_argument("--transcripts", type=Path, action="append", default=[])
+    parser.add_argument("--strict", action="store_true", help="exit 1 on any finding")
+    args = parser.parse_args()
+
+    from policy_diff import corpus_inputs, transcript_inputs
+
+    sources = [corpus_inputs(), *(transcript_inputs(p) for p in args.transcripts)]
+    commands = dict.fromkeys(
+        value
+        for source in sources
+        for tool_name, value in source
+        if tool_name == "Bash"
+    )
+    findings = lint(args.patterns, commands)
+    for finding in findings:
+        print(finding)
+    counts = Counter(finding.kind for finding in findings)
+    summary = ", ".join(f"{count} {kind}" for kind, count in sorted(counts.items()))
+    print(f"\n{summary or 'no findings'} ({len(commands)} corpus commands)")
+    if counts["broken"] or (args.strict and findings):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+# /// script
+# requires-python = ">=3.8"
+# dependencies = ["pyyaml"]
+# ///
+"""
+Decisions a pattern change makes differently, across a corpus of inputs.
+
+Compiles two patterns directories, the base and the head, and evaluates
+both on every input of a corpus: the tool inputs in tests/ (the default),
+JSON-lines hook payloads (--payloads) and the calls in session transcripts
+(--transcripts). Prints each input whose action or reason differs, grouped
+by the rule that decides it.
+
+The base is a directory or a git ref, whose patterns/ is extracted to a temp
+dir; the head defaults to patterns/ in the working tree. So before a commit:
+
+    uv run policy_diff.py HEAD
+
+Most inputs are settled without evaluating them. A tool's decision only
+reads some config keys (_TOOL_KEYS); when those are equal in both trees its
+inputs cannot change. When only bashToolPatterns differ, and the rules both
+trees share keep their order, a command can only change if one of the
+added or removed rules matches it, which a matcher over just those rules
+answers quickly. The rest are evaluated on both trees, across a process pool
+when there are many.
+
+`--check` exits 1 when any decision changed. pre-commit runs `policy_diff.py
+HEAD` (without it) on commits that touch patterns/, to show the changes.
+
+Usage (from the damage-control directory):
+
+    uv run policy_diff.py BASE [--head DIR] [--payloads FILE]
+        [--transcripts DIR] [--tests] [--jobs N] [--check]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Iterable
+
+import damage_control as dc
+
+HERE = Path(__file__).resolve().parent
+# The config keys each tool's evaluator reads.
+_TOOL_KEYS = {
+    "Bash": ("bashToolPatterns", "shorthands", *dc._BASH_PATH_KEYS),
+    "Edit": ("zeroAccessPaths", "readOnlyPaths"),
+    "Write": ("zeroAccessPaths", "readOnlyPaths"),
+    "Read": ("zeroAccessPaths",),
+    "Grep": ("zeroAccessPaths",),
+}
+# Fewer inputs than this to evaluate are not worth starting a pool for.
+PARALLEL_MIN = 2000
+CHUNK = 500
+
+# Set in each worker by _init_worker().
+_configs: tuple[dict[str, Any], dict[str, Any]] = ({}, {})
+
+
+def checkout(ref: str, dest: Path) -> Path:
+    """patterns/ as of git *ref*, extracted under *dest*."""
+    import io
+    import subprocess
+    import tarfile
+
+    # `git archive` reads the tree path from the top of the work tree.
+    top, prefix = subprocess.run(
+        ["git", "rev-parse", "--show-toplevel", "--show-prefix"],  # noqa: S607
+        cwd=HERE,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.split("\n")[:2]
+    result = subprocess.run(  # noqa: S603
+        ["git", "archive", "--format=tar", f"{ref}:{prefix}patterns"],  # noqa: S607
+        cwd=top,
+        capture_output=True,
+        check=False,
+    )
+    if result.returncode != 0:
+        sys.exit(f"Error: no patterns/ at {ref}: {result.stderr.decode().strip()}")
+    patterns = dest / "patterns"
+    with tarfile.open(fileobj=io.BytesIO(result.stdout)) as tar:
+        if hasattr(tarfile, "data_filter"):
+            tar.extractall(patterns, filter="data")
+        else:
+            tar.extractall(patterns)  # noqa: S202 - this repository's own tree
+    return patterns
+
+
+def _dedupe(inputs: Iterable[tuple[str, str]]) -> list[tuple[str, str]]:
+    return [item for item in dict.fromkeys(inputs) if item[0]]
+
+
+def corpus_inputs() -> Iterable[tuple[str, str]]:
+    """(tool name, value) of the inputs in tests/ (benchmarks/corpus.py)."""
+    sys.path.insert(0, str(HERE / "benchmarks"))
+    from corpus import harvest
+
+    found = harvest()
+    for command in found["command"]:
+        yield "Bash", command
+    for path in found["file_path"]:
+        for tool_name in ("Edit", "Write", "Read"):
+            yield tool_name, path
+    for path in found["path"]:
+        yield "Grep", path
+
+
+def payload_inputs(path: Path) -> Iterable[tuple[str, str]]:
+    """(tool name, value) of each hook payload in the JSON-lines file *path*."""
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                payload = json.loads(line)
+                yield _input(payload.get("tool_name"), payload.get("tool_input"))
+
+
+def transcript_inputs(directory: Path) -> Iterable[tuple[str, str]]:
+    """(tool name, value) of each call in the transcripts under *directory*."""
+    from replay import tool_calls
+
+    for transcript in sorted(directory.rglob("*.jsonl")):
+        for call in tool_calls(transcript):
+            if call is not None:
+                yield _input(*call)
+
+
+def _input(tool_name: Any, tool_input: Any) -> tuple[str, str]:
+    field = dc._DECISION_FIELDS.get(tool_name)
+    if field is None or not isinstance(tool_input, dict):
+        return "", ""  # not a call the policy decides: dropped by _dedupe()
+    return tool_name, str(tool_input.get(field, ""))
+
+
+def _rule_key(item: Any) -> str:
+    return json.dumps(item, sort_keys=True)
+
+
+def _changed_rules(base: dict[str, Any], head: dict[str, Any]) -> list[Any] | None:
+    """bashToolPatterns entries in only one of the trees.
+
+    None when the entries both trees have are in a different order: then
+    the first match can change without any of these matching.
+    """
+    old = [_rule_key(item) for item in base.get("bashToolPatterns", [])]
+    new = [_rule_key(item) for item in head.get("bashToolPatterns", [])]
+    shared = Counter(old) & Counter(new)
+
+    def kept(keys: list[str]) -> list[str]:
+        left = Counter(shared)
+        order = []
+        for key in keys:
+            if left[key]:
+                left[key] -= 1
+                order.append(key)
+        return order
+
+    if kept(old) != kept(new):
+        return None
+    only = (Counter(old) - shared) + (Counter(new) - shared)
+    return [json.loads(key) for key in only]
+
+
+def _unsettled(
+    inputs: list[tuple[str, str]], base: dict[str, Any], head: dict[str, Any]
+) -> list[tuple[str, str]]:
+    """The inputs whose decision may differ between *base* and *head*."""
+    changed = {
+        tool_name
+        for tool_name, keys in _TOOL_KEYS.items()
+        if any(base.get(key) != head.get(key) for key in keys)
+    }
+    matcher = None
+    if "Bash" in changed and all(
+        base.get(key) == head.get(key) for key in _TOOL_KEYS["Bash"][1:]
+    ):
+        rules = _changed_rules(base, head)
+        if rules is not None:
+            matcher = dc.BashMatcher(rules, head.get("shorthands", {}))
+    return [
+        (tool_name, value)
+        for tool_name, value in inputs
+        if tool_name in changed
+        and (matcher is None or tool_name != "Bash" or matcher.first(value))
+    ]
+
+
+def _init_worker(base_dir: Path, head_dir: Path) -> None:
+    global _configs
+    _configs = (dc.load_patterns_dir(base_dir), dc.load_patterns_dir(head_dir))
+
+
+def _diff_chunk(chunk: list[tuple[str, str]]) -> list[tuple[Any, ...]]:
+    """(tool name, value, base Decision, head Decision) of each input that differs."""
+    base, head = _configs
+    found = []
+    for tool_name, value in chunk:
+        tool_input = {dc._DECISION_FIELDS[tool_name]: value}
+        old = dc.EVALUATORS[tool_name](tool_input, base)
+        new = dc.EVALUATORS[tool_name](tool_input, head)
+        if (old.action, old.reason) != (new.action, new.reason):
+            found.append((tool_name, value, old, new))
+    return found
+
+
+def diff(
+    inputs: list[tuple[str, str]], base_dir: Path, head_dir: Path, jobs: int = 0
+) -> tuple[list[tuple[Any, ...]], int]:
+    """Differing inputs (see _diff_chunk()) and how many were evaluated."""
+    _init_worker(base_dir, head_dir)
+    todo = _unsettled(inputs, *_configs)
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(todo) < PARALLEL_MIN:
+        return _diff_chunk(todo), len(todo)
+
+    import multiprocessing
+
+    chunks = [todo[i : i + CHUNK] for i in range(0, len(todo), CHUNK)]
+    found = []
+    with multiprocessing.Pool(jobs, _init_worker, (base_dir, head_dir)) as pool:
+        for part in pool.imap(_diff_chunk, chunks):
+            found.extend(part)
+    return found, len(todo)
+
+
+def report(found: list[tuple[Any, ...]]) -> str:
+    """Differing inputs, grouped by the rule deciding them in the head."""
+    groups: dict[tuple[str, str], list[tuple[Any, ...]]] = {}
+    for item in found:
+        _, _, old, new = item
+        side, decision = ("head", new) if new.rule is not None else ("base", old)
+        groups.setdefault((f"{side} {decision.rule}", decision.reason), []).append(item)
+    lines = []
+    for (rule, reason), items in sorted(groups.items()):
+        lines += ["", f"{rule}: {reason}"]
+        for tool_name, value, old, new in items:
+            shown = value if len(value) <= 100 else value[:100] + "..."
+            lines.append(
+                f"  {old.action:>5} -> {new.action:<5}  {tool_name:<5} {shown!r}"
+            )
+            if old.rule is not None and old.reason != new.reason:
+                lines.append(f"{'':22}was {old.rule}: {old.reason}")
+    return "\n".join(lines)
+
+
+def _remove_cache(patterns_dir: Path) -> None:
+    """Delete the cache of *patterns_dir* and its fragments and lock files."""
+    cache_file = dc._cache_file(patterns_dir)
+    for path in cache_file.parent.glob(f"{cache_file.stem}.*"):
+        path.unlink(missing_ok=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("base", help="patterns directory or git ref")
+    parser.add_argument("--head", type=Path, default=HERE / "patterns")
+    parser.add_argument("--payloads", type=Path, action="append", default=[])
+    parser.add_argument("--transcripts", type=Path, action="append", default=[])
+    parser.add_argument(
+        "--tests", action="store_true", help="the inputs in tests/ (default)"
+    )
+    parser.add_argument("--jobs", type=int, default=0, help="worker processes")
+    parser.add_argument("--check", action="store_true", help="exit 1 on changes")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    sources: list[Iterable[tuple[str, str]]] = []
+    if args.tests or not (args.payloads or args.transcripts):
+        sources.append(corpus_inputs())
+    sources += [payload_inputs(path) for path in args.payloads]
+    sources += [transcript_inputs(path) for path in args.transcripts]
+    inputs = _dedupe(item for source in sources for item in source)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        base_dir = Path(args.base)
+        extracted = not base_dir.is_dir()
+        if extracted:
+            base_dir = checkout(args.base, Path(tmp))
+        try:
+            found, evaluated = diff(inputs, base_dir, args.head, args.jobs)
+        finally:
+            if extracted:  # its cache is keyed by a path no later run will use
+                _remove_cache(base_dir)
+
+    print(report(found).lstrip("\n") if found else "no decision changed")
+    print(
+        f"\n{len(found)} of {len(inputs)} inputs decide differently "
+        f"({evaluated} evaluated, {time.perf_counter() - start:.1f}s)"
+    )
+    if args.check and found:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
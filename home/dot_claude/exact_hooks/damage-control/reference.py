@@ -0,0 +1,265 @@
+"""
+Reference engine: the policy as straight loops over the config.
+
+This is how damage_control.py decided before any of its indexes existed
+(BashMatcher, PathPolicy, PathMentions, OperationGate): every path entry
+and every command pattern tried in file order, with re.search. It is kept,
+frozen, as the definition of a correct decision; equivalence.py checks the
+optimized engine against it. Change it only together with a deliberate
+change of behaviour, never to make a divergence go away.
+
+The helpers below are copies, not imports, so that optimizing the ones in
+damage_control.py cannot change the reference along with them. The only
+addition is a compiled-regex memo: without it `re`'s small cache thrashes
+and one call takes tens of milliseconds.
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import functools
+import os
+import re
+from pathlib import Path
+from typing import Any
+
+from damage_control import Decision
+
+_BUILTIN_SHORTHANDS: dict[str, str] = {
+    "flags": r"\b(?:\s+[^\s;|&)]+)*?\s+",
+    "args": r"(?:\s+[^\s;|&)]+)*",
+    "sudo": r"(?:sudo\s+)?",
+}
+_SHORTHAND_RE = re.compile(r"(?<![\[\\])\{([a-zA-Z_]\w*)\}(?![},?\d])")
+_CMD_POSITION_PREFIX = r"(?:^|[;|&({\n\r]\s*(?:(?:do|then|else|elif)\s+)?)"
+_GLOB_BOUNDARY = r'(?=[/\s;|&"\')\]]|$)'
+
+DELETE_PATTERNS = [
+    (r"\brm\s+.*{path}", "delete"),
+    (r"\bunlink\s+.*{path}", "delete"),
+    (r"\brmdir\s+.*{path}", "delete"),
+    (r"\bshred\s+.*{path}", "delete"),
+]
+READ_ONLY_BLOCKED = [
+    (r">\s*{path}", "write"),
+    (r"\btee\s+(?!.*-a).*{path}", "write"),
+    (r">>\s*{path}", "append"),
+    (r"\btee\s+-a\s+.*{path}", "append"),
+    (r"\btee\s+.*-a.*{path}", "append"),
+    (r"\bsed\s+-i.*{path}", "edit"),
+    (r"\bperl\s+-[^\s]*i.*{path}", "edit"),
+    (r"\bawk\s+-i\s+inplace.*{path}", "edit"),
+    (r"\bmv\s+.*\s+{path}", "move"),
+    (r"\bcp\s+.*\s+{path}", "copy"),
+    *DELETE_PATTERNS,
+    (r"\bchmod\s+.*{path}", "chmod"),
+    (r"\bchown\s+.*{path}", "chown"),
+    (r"\bchgrp\s+.*{path}", "chgrp"),
+    (r"\btruncate\s+.*{path}", "truncate"),
+    (r":\s*>\s*{path}", "truncate"),
+]
+NO_DELETE_BLOCKED = DELETE_PATTERNS
+
+
+@functools.lru_cache(maxsize=None)
+def _regex(pattern: str, flags: int = 0) -> re.Pattern:
+    return re.compile(pattern, flags)
+
+
+def _search(pattern: str, string: str, flags: int = 0) -> bool:
+    return _regex(pattern, flags).search(string) is not None
+
+
+def is_glob_pattern(pattern: str) -> bool:
+    return "*" in pattern or "?" in pattern or "[" in pattern
+
+
+def glob_to_regex(glob_pattern: str) -> str:
+    result = ""
+    for char in glob_pattern:
+        if char == "*":
+            result += r"[^\s/]*"
+        elif char == "?":
+            result += r"[^\s/]"
+        elif char in r"\.^$+{}[]|()":
+            result += "\\" + char
+        else:
+            result += char
+    return result
+
+
+def match_path(file_path: str, pattern: str) -> bool:
+    expanded_pattern = str(Path(pattern).expanduser())
+    normalized = os.path.normpath(file_path)
+    expanded_normalized = str(Path(normalized).expanduser())
+
+    if is_glob_pattern(pattern):
+        basename_lower = Path(expanded_normalized).name.lower()
+        if fnmatch.fnmatch(basename_lower, expanded_pattern.lower()):
+            return True
+        if fnmatch.fnmatch(basename_lower, pattern.lower()):
+            return True
+        return fnmatch.fnmatch(expanded_normalized.lower(), expanded_pattern.lower())
+    if expanded_normalized.startswith(expanded_pattern):
+        return True
+    return expanded_normalized == expanded_pattern.rstrip("/")
+
+
+def _expand_shorthands(pattern: str, shorthands: dict[str, str]) -> str:
+    merged = {**_BUILTIN_SHORTHANDS, **shorthands}
+
+    def _replace(m: re.Match) -> str:
+        return merged.get(m.group(1), m.group(0))
+
+    return _SHORTHAND_RE.sub(_replace, pattern)
+
+
+def _expanded(path: str) -> str:
+    expanded = str(Path(path).expanduser())
+    # Path() strips trailing slashes; keep them for directory entries.
+    if path.endswith("/") and not expanded.endswith("/"):
+        expanded += "/"
+    return expanded
+
+
+def check_path_patterns(
+    command: str, path: str, patterns: list[tuple[str, str]], path_type: str
+) -> tuple[bool, str]:
+    if is_glob_pattern(path):
+        glob_regex = glob_to_regex(path) + _GLOB_BOUNDARY
+        for pattern_template, operation in patterns:
+            try:
+                cmd_prefix = pattern_template.replace("{path}", "")
+                if cmd_prefix and _search(cmd_prefix + glob_regex, command, re.I):
+                    return True, f"{operation} operation on {path_type} {path}"
+            except re.error:
+                continue
+    else:
+        escaped_expanded = re.escape(_expanded(path))
+        escaped_original = re.escape(path)
+        for pattern_template, operation in patterns:
+            try:
+                if _search(
+                    pattern_template.replace("{path}", escaped_expanded), command
+                ) or _search(
+                    pattern_template.replace("{path}", escaped_original), command
+                ):
+                    return True, f"{operation} operation on {path_type} {path}"
+            except re.error:
+                continue
+    return False, ""
+
+
+def _zero_access_mention(command: str, zero_path: str) -> str | None:
+    if is_glob_pattern(zero_path):
+        try:
+            if _search(glob_to_regex(zero_path) + _GLOB_BOUNDARY, command, re.I):
+                return f"zero-access pattern {zero_path}"
+        except re.error:
+            pass
+        return None
+    expanded = _expanded(zero_path)
+    escaped_expanded = re.escape(expanded)
+    escaped_original = re.escape(zero_path)
+    if not expanded.startswith("/"):
+        # Relative paths need a path-component boundary, so "secrets/" does
+        # not match inside "external-secrets/".
+        boundary = r"(?:^|(?<=\s)|(?<=/))"
+        escaped_expanded = boundary + escaped_expanded
+        escaped_original = boundary + escaped_original
+    if _search(escaped_expanded, command) or _search(escaped_original, command):
+        return f"zero-access path {zero_path}"
+    return None
+
+
+def _path_and_block(entry: Any) -> tuple[str, bool]:
+    if isinstance(entry, dict):
+        return entry.get("path", ""), bool(entry.get("block", False))
+    return entry, False
+
+
+def _decision(block: bool, reason: str, rule: str, target: str) -> Decision:
+    return Decision("block" if block else "ask", reason, rule, target)
+
+
+def evaluate_bash(tool_input: dict[str, Any], config: dict[str, Any]) -> Decision:
+    command = tool_input.get("command", "")
+    if not command:
+        return Decision("allow")
+
+    for index, entry in enumerate(config.get("zeroAccessPaths", [])):
+        zero_path, blk = _path_and_block(entry)
+        reason = _zero_access_mention(command, zero_path)
+        if reason is not None:
+            return _decision(blk, reason, f"zeroAccessPaths[{index}]", command)
+
+    for key, operations, path_type in (
+        ("readOnlyPaths", READ_ONLY_BLOCKED, "read-only path"),
+        ("noDeletePaths", NO_DELETE_BLOCKED, "no-delete path"),
+    ):
+        for index, entry in enumerate(config.get(key, [])):
+            path, blk = _path_and_block(entry)
+            matched, reason = check_path_patterns(command, path, operations, path_type)
+            if matched:
+                return _decision(blk, reason, f"{key}[{index}]", command)
+
+    shorthands = config.get("shorthands", {})
+    for index, item in enumerate(config.get("bashToolPatterns", [])):
+        pattern = _expand_shorthands(item.get("pattern", ""), shorthands)
+        if not item.get("match_anywhere", False):
+            pattern = _CMD_POSITION_PREFIX + pattern
+        try:
+            if _search(pattern, command, re.IGNORECASE):
+                reason = item.get("reason", "Matched damage-control pattern")
+                blk = bool(item.get("block", False))
+                return _decision(blk, reason, f"bashToolPatterns[{index}]", command)
+        except re.error:
+            continue
+
+    return Decision("allow")
+
+
+def _evaluate_path(
+    path: str, config: dict[str, Any], verb: str, keys: tuple[str, ...]
+) -> Decision:
+    if not path:
+        return Decision("allow")
+    for key in keys:
+        label = {"zeroAccessPaths": "zero-access", "readOnlyPaths": "read-only"}[key]
+        for index, entry in enumerate(config.get(key, [])):
+            entry_path, blk = _path_and_block(entry)
+            if match_path(path, entry_path):
+                reason = f"{verb} {label} path {entry_path}"
+                return _decision(blk, reason, f"{key}[{index}]", path)
+    return Decision("allow")
+
+
+EVALUATORS = {
+    "Bash": evaluate_bash,
+    "Edit": lambda tool_input, config: _evaluate_path(
+        tool_input.get("file_path", ""),
+        config,
+        "edit to",
+        ("zeroAccessPaths", "readOnlyPaths"),
+    ),
+    "Write": lambda tool_input, config: _evaluate_path(
+        tool_input.get("file_path", ""),
+        config,
+        "write to",
+        ("zeroAccessPaths", "readOnlyPaths"),
+    ),
+    "Read": lambda tool_input, config: _evaluate_path(
+        tool_input.get("file_path", ""), config, "read of", ("zeroAccessPaths",)
+    ),
+    "Grep": lambda tool_input, config: _evaluate_path(
+        tool_input.get("path", ""), config, "grep in", ("zeroAccessPaths",)
+    ),
+}
+
+
+def evaluate(input_data: dict[str, Any], config: dict[str, Any]) -> Decision:
+    """The reference decision on one hook payload."""
+    evaluator = EVALUATORS.get(input_data.get("tool_name", ""))
+    if evaluator is None:
+        return Decision("allow")
+    return evaluator(input_data.get("tool_input", {}), config)
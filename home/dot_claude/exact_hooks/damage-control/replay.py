@@ -0,0 +1,234 @@
+# /// script
+# requires-python = ">=3.8"
+# dependencies = ["pyyaml"]
+# ///
+"""
+Replay recorded tool calls through the policy.
+
+Reads the Claude Code session transcripts (JSONL) under ~/.claude/projects/,
+takes every Bash, Edit, Write, Read and Grep call from them and evaluates it
+with damage_control.evaluate(), so a pattern change can be tried against
+real traffic before it is rolled out. Reports the allow/ask/block counts per
+rule, the rules that ask most often and the slowest inputs.
+
+Each transcript is one task for a process pool; a worker streams its file
+line by line and returns only counts and its slowest calls, so memory does
+not grow with the size of the transcript directory. Nothing leaves the
+machine: the transcripts and patterns are read from local files.
+
+Usage (from the damage-control directory):
+
+    uv run replay.py [TRANSCRIPTS] [--patterns DIR] [--jobs N] [--top N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import heapq
+import json
+import os
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Iterator, NamedTuple
+
+import damage_control as dc
+
+TRANSCRIPTS = Path("~/.claude/projects").expanduser()
+TOP = 10
+
+# Set in each worker by _init_worker().
+_config: dict[str, Any] = {}
+_top = TOP
+
+
+class Tally(NamedTuple):
+    """What replaying some tool calls came to; Tallies add up with merge()."""
+
+    calls: Counter  # action -> count
+    rules: Counter  # (rule, action) -> count
+    slowest: list  # up to *top* (seconds, tool name, input value), a min-heap
+    skipped: int  # transcript lines that are not JSON
+
+
+def tool_calls(transcript: Path) -> Iterator[tuple[str, dict[str, Any]] | None]:
+    """(tool name, tool input) of each call in *transcript* the policy decides.
+
+    Yields None for a line that is not JSON (a session cut off mid-write).
+    """
+    with transcript.open(encoding="utf-8", errors="replace") as f:
+        for line in f:
+            # Most lines are user turns and tool results: skip them unparsed.
+            if '"tool_use"' not in line:
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                yield None
+                continue
+            message = entry.get("message") if isinstance(entry, dict) else None
+            content = message.get("content") if isinstance(message, dict) else None
+            if not isinstance(content, list):
+                continue
+            for block in content:
+                if (
+                    isinstance(block, dict)
+                    and block.get("type") == "tool_use"
+                    and block.get("name") in dc.EVALUATORS
+                    and isinstance(block.get("input"), dict)
+                ):
+                    yield block["name"], block["input"]
+
+
+def replay_file(transcript: Path) -> Tally:
+    """Evaluate every call in *transcript* against the worker's config."""
+    tally = Tally(Counter(), Counter(), [], 0)
+    skipped = 0
+    for call in tool_calls(transcript):
+        if call is None:
+            skipped += 1
+            continue
+        tool_name, tool_input = call
+        start = time.perf_counter()
+        decision = dc.evaluate(
+            {"tool_name": tool_name, "tool_input": tool_input}, _config
+        )
+        elapsed = time.perf_counter() - start
+        tally.calls[decision.action] += 1
+        if decision.rule is not None:
+            tally.rules[decision.rule, decision.action] += 1
+        value = str(tool_input.get(dc._DECISION_FIELDS[tool_name], ""))
+        _keep_slowest(tally.slowest, (elapsed, tool_name, value), _top)
+    return tally._replace(skipped=skipped)
+
+
+def _keep_slowest(heap: list, item: tuple, top: int) -> None:
+    if len(heap) < top:
+        heapq.heappush(heap, item)
+    elif item > heap[0]:
+        heapq.heapreplace(heap, item)
+
+
+def merge(total: Tally, part: Tally, top: int) -> Tally:
+    total.calls.update(part.calls)
+    total.rules.update(part.rules)
+    for item in part.slowest:
+        _keep_slowest(total.slowest, item, top)
+    return total._replace(skipped=total.skipped + part.skipped)
+
+
+def _init_worker(patterns: Path | None, top: int) -> None:
+    """Load the policy once per worker and compile its rules before timing."""
+    global _config, _top
+    _config = dc.load_config() if patterns is None else dc.load_patterns_dir(patterns)
+    _top = top
+    for tool_name, field in dc._DECISION_FIELDS.items():
+        dc.evaluate({"tool_name": tool_name, "tool_input": {field: "warm-up"}}, _config)
+
+
+def replay(
+    transcripts: Path, patterns: Path | None = None, jobs: int = 0, top: int = TOP
+) -> Tally:
+    """Tally of every transcript under *transcripts*.
+
+    *jobs* worker processes (default: one per CPU); with 1 the calls are
+    evaluated in this process.
+    """
+    files = (path for path in sorted(transcripts.rglob("*.jsonl")) if path.is_file())
+    total = Tally(Counter(), Counter(), [], 0)
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1:
+        _init_worker(patterns, top)
+        for path in files:
+            total = merge(total, replay_file(path), top)
+        return total
+
+    import multiprocessing
+
+    with multiprocessing.Pool(jobs, _init_worker, (patterns, top)) as pool:
+        for part in pool.imap_unordered(replay_file, files):
+            total = merge(total, part, top)
+    return total
+
+
+def _rule_reasons(config: dict[str, Any]) -> dict[str, str]:
+    """What each rule id in a Tally stands for: its reason or path."""
+    reasons = {}
+    for index, item in enumerate(config.get("bashToolPatterns", [])):
+        reasons[f"bashToolPatterns[{index}]"] = item.get("reason", "")
+    for key in dc._BASH_PATH_KEYS:
+        for index, entry in enumerate(config.get(key, [])):
+            reasons[f"{key}[{index}]"] = dc._path_and_block(entry)[0]
+    return reasons
+
+
+def report(tally: Tally, config: dict[str, Any], top: int = TOP) -> str:
+    """The replay summary as text."""
+    reasons = _rule_reasons(config)
+    total = sum(tally.calls.values())
+    lines = [f"{total} tool calls"]
+    for action in ("allow", "ask", "block"):
+        count = tally.calls[action]
+        share = count / total * 100 if total else 0.0
+        lines.append(f"  {action:<6}{count:>10}  {share:5.1f}%")
+    if tally.skipped:
+        lines.append(f"  ({tally.skipped} transcript lines were not JSON)")
+
+    per_rule: dict[str, Counter] = {}
+    for (rule, action), count in tally.rules.items():
+        per_rule.setdefault(rule, Counter())[action] = count
+    lines += ["", "Decisions per rule:", f"  {'ask':>8}{'block':>8}  rule"]
+    for rule, counts in sorted(per_rule.items(), key=lambda kv: -sum(kv[1].values())):
+        lines.append(
+            f"  {counts['ask']:>8}{counts['block']:>8}  {rule}  {reasons.get(rule, '')}"
+        )
+
+    asking = sorted(
+        (kv for kv in per_rule.items() if kv[1]["ask"]), key=lambda kv: -kv[1]["ask"]
+    )
+    lines += ["", f"Top {top} asking rules:"]
+    for rule, counts in asking[:top]:
+        lines.append(f"  {counts['ask']:>8}  {rule}  {reasons.get(rule, '')}")
+
+    lines += ["", f"Top {top} slowest inputs:"]
+    for elapsed, tool_name, value in sorted(tally.slowest, reverse=True):
+        shown = value if len(value) <= 100 else value[:100] + "..."
+        lines.append(f"  {elapsed * 1e6:>8.0f} us  {tool_name:<5}  {shown!r}")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "transcripts",
+        nargs="?",
+        type=Path,
+        default=TRANSCRIPTS,
+        help=f"directory searched for *.jsonl (default {TRANSCRIPTS})",
+    )
+    parser.add_argument(
+        "--patterns",
+        type=Path,
+        help="patterns directory to evaluate with (default: the active one)",
+    )
+    parser.add_argument("--jobs", type=int, default=0, help="worker processes")
+    parser.add_argument("--top", type=int, default=TOP)
+    args = parser.parse_args()
+
+    if not args.transcripts.is_dir():
+        sys.exit(f"Error: no transcript directory at {args.transcripts}")
+    start = time.perf_counter()
+    tally = replay(args.transcripts, args.patterns, args.jobs, args.top)
+    elapsed = time.perf_counter() - start
+    config = (
+        dc.load_config()
+        if args.patterns is None
+        else dc.load_patterns_dir(args.patterns)
+    )
+    print(report(tally, config, args.top))
+    print(f"\nreplayed in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,6 @@
 
 from __future__ import annotations
 
-import io
 import json
 import re
 from pathlib import Path
@@ -14,7 +13,6 @@ from damage_control import (
     _CMD_POSITION_PREFIX,
     NO_DELETE_BLOCKED,
     READ_ONLY_BLOCKED,
-    _block,
     _expand_shorthands,
     check_path_patterns,
     glob_to_regex,
@@ -26,7 +24,6 @@ from damage_control import (
     is_glob_pattern,
     load_config,
     load_patterns_dir,
-    main,
     match_path,
 )
 
@@ -666,42 +663,6 @@ class TestCheckPathPatterns:
         assert blocked is True
 
 
-# ---------------------------------------------------------------------------
-# _block
-# ---------------------------------------------------------------------------
-
-
-class TestBlock:
-    """Verify the _block output helper."""
-
-    def test_exits_with_code_2(self):
-        with pytest.raises(SystemExit) as exc_info:
-            _block("some reason", "some context")
-        assert exc_info.value.code == 2
-
-    def test_prints_security_and_target(self, capsys):
-        with pytest.raises(SystemExit):
-            _block("some reason", "some context")
-        captured = capsys.readouterr()
-        assert "SECURITY:" in captured.err
-        assert "Target:" in captured.err
-
-    def test_long_context_truncated(self, capsys):
-        long_context = "x" * 200
-        with pytest.raises(SystemExit):
-            _block("reason", long_context)
-        captured = capsys.readouterr()
-        assert "..." in captured.err
-
-    def test_context_at_100_chars_not_truncated(self, capsys):
-        context = "x" * 100
-        with pytest.raises(SystemExit):
-            _block("reason", context)
-        captured = capsys.readouterr()
-        assert "..." not in captured.err
-        assert "x" * 100 in captured.err
-
-
 # ---------------------------------------------------------------------------
 # handle_bash — all 4 phases
 # ---------------------------------------------------------------------------
@@ -1122,43 +1083,6 @@ class TestPathBlockOptIn:
         assert exc.value.code == 2
 
 
-class TestPatternCache:
-    """The merged config is cached in TMPDIR and invalidated on file change."""
-
-    def test_cache_invalidated_on_edit(self, tmp_path, monkeypatch):
-        monkeypatch.setattr("tempfile.tempdir", str(tmp_path / "cache"))
-        (tmp_path / "cache").mkdir()
-        (tmp_path / "c.yaml").write_text(yaml.dump({"zeroAccessPaths": ["/x"]}))
-        first = load_patterns_dir(tmp_path)
-        assert first["zeroAccessPaths"] == ["/x"]
-        # Editing the source changes the mtime/size key, forcing a re-parse —
-        # proving stale data is never served after an edit.
-        (tmp_path / "c.yaml").write_text("THIS IS NOT VALID YAML: [")
-        with pytest.raises(yaml.YAMLError):
-            load_patterns_dir(tmp_path)
-
-    def test_cache_reused_when_unchanged(self, tmp_path, monkeypatch):
-        monkeypatch.setattr("tempfile.tempdir", str(tmp_path / "cache"))
-        (tmp_path / "cache").mkdir()
-        (tmp_path / "c.yaml").write_text(yaml.dump({"zeroAccessPaths": ["/x"]}))
-
-        calls = {"n": 0}
-        real_load = yaml.safe_load
-
-        def counting_load(stream):
-            calls["n"] += 1
-            return real_load(stream)
-
-        monkeypatch.setattr("yaml.safe_load", counting_load)
-
-        first = load_patterns_dir(tmp_path)
-        parses_after_first = calls["n"]
-        assert parses_after_first > 0  # cold load parsed the file
-
-        second = load_patterns_dir(tmp_path)
-        assert second == first
-        assert calls["n"] == parses_after_first  # warm load did not re-parse
-
 
 # ---------------------------------------------------------------------------
 # load_config
@@ -1207,45 +1131,6 @@ class TestLoadConfig:
         assert "Warning" in captured.err
 
 
-# ---------------------------------------------------------------------------
-# main
-# ---------------------------------------------------------------------------
-
-
-class TestMain:
-    """Verify the main dispatcher."""
-
-    def test_valid_json_known_tool(self, monkeypatch):
-        input_data = json.dumps({"tool_name": "Bash", "tool_input": {"command": ""}})
-        monkeypatch.setattr("sys.stdin", io.StringIO(input_data))
-        monkeypatch.setattr("damage_control.load_config", lambda: {})
-        with pytest.raises(SystemExit) as exc_info:
-            main()
-        assert exc_info.value.code == 0
-
-    def test_valid_json_unknown_tool(self, monkeypatch):
-        input_data = json.dumps({"tool_name": "Unknown", "tool_input": {}})
-        monkeypatch.setattr("sys.stdin", io.StringIO(input_data))
-        monkeypatch.setattr("damage_control.load_config", lambda: {})
-        with pytest.raises(SystemExit) as exc_info:
-            main()
-        assert exc_info.value.code == 0
-
-    def test_invalid_json(self, monkeypatch, capsys):
-        monkeypatch.setattr("sys.stdin", io.StringIO("not json"))
-        monkeypatch.setattr("damage_control.load_config", lambda: {})
-        with pytest.raises(SystemExit) as exc_info:
-            main()
-        assert exc_info.value.code == 1
-        captured = capsys.readouterr()
-        assert "Error" in captured.err
-
-    def test_empty_stdin(self, monkeypatch):
-        monkeypatch.setattr("sys.stdin", io.StringIO(""))
-        monkeypatch.setattr("damage_control.load_config", lambda: {})
-        with pytest.raises(SystemExit) as exc_info:
-            main()
-        assert exc_info.value.code == 1
 
 
 # ---------------------------------------------------------------------------
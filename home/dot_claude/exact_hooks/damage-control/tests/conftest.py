@@ -6,31 +6,126 @@
 Shared test fixtures for damage-control tests.
 
 Run with: uv run pytest tests/ -v -n auto
+
+run_hook() drives damage_control.main() in-process, on one config loaded
+for the whole session. Tests marked `e2e` run the real hook command
+(`python3 launcher.py`, as settings.json does) instead, as an end-to-end
+smoke test; select them alone with `-m e2e`.
 """
 
+import contextlib
+import functools
+import io
 import json
+import os
 import subprocess
 import sys
 from pathlib import Path
+from unittest import mock
+
+import pytest
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
-import damage_control as dc  # noqa: E402, F401
+import damage_control as dc  # noqa: E402
 
 SCRIPT = str(Path(__file__).parent.parent / "damage_control.py")
+LAUNCHER = str(Path(SCRIPT).parent / "launcher.py")
 HOME = str(Path("~").expanduser())
+_UV_CACHE_DIR = os.environ.get("UV_CACHE_DIR") or str(
+    Path(os.environ.get("XDG_CACHE_HOME") or Path(HOME) / ".cache") / "uv"
+)
 
+# Set for the duration of a test marked e2e (see _hook_mode).
+_END_TO_END = False
 
-def run_hook(tool_name: str, tool_input: dict) -> tuple:
-    """Run the hook via subprocess, returning (exit_code, stdout, stderr)."""
-    payload = json.dumps({"tool_name": tool_name, "tool_input": tool_input})
-    result = subprocess.run(
-        ["uv", "run", SCRIPT],
-        input=payload,
-        capture_output=True,
-        text=True,
-        timeout=15,
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "e2e: run the hook as the real subprocess, not in-process"
+    )
+    config.addinivalue_line(
+        "markers", "equivalence: optimized engine checked against reference.py"
+    )
+    config.addinivalue_line(
+        "markers", "import_time: wall-clock budget, run without -n (serially)"
+    )
+
+
+@pytest.fixture(autouse=True)
+def _hook_mode(request, monkeypatch):
+    if request.node.get_closest_marker("e2e"):
+        monkeypatch.setattr(sys.modules[__name__], "_END_TO_END", True)
+        private_caches(monkeypatch, request.getfixturevalue("tmp_path"))
+
+
+def private_caches(monkeypatch, tmp_path: Path) -> None:
+    """Keep pattern caches and decision memos of hook processes in *tmp_path*.
+
+    uv keeps its package cache under $XDG_CACHE_HOME too; it stays where it
+    was, so `uv run` does not install PyYAML afresh for every test.
+    """
+    monkeypatch.setenv("TMPDIR", str(tmp_path))
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.setenv("UV_CACHE_DIR", _UV_CACHE_DIR)
+
+
+@functools.lru_cache(maxsize=None)
+def _session_config() -> dict:
+    """The bundled patterns, loaded and compiled once per test process."""
+    return dc.load_config()
+
+
+def fake_uv(tmp_path: Path) -> Path:
+    """A `uv` on PATH that logs its arguments and runs the script with pyyaml."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    uv = bin_dir / "uv"
+    uv.write_text(
+        f'#!/bin/sh\necho "$@" >> {tmp_path / "uv.log"}\n'
+        f'shift 2\nexec {sys.executable} "$@"\n'
     )
-    return result.returncode, result.stdout.strip(), result.stderr.strip()
+    uv.chmod(0o755)
+    return bin_dir
+
+
+def run_hook(tool_name: str, tool_input: dict) -> tuple:
+    """Run the hook on one tool call, returning (exit_code, stdout, stderr)."""
+    return run_payload(json.dumps({"tool_name": tool_name, "tool_input": tool_input}))
+
+
+def run_payload(payload: str) -> tuple:
+    """Run the hook on raw stdin *payload*, returning (exit_code, stdout, stderr).
+
+    In-process, main() sees the session config for every tool and no
+    decision memo, so each call is evaluated.
+    """
+    if _END_TO_END:
+        result = subprocess.run(
+            [sys.executable, LAUNCHER],
+            check=False,
+            cwd=Path(SCRIPT).parent,
+            input=payload,
+            capture_output=True,
+            text=True,
+            timeout=15,
+        )
+        return result.returncode, result.stdout.strip(), result.stderr.strip()
+    config = _session_config()
+    out, err = io.StringIO(), io.StringIO()
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(mock.patch("sys.stdin", io.StringIO(payload)))
+        stack.enter_context(
+            mock.patch.object(dc, "load_config", lambda sections=None: config)
+        )
+        stack.enter_context(mock.patch.object(dc.DecisionMemo, "active", lambda: None))
+        stack.enter_context(contextlib.redirect_stdout(out))
+        stack.enter_context(contextlib.redirect_stderr(err))
+        try:
+            dc.main()
+            code = 0
+        except SystemExit as e:
+            code = dc._exit_code(e)
+    return code, out.getvalue().strip(), err.getvalue().strip()
 
 
 def assert_allows(tool_name: str, tool_input: dict) -> None:
@@ -1,9 +1,12 @@
 """Tests for commands that should be allowed (not blocked or asked)."""
 
+import pytest
+
 from tests.conftest import run_hook
 
 
 class TestAllowedCommands:
+    @pytest.mark.e2e
     def test_allow_ls(self):
         code, stdout, _ = run_hook("Bash", {"command": "ls -la"})
         assert code == 0
@@ -0,0 +1,419 @@
+"""The pattern cache, its compiled rules and the decision memo (damage_control.py)."""
+
+from __future__ import annotations
+
+import io
+import json
+from pathlib import Path
+
+import damage_control
+import pytest
+import yaml
+from damage_control import (
+    _IR_KEY,
+    IR_VERSION,
+    BashMatcher,
+    RuleTable,
+    bash_matcher,
+    compile_bash_rules,
+    compile_patterns,
+    encode_rule_table,
+    load_patterns_dir,
+    main,
+    path_mentions,
+    path_policy,
+)
+
+
+class TestPatternCache:
+    """The merged config is cached in TMPDIR and invalidated on file change."""
+
+    def test_cache_invalidated_on_edit(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("tempfile.tempdir", str(tmp_path / "cache"))
+        (tmp_path / "cache").mkdir()
+        (tmp_path / "c.yaml").write_text(yaml.dump({"zeroAccessPaths": ["/x"]}))
+        first = load_patterns_dir(tmp_path)
+        assert first["zeroAccessPaths"] == ["/x"]
+        # Editing the source changes the mtime/size key, forcing a re-parse —
+        # proving stale data is never served after an edit.
+        (tmp_path / "c.yaml").write_text("THIS IS NOT VALID YAML: [")
+        with pytest.raises(yaml.YAMLError):
+            load_patterns_dir(tmp_path)
+
+    def test_cache_reused_when_unchanged(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("tempfile.tempdir", str(tmp_path / "cache"))
+        (tmp_path / "cache").mkdir()
+        (tmp_path / "c.yaml").write_text(yaml.dump({"zeroAccessPaths": ["/x"]}))
+
+        calls = {"n": 0}
+        real_load = damage_control._parse_yaml
+
+        def counting_load(stream):
+            calls["n"] += 1
+            return real_load(stream)
+
+        monkeypatch.setattr("damage_control._parse_yaml", counting_load)
+
+        first = load_patterns_dir(tmp_path)
+        parses_after_first = calls["n"]
+        assert parses_after_first > 0  # cold load parsed the file
+
+        second = load_patterns_dir(tmp_path)
+        # The warm config carries its bash rules as a mapped RuleTable.
+        assert {k: v for k, v in second.items() if k != _IR_KEY} == {
+            k: v for k, v in first.items() if k != _IR_KEY
+        }
+        assert calls["n"] == parses_after_first  # warm load did not re-parse
+
+    def test_cache_invalidated_on_source_change(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("tempfile.tempdir", str(tmp_path / "cache"))
+        (tmp_path / "cache").mkdir()
+        source = tmp_path / "damage_control.py"
+        source.write_bytes(Path(damage_control.__file__).read_bytes())
+        monkeypatch.setattr("damage_control.__file__", str(source))
+        damage_control._source_hash.cache_clear()
+        patterns = tmp_path / "patterns"
+        patterns.mkdir()
+        (patterns / "c.yaml").write_text(yaml.dump({"zeroAccessPaths": ["/x"]}))
+        load_patterns_dir(patterns)
+
+        calls = {"n": 0}
+        real_load = damage_control._parse_yaml
+
+        def counting_load(stream):
+            calls["n"] += 1
+            return real_load(stream)
+
+        monkeypatch.setattr("damage_control._parse_yaml", counting_load)
+        # A new hook version (e.g. an edited shorthand) must recompile even
+        # though no pattern file changed.
+        with source.open("a") as f:
+            f.write("# edited\n")
+        damage_control._source_hash.cache_clear()
+        load_patterns_dir(patterns)
+        damage_control._source_hash.cache_clear()
+        assert calls["n"] == 1
+
+    def test_edit_reparses_only_that_file(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("tempfile.tempdir", str(tmp_path / "cache"))
+        (tmp_path / "cache").mkdir()
+        patterns = tmp_path / "patterns"
+        patterns.mkdir()
+        for name in ("a", "b", "c"):
+            (patterns / f"{name}.yaml").write_text(
+                yaml.dump({"zeroAccessPaths": [f"/{name}"]})
+            )
+        load_patterns_dir(patterns)
+
+        parsed = []
+        real_load = damage_control._parse_yaml
+
+        def counting_load(stream):
+            parsed.append(stream)
+            return real_load(stream)
+
+        monkeypatch.setattr("damage_control._parse_yaml", counting_load)
+        (patterns / "b.yaml").write_text(yaml.dump({"zeroAccessPaths": ["/B"]}))
+        config = load_patterns_dir(patterns)
+        assert config["zeroAccessPaths"] == ["/a", "/B", "/c"]  # load order kept
+        assert len(parsed) == 1
+
+    def test_edited_patterns_analysed_again(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("tempfile.tempdir", str(tmp_path / "cache"))
+        (tmp_path / "cache").mkdir()
+        patterns = tmp_path / "patterns"
+        patterns.mkdir()
+        (patterns / "s.yaml").write_text(yaml.dump({"shorthands": {"x": "rm"}}))
+        (patterns / "t.yaml").write_text(
+            yaml.dump({"bashToolPatterns": [{"pattern": r"\b{x}\b"}]})
+        )
+        assert bash_matcher(load_patterns_dir(patterns)).first("rm a")
+        # Same pattern text, new shorthand: the cached analysis must not apply.
+        (patterns / "s.yaml").write_text(yaml.dump({"shorthands": {"x": "mv"}}))
+        matcher = bash_matcher(load_patterns_dir(patterns))
+        assert matcher.first("rm a") is None
+        assert matcher.first("mv a b")
+
+    def test_lock_timeout_parses_without_publishing(self, tmp_path, monkeypatch):
+        fcntl = pytest.importorskip("fcntl")
+        monkeypatch.setattr("tempfile.tempdir", str(tmp_path / "cache"))
+        monkeypatch.setattr("damage_control._LOCK_WAIT", 0.05)
+        (tmp_path / "cache").mkdir()
+        patterns = tmp_path / "patterns"
+        patterns.mkdir()
+        (patterns / "c.yaml").write_text(yaml.dump({"zeroAccessPaths": ["/x"]}))
+        cache_file = damage_control._cache_file(patterns)
+        with cache_file.with_suffix(".lock").open("w") as held:
+            fcntl.flock(held, fcntl.LOCK_EX)  # another hook is rebuilding
+            assert load_patterns_dir(patterns)["zeroAccessPaths"] == ["/x"]
+        assert not cache_file.exists()
+        assert not list((tmp_path / "cache").glob("*.tmp"))
+
+    def test_temp_dir_agrees_with_tempfile(self, tmp_path, monkeypatch):
+        import tempfile
+
+        for tmpdir in (tmp_path, tmp_path / "missing"):
+            monkeypatch.setattr("tempfile.tempdir", None)
+            monkeypatch.setenv("TMPDIR", str(tmpdir))
+            assert damage_control._temp_dir() == tempfile.gettempdir()
+
+    @pytest.fixture
+    def nested(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("tempfile.tempdir", str(tmp_path / "cache"))
+        (tmp_path / "cache").mkdir()
+        patterns = tmp_path / "patterns"
+        for sub in ("", "cloud", "languages"):
+            (patterns / sub).mkdir(exist_ok=True)
+            for name in ("a", "b"):
+                (patterns / sub / f"{name}.yaml").write_text(
+                    yaml.dump({"zeroAccessPaths": [f"/{sub}{name}"]})
+                )
+        load_patterns_dir(patterns)
+        return patterns
+
+    def _count_syscalls(self, monkeypatch, patterns):
+        """Stat syscalls and tree walks made by one load_patterns_dir()."""
+        calls = {"stat": 0, "walk": 0}
+        real_stat = Path.stat
+        real_walk = damage_control._pattern_files
+
+        def counting_stat(self, *args, **kwargs):
+            calls["stat"] += 1
+            return real_stat(self, *args, **kwargs)
+
+        def counting_walk(patterns_dir):
+            calls["walk"] += 1
+            return real_walk(patterns_dir)
+
+        with monkeypatch.context() as patch:
+            patch.setattr(Path, "stat", counting_stat)
+            patch.setattr("damage_control._pattern_files", counting_walk)
+            config = load_patterns_dir(patterns)
+        return config, calls
+
+    def test_warm_call_stats_manifest_only(self, nested, monkeypatch, capsys):
+        config, calls = self._count_syscalls(monkeypatch, nested)
+        with capsys.disabled():
+            print(f"\nwarm load_patterns_dir: {calls}")
+        assert len(config["zeroAccessPaths"]) == 6
+        # 3 directories + 6 pattern files + damage_control.py; no tree walk.
+        assert calls == {"stat": 10, "walk": 0}
+
+    def test_new_file_detected_through_directory_mtime(self, nested):
+        (nested / "cloud" / "c.yaml").write_text(
+            yaml.dump({"zeroAccessPaths": ["/new"]})
+        )
+        assert "/new" in load_patterns_dir(nested)["zeroAccessPaths"]
+
+    def test_removed_file_detected_through_directory_mtime(self, nested):
+        (nested / "languages" / "a.yaml").unlink()
+        assert "/languagesa" not in load_patterns_dir(nested)["zeroAccessPaths"]
+
+    def test_touched_directory_refreshes_manifest(self, nested, monkeypatch):
+        (nested / "scratch.txt").write_text("")  # not a pattern file
+        load_patterns_dir(nested)  # walks the tree once, same key
+        _, calls = self._count_syscalls(monkeypatch, nested)
+        assert calls["walk"] == 0
+
+
+class TestCompiledRules:
+    """Rules compiled into the cache decide exactly like freshly built ones."""
+
+    COMMANDS = [
+        "rm -rf /",
+        "git push --force origin main",
+        "cd repo && git reset --hard HEAD~1",
+        "kubectl delete ns prod",
+        "cat ~/.ssh/id_rsa",
+        "echo x > ~/.bashrc",
+        "rm .github/workflows/ci.yml",
+        "sed -i s/a/b/ package-lock.json",
+        "git status",
+        "ls -la",
+    ]
+    PATHS = ["~/.ssh/id_rsa", "/tmp/x.pem", "src/.env", "Cargo.lock", "src/main.py"]
+
+    @pytest.fixture
+    def compiled(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("tempfile.tempdir", str(tmp_path))
+        patterns_dir = Path(__file__).parent.parent / "patterns"
+        load_patterns_dir(patterns_dir)  # cold: compiles and writes the cache
+        return load_patterns_dir(patterns_dir)  # warm: read back from the cache
+
+    def test_cache_carries_compiled_rules(self, compiled):
+        assert compiled[_IR_KEY]["version"] == IR_VERSION
+        assert compiled[_IR_KEY]["bash"]
+
+    def test_same_decisions_as_uncompiled(self, compiled):
+        plain = {k: v for k, v in compiled.items() if k != _IR_KEY}
+        for command in self.COMMANDS:
+            got = bash_matcher(compiled).first(command)
+            assert got == bash_matcher(plain).first(command), command
+            got = path_mentions(compiled).find(command)
+            assert got == path_mentions(plain).find(command), command
+        for key in ("zeroAccessPaths", "readOnlyPaths"):
+            for path in self.PATHS:
+                got = path_policy(compiled, key).first(path)
+                assert got == path_policy(plain, key).first(path), (key, path)
+
+    def test_stale_version_rebuilds_from_config(self, compiled):
+        stale = dict(compiled)
+        stale[_IR_KEY] = {**compiled[_IR_KEY], "version": IR_VERSION - 1, "bash": []}
+        assert bash_matcher(stale).first("rm -rf /") is not None
+
+    def test_sections_load_independently(self, compiled):
+        patterns_dir = Path(__file__).parent.parent / "patterns"
+        read = load_patterns_dir(patterns_dir, ["zeroAccessPaths"])
+        assert "bashToolPatterns" not in read
+        assert "bash" not in read[_IR_KEY]
+        assert read["zeroAccessPaths"] == compiled["zeroAccessPaths"]
+        for path in self.PATHS:
+            got = path_policy(read, "zeroAccessPaths").first(path)
+            assert got == path_policy(compiled, "zeroAccessPaths").first(path), path
+
+    def test_compile_subcommand_writes_cache(self, tmp_path, monkeypatch, capsys):
+        monkeypatch.setattr("tempfile.tempdir", str(tmp_path / "cache"))
+        (tmp_path / "cache").mkdir()
+        (tmp_path / "c.yaml").write_text(
+            yaml.dump({"bashToolPatterns": [{"pattern": r"\brm\b"}]})
+        )
+        monkeypatch.setattr("damage_control.get_patterns_dir", lambda: tmp_path)
+        compile_patterns()
+        assert "compiled 1 command patterns" in capsys.readouterr().out
+        assert damage_control._cache_file(tmp_path).exists()
+
+    def test_compile_subcommand_without_patterns_dir(self, monkeypatch):
+        monkeypatch.setattr("damage_control.get_patterns_dir", lambda: None)
+        with pytest.raises(SystemExit) as exc:
+            compile_patterns()
+        assert exc.value.code == 1
+
+
+class TestRuleTable:
+    """The binary rule table decodes to the rules it was built from."""
+
+    PATTERNS = [
+        {"pattern": r"\brm\s+-rf\b", "reason": "rm"},
+        {"pattern": r"git\s+push\s+--force", "reason": "push", "block": True},
+        {"pattern": r"[a-z]+", "reason": "no literal", "match_anywhere": True},
+        {"pattern": r"\bcafé\b", "reason": "crème brûlée"},
+        {"pattern": "(", "reason": "does not parse"},
+    ]
+
+    @pytest.fixture
+    def rules(self):
+        return compile_bash_rules(self.PATTERNS, {})
+
+    def test_round_trip(self, rules):
+        table = RuleTable(encode_rule_table(rules))
+        assert len(table) == len(rules)
+        assert [table.rule(p) for p in range(len(table))] == rules
+
+    def test_matcher_agrees_with_rules(self, rules):
+        from_table = BashMatcher.from_table(RuleTable(encode_rule_table(rules)))
+        from_rules = BashMatcher.from_rules(rules)
+        for command in ["rm -rf /", "git push --force", "café", "ls", "RM -RF x"]:
+            assert from_table.first(command) == from_rules.first(command), command
+
+    def test_decodes_only_selected_rules(self, rules):
+        matcher = BashMatcher.from_table(RuleTable(encode_rule_table(rules)))
+        matcher.candidates("git push --force")
+        assert sorted(matcher.rules._memo) == [1, 2]  # push + the no-literal rule
+
+    def test_rejects_other_data(self):
+        with pytest.raises(ValueError):
+            RuleTable(b"\0" * 64)
+
+
+class TestDecisionMemo:
+    """main() replays remembered decisions until the policy changes."""
+
+    @pytest.fixture
+    def patterns(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("tempfile.tempdir", str(tmp_path / "cache"))
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "xdg"))
+        (tmp_path / "cache").mkdir()
+        patterns = tmp_path / "patterns"
+        patterns.mkdir()
+        (patterns / "c.yaml").write_text(
+            yaml.dump({"bashToolPatterns": [{"pattern": r"\brm\b", "reason": "rm"}]})
+        )
+        monkeypatch.setattr("damage_control.get_patterns_dir", lambda: patterns)
+        return patterns
+
+    @staticmethod
+    def run(monkeypatch, capsys, command: str) -> tuple[int, str]:
+        payload = json.dumps({"tool_name": "Bash", "tool_input": {"command": command}})
+        monkeypatch.setattr("sys.stdin", io.StringIO(payload))
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+        return exc_info.value.code, capsys.readouterr().out
+
+    def test_hit_skips_evaluation(self, patterns, monkeypatch, capsys):
+        first = self.run(monkeypatch, capsys, "rm x")
+        decision = json.loads(first[1])["hookSpecificOutput"]
+        assert decision["permissionDecisionReason"] == "rm"
+
+        def fail(sections=None):
+            raise AssertionError("evaluated again")
+
+        monkeypatch.setattr("damage_control.load_config", fail)
+        assert self.run(monkeypatch, capsys, "rm x") == first
+
+    def test_pattern_edit_invalidates(self, patterns, monkeypatch, capsys):
+        assert self.run(monkeypatch, capsys, "rm x")[1]
+        (patterns / "c.yaml").write_text(yaml.dump({"bashToolPatterns": []}))
+        assert self.run(monkeypatch, capsys, "rm x") == (0, "")
+
+    def test_warm_call_checks_the_cache_once(self, patterns, monkeypatch, capsys):
+        load_patterns_dir(patterns)
+        checks = []
+        current = damage_control._manifest_current
+        monkeypatch.setattr(
+            "damage_control._manifest_current",
+            lambda manifest: checks.append(manifest) or current(manifest),
+        )
+        assert not damage_control.needs_yaml()
+        assert self.run(monkeypatch, capsys, "rm x")[1]  # a memo miss
+        assert len(checks) == 1
+        # The reuse ends with the call: the next one checks again.
+        self.run(monkeypatch, capsys, "rm x")
+        assert len(checks) == 2
+
+    def test_evicts_least_recently_used(self, patterns, monkeypatch):
+        monkeypatch.setattr("damage_control._DECISION_ENTRIES", 2)
+        load_patterns_dir(patterns)
+        memo = damage_control.DecisionMemo.active()
+        for key in ("a", "b", "c"):
+            memo.put(key, (0, "", ""))
+        assert memo.get("a") is None
+        assert memo.get("c") == (0, "", "")
+
+    def test_entries_expire(self, patterns, monkeypatch):
+        load_patterns_dir(patterns)
+        memo = damage_control.DecisionMemo.active()
+        memo.put("a", (2, "", "SECURITY: x"))
+        now = damage_control.time.time()
+        later = now + damage_control._DECISION_MAX_AGE + 1
+        monkeypatch.setattr("damage_control.time.time", lambda: later)
+        assert memo.get("a") is None
+
+    def test_stored_in_private_user_cache_dir(self, patterns, tmp_path):
+        load_patterns_dir(patterns)
+        memo = damage_control.DecisionMemo.active()
+        assert memo.path.parent == tmp_path / "xdg" / "damage-control"
+        assert memo.path.parent.stat().st_mode & 0o777 == 0o700
+        assert not list((tmp_path / "cache").glob("*.decisions.json"))
+
+    def test_shared_cache_dir_refused(self, patterns, tmp_path):
+        load_patterns_dir(patterns)
+        (tmp_path / "xdg" / "damage-control").mkdir(parents=True, mode=0o777)
+        (tmp_path / "xdg" / "damage-control").chmod(0o777)
+        assert damage_control.DecisionMemo.active() is None
+
+    def test_key_covers_only_the_decision_field(self):
+        key = damage_control.decision_key
+        read = {"tool_name": "Read", "tool_input": {"file_path": "/a", "limit": 5}}
+        assert key(read) == key({**read, "tool_input": {"file_path": "/a"}})
+        assert key(read) != key({**read, "tool_name": "Edit"})
+        assert key(read) != key({**read, "tool_input": {"file_path": "/b"}})
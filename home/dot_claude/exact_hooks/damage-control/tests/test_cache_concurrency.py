@@ -0,0 +1,85 @@
+"""Concurrent hooks against a cold pattern cache: one rebuild, no torn reads."""
+
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+from tests.conftest import SCRIPT, dc
+
+HOOKS = 24
+
+# Each process counts its YAML parses in a shared append-only log and prints
+# a digest of the config it loaded.
+WORKER = """
+import hashlib, json, os, sys
+sys.path.insert(0, os.path.dirname(sys.argv[1]))
+import damage_control as dc
+
+real_load = dc._parse_yaml
+
+def counting_load(stream):
+    with open(sys.argv[3], "a") as log:
+        log.write(f"{os.getpid()}\\n")
+    return real_load(stream)
+
+dc._parse_yaml = counting_load
+config = dc.load_patterns_dir(dc.Path(sys.argv[2]))
+config.pop(dc._IR_KEY)
+print(hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest())
+"""
+
+
+def _run_hooks(tmp_path: Path, patterns: Path) -> tuple:
+    log = tmp_path / "parses.log"
+    env = {**os.environ, "TMPDIR": str(tmp_path / "cache")}
+    procs = [
+        subprocess.Popen(
+            [sys.executable, "-c", WORKER, SCRIPT, str(patterns), str(log)],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            env=env,
+        )
+        for _ in range(HOOKS)
+    ]
+    digests = []
+    for proc in procs:
+        out, err = proc.communicate(timeout=60)
+        assert proc.returncode == 0, err
+        digests.append(out.strip())
+    parsers = log.read_text().split() if log.exists() else []
+    return digests, parsers
+
+
+def test_cold_cache_rebuilt_once(tmp_path, monkeypatch):
+    patterns = tmp_path / "patterns"
+    shutil.copytree(Path(SCRIPT).parent / "patterns", patterns)
+    (tmp_path / "cache").mkdir()
+    files = list(patterns.rglob("*.yaml"))
+    monkeypatch.setattr("tempfile.tempdir", str(tmp_path / "cache"))
+
+    digests, parsers = _run_hooks(tmp_path, patterns)
+
+    assert len(set(digests)) == 1  # every hook read a complete config
+    assert len(set(parsers)) == 1  # single-flight: one process parsed
+    assert len(parsers) == len(files)  # ...and parsed each file once
+    header, body = dc._read_cache_header(dc._cache_file(patterns))
+    assert dc._decode_sections(header, body, ["bash"])["bashToolPatterns"]
+    assert not list((tmp_path / "cache").glob("*.tmp"))
+
+
+def test_edit_under_load_rebuilt_once(tmp_path):
+    patterns = tmp_path / "patterns"
+    shutil.copytree(Path(SCRIPT).parent / "patterns", patterns)
+    (tmp_path / "cache").mkdir()
+    _run_hooks(tmp_path, patterns)
+    (tmp_path / "parses.log").unlink()
+
+    edited = sorted(patterns.rglob("*.yaml"))[0]
+    edited.write_text(edited.read_text() + "\n# edited\n")
+    digests, parsers = _run_hooks(tmp_path, patterns)
+
+    assert len(set(digests)) == 1
+    assert parsers == parsers[:1]  # one process re-parsed the edited file only
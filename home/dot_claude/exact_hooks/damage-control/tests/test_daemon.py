@@ -0,0 +1,231 @@
+"""Tests for daemon mode: `damage_control.py serve` plus the hook.py client."""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import hook
+import pytest
+
+from tests.conftest import SCRIPT, dc, fake_uv, private_caches
+
+HOOK = str(Path(__file__).parent.parent / "hook.py")
+# AF_UNIX paths are limited to ~104 bytes, too short for pytest's tmp_path:
+# sockets go in the system temp dir, looked up before tests point TMPDIR
+# at tmp_path.
+SOCKET_ROOT = tempfile.gettempdir()
+
+
+def _payload(tool_name: str, tool_input: dict) -> str:
+    return json.dumps({"tool_name": tool_name, "tool_input": tool_input})
+
+
+def _wait_for(path: str, proc: subprocess.Popen) -> None:
+    deadline = time.monotonic() + 30
+    while not Path(path).exists():
+        assert proc.poll() is None, proc.stderr.read()
+        assert time.monotonic() < deadline, "daemon did not start"
+        time.sleep(0.05)
+
+
+@pytest.fixture(autouse=True)
+def _private_caches(tmp_path, monkeypatch):
+    private_caches(monkeypatch, tmp_path)
+
+
+@pytest.fixture
+def daemon(monkeypatch):
+    """A running daemon on a private socket; yields the socket path."""
+    sock_dir = tempfile.mkdtemp(prefix="dc-", dir=SOCKET_ROOT)
+    sock = str(Path(sock_dir) / "dc.sock")
+    monkeypatch.setenv("DAMAGE_CONTROL_SOCKET", sock)
+    proc = subprocess.Popen(
+        ["uv", "run", SCRIPT, "serve"],
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        _wait_for(sock, proc)
+        yield sock
+    finally:
+        proc.terminate()
+        proc.wait(timeout=15)
+        shutil.rmtree(sock_dir, ignore_errors=True)
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    """A $CLAUDE_PROJECT_DIR with its own patterns directory."""
+    patterns = tmp_path / ".claude" / "hooks" / "damage-control" / "patterns"
+    patterns.mkdir(parents=True)
+    monkeypatch.setenv("CLAUDE_PROJECT_DIR", str(tmp_path))
+    return patterns
+
+
+def run_client(tool_name: str, tool_input: dict) -> tuple:
+    """Run hook.py the way Claude Code would, returning (code, stdout, stderr)."""
+    result = subprocess.run(
+        ["uv", "run", HOOK],
+        input=_payload(tool_name, tool_input),
+        capture_output=True,
+        text=True,
+        timeout=15,
+    )
+    return result.returncode, result.stdout.strip(), result.stderr.strip()
+
+
+def _run_without_yaml(script: str, payload: str, env: dict) -> tuple:
+    """Run *script* with site-packages (and so PyYAML) out of reach."""
+    result = subprocess.run(
+        [sys.executable, "-S", script],
+        check=False,
+        input=payload,
+        capture_output=True,
+        text=True,
+        env=env,
+        timeout=30,
+    )
+    return result.returncode, result.stdout.strip(), result.stderr.strip()
+
+
+class TestDaemon:
+    def test_daemon_answers_ask(self, daemon):
+        code, stdout, _ = hook.forward(
+            _payload("Bash", {"command": "git reset --hard"}), daemon
+        )
+        assert code == 0
+        decision = json.loads(stdout)["hookSpecificOutput"]
+        assert decision["permissionDecision"] == "ask"
+        assert "reset --hard" in decision["permissionDecisionReason"]
+
+    def test_daemon_answers_allow(self, daemon):
+        assert hook.forward(_payload("Bash", {"command": "ls -la"}), daemon) == (
+            0,
+            "",
+            "",
+        )
+
+    def test_daemon_reports_invalid_json(self, daemon):
+        code, _, stderr = hook.forward("not json", daemon)
+        assert code == 1
+        assert "Error" in stderr
+
+    def test_daemon_uses_project_patterns(self, project, daemon):
+        (project / "p.yaml").write_text(
+            "bashToolPatterns:\n"
+            "  - pattern: '\\bdeploy\\b'\n"
+            "    reason: no deploys\n"
+            "    block: true\n"
+        )
+        code, _, stderr = hook.forward(_payload("Bash", {"command": "deploy"}), daemon)
+        assert code == 2
+        assert "no deploys" in stderr
+
+    def test_daemon_reloads_on_pattern_change(self, project, daemon):
+        rules = project / "p.yaml"
+        rules.write_text(
+            "bashToolPatterns:\n  - pattern: '\\bfoo\\b'\n    reason: foo rule\n"
+        )
+        payload = _payload("Bash", {"command": "bar"})
+        assert hook.forward(payload, daemon) == (0, "", "")
+
+        rules.write_text(
+            "bashToolPatterns:\n  - pattern: '\\bbar\\b'\n    reason: bar rule now\n"
+        )
+        code, stdout, _ = hook.forward(payload, daemon)
+        assert code == 0
+        reason = json.loads(stdout)["hookSpecificOutput"]["permissionDecisionReason"]
+        assert reason == "bar rule now"
+
+    def test_daemon_serves_concurrent_requests(self, daemon):
+        commands = ["git reset --hard", "ls", "kubectl delete pod x", "pwd"] * 8
+
+        def ask(command):
+            return hook.forward(_payload("Bash", {"command": command}), daemon)
+
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            results = list(pool.map(ask, commands))
+        for command, (code, stdout, _) in zip(commands, results):
+            assert code == 0
+            assert bool(stdout) == (command not in ("ls", "pwd")), command
+
+    def test_second_daemon_refuses_live_socket(self, daemon):
+        result = subprocess.run(
+            ["uv", "run", SCRIPT, "serve"],
+            capture_output=True,
+            text=True,
+            timeout=15,
+        )
+        assert result.returncode == 1
+        assert "already listening" in result.stderr
+
+    def test_stale_socket_of_another_user(self, tmp_path, monkeypatch, capsys):
+        path = tmp_path / "dc.sock"
+        path.touch()  # nothing listens on it
+
+        def unlink(self, missing_ok=False):
+            raise PermissionError(1, "Operation not permitted", str(self))
+
+        monkeypatch.setattr(Path, "unlink", unlink)
+        with pytest.raises(SystemExit) as exc_info:
+            dc._make_server(path)
+        assert exc_info.value.code == 1
+        assert "cannot remove stale socket" in capsys.readouterr().err
+
+    def test_client_relays_daemon_decision(self, daemon):
+        code, stdout, _ = run_client("Bash", {"command": "git stash clear"})
+        assert code == 0
+        assert json.loads(stdout)["hookSpecificOutput"]["permissionDecision"] == "ask"
+
+
+class TestClientFallback:
+    """Without a daemon the client evaluates in-process with the same result."""
+
+    @pytest.fixture(autouse=True)
+    def _no_daemon(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("DAMAGE_CONTROL_SOCKET", str(tmp_path / "missing.sock"))
+
+    def test_forward_returns_none(self):
+        assert hook.forward(_payload("Bash", {"command": "ls"})) is None
+
+    def test_fallback_asks(self):
+        code, stdout, _ = run_client("Bash", {"command": "git reset --hard"})
+        assert code == 0
+        assert json.loads(stdout)["hookSpecificOutput"]["permissionDecision"] == "ask"
+
+    def test_fallback_allows(self):
+        assert run_client("Bash", {"command": "ls -la"}) == (0, "", "")
+
+    def test_cold_cache_without_yaml_evaluates_through_uv(self, tmp_path):
+        env = dict(os.environ)
+        env["PATH"] = f"{fake_uv(tmp_path)}:{env['PATH']}"
+        payload = _payload("Bash", {"command": "rm -rf /"})
+        code, stdout, _ = _run_without_yaml(HOOK, payload, env)
+        assert code == 0
+        assert json.loads(stdout)["hookSpecificOutput"]["permissionDecision"] == "ask"
+        launcher = Path(HOOK).parent / "launcher.py"
+        assert (tmp_path / "uv.log").read_text() == f"run --script {launcher}\n"
+
+    def test_cold_cache_without_yaml_or_uv_blocks(self, tmp_path):
+        env = {**os.environ, "PATH": str(tmp_path)}
+        payload = _payload("Bash", {"command": "ls"})
+        code, _, stderr = _run_without_yaml(HOOK, payload, env)
+        assert code == 2
+        assert "SECURITY" in stderr
+
+    def test_fallback_invalid_json(self):
+        result = subprocess.run(
+            ["uv", "run", HOOK],
+            input="not json",
+            capture_output=True,
+            text=True,
+            timeout=15,
+        )
+        assert result.returncode == 1
+        assert "Error" in result.stderr
@@ -0,0 +1,607 @@
+"""Decisions, the compiled matchers and the hook entry point (damage_control.py)."""
+
+from __future__ import annotations
+
+import io
+import json
+import re
+from pathlib import Path
+
+import damage_control
+import pytest
+from damage_control import (
+    _CMD_POSITION_PREFIX,
+    NO_DELETE_BLOCKED,
+    READ_ONLY_BLOCKED,
+    BashMatcher,
+    Decision,
+    KeywordAutomaton,
+    OperationGate,
+    PathMentions,
+    PathPolicy,
+    _expand_shorthands,
+    bash_matcher,
+    batch,
+    check_path_patterns,
+    evaluate,
+    handle_bash,
+    handle_edit,
+    load_config,
+    main,
+    match_path,
+    path_policy,
+    required_literals,
+    segment_starts,
+)
+
+
+def _full_pattern(yaml_pattern: str, match_anywhere: bool = False) -> str:
+    """Simulate the regex construction from handle_bash."""
+    expanded = _expand_shorthands(yaml_pattern, {})
+    if not match_anywhere:
+        expanded = _CMD_POSITION_PREFIX + expanded
+    return expanded
+
+
+# ---------------------------------------------------------------------------
+# Decision
+# ---------------------------------------------------------------------------
+
+
+class TestDecisionOutput:
+    """Verify how a Decision is reported to the hook caller."""
+
+    def test_block_exits_with_code_2(self):
+        code, _, _ = Decision("block", "some reason", target="some context").output()
+        assert code == 2
+
+    def test_block_prints_security_and_target(self):
+        _, out, err = Decision("block", "some reason", target="some context").output()
+        assert out == ""
+        assert err == "SECURITY: Blocked: some reason\nTarget: some context\n"
+
+    def test_long_context_truncated(self):
+        _, _, err = Decision("block", "reason", target="x" * 200).output()
+        assert "..." in err
+
+    def test_context_at_100_chars_not_truncated(self):
+        _, _, err = Decision("block", "reason", target="x" * 100).output()
+        assert "..." not in err
+        assert "x" * 100 in err
+
+    def test_ask_emits_permission_decision(self):
+        code, out, err = Decision("ask", "why").output()
+        assert (code, err) == (0, "")
+        decision = json.loads(out)["hookSpecificOutput"]
+        assert decision["permissionDecision"] == "ask"
+        assert decision["permissionDecisionReason"] == "why"
+
+    def test_allow_is_silent(self):
+        assert Decision("allow").output() == (0, "", "")
+
+
+# ---------------------------------------------------------------------------
+# evaluate
+# ---------------------------------------------------------------------------
+
+
+class TestEvaluate:
+    """evaluate() returns the decision instead of exiting."""
+
+    CONFIG = {
+        "bashToolPatterns": [
+            {"pattern": r"\bgit\s+status\b", "reason": "status"},
+            {"pattern": r"\bgit\s+push\b", "reason": "no pushing", "block": True},
+        ],
+        "zeroAccessPaths": ["~/.ssh/", {"path": ".env", "block": True}],
+        "readOnlyPaths": ["/etc/"],
+        "noDeletePaths": ["README.md"],
+    }
+
+    @pytest.mark.parametrize(
+        "tool_name, tool_input, expected",
+        [
+            ("Bash", {"command": "ls"}, ("allow", None)),
+            ("Bash", {"command": "git status"}, ("ask", "bashToolPatterns[0]")),
+            ("Bash", {"command": "git push"}, ("block", "bashToolPatterns[1]")),
+            ("Bash", {"command": "cat .env"}, ("block", "zeroAccessPaths[1]")),
+            ("Bash", {"command": "rm /etc/hosts"}, ("ask", "readOnlyPaths[0]")),
+            ("Bash", {"command": "rm README.md"}, ("ask", "noDeletePaths[0]")),
+            ("Edit", {"file_path": "/etc/hosts"}, ("ask", "readOnlyPaths[0]")),
+            ("Write", {"file_path": ".env"}, ("block", "zeroAccessPaths[1]")),
+            ("Read", {"file_path": "/etc/hosts"}, ("allow", None)),
+            ("Grep", {"path": "~/.ssh/"}, ("ask", "zeroAccessPaths[0]")),
+            ("Unknown", {"command": "git push"}, ("allow", None)),
+        ],
+    )
+    def test_action_and_rule(self, tool_name, tool_input, expected):
+        payload = {"tool_name": tool_name, "tool_input": tool_input}
+        decision = evaluate(payload, self.CONFIG)
+        assert (decision.action, decision.rule) == expected
+
+    def test_repeatable_without_exiting(self):
+        payload = {"tool_name": "Bash", "tool_input": {"command": "git push"}}
+        first = evaluate(payload, self.CONFIG)
+        assert evaluate(payload, self.CONFIG) == first
+        assert first.reason == "no pushing"
+        assert first.target == "git push"
+
+    def test_matches_handler_output(self, capsys):
+        payload = {"tool_name": "Edit", "tool_input": {"file_path": "/etc/hosts"}}
+        with pytest.raises(SystemExit) as exc_info:
+            handle_edit(payload["tool_input"], self.CONFIG)
+        captured = capsys.readouterr()
+        reported = (exc_info.value.code, captured.out, captured.err)
+        assert evaluate(payload, self.CONFIG).output() == reported
+
+
+class TestBatch:
+    """batch() decides every JSONL payload on stdin against one config."""
+
+    def test_one_decision_per_line(self, monkeypatch, capsys):
+        loads = []
+        monkeypatch.setattr(
+            "damage_control.load_config",
+            lambda sections=None: loads.append(sections) or TestEvaluate.CONFIG,
+        )
+        lines = [
+            json.dumps({"tool_name": "Bash", "tool_input": {"command": "git push"}}),
+            "not json",
+            "",
+            json.dumps(["not", "a", "payload"]),
+            json.dumps({"tool_name": "Read", "tool_input": {"file_path": "a.txt"}}),
+        ]
+        monkeypatch.setattr("sys.stdin", io.StringIO("\n".join(lines) + "\n"))
+        batch()
+        results = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert loads == [None]
+        assert results[0] == {
+            "action": "block",
+            "reason": "no pushing",
+            "rule": "bashToolPatterns[1]",
+        }
+        assert "error" in results[1]
+        assert "error" in results[2]
+        assert results[3] == {"action": "allow", "reason": "", "rule": None}
+        assert len(results) == 4
+
+
+# ---------------------------------------------------------------------------
+# BashMatcher — compiled bashToolPatterns
+# ---------------------------------------------------------------------------
+
+
+def _loop_first(config: dict, command: str) -> str | None:
+    """Reason of the first pattern the original per-call loop would match."""
+    for item in config.get("bashToolPatterns", []):
+        full = _full_pattern(item["pattern"], item.get("match_anywhere", False))
+        full = _expand_shorthands(full, config.get("shorthands", {}))
+        if re.search(full, command, re.IGNORECASE):
+            return item["reason"]
+    return None
+
+
+class TestBashMatcher:
+    """The compiled matcher reports the same rule as the in-order loop."""
+
+    def test_file_order_beats_match_position(self):
+        """An earlier rule wins even when a later rule matches further left."""
+        matcher = BashMatcher(
+            [
+                {"pattern": r"\bbar\b", "reason": "bar"},
+                {"pattern": r"\bfoo\b", "reason": "foo"},
+            ],
+            {},
+        )
+        assert matcher.first("foo; bar").reason == "bar"
+
+    def test_invalid_regex_dropped(self):
+        matcher = BashMatcher(
+            [
+                {"pattern": "[invalid", "reason": "bad"},
+                {"pattern": r"\brm\b", "reason": "rm"},
+            ],
+            {},
+        )
+        assert [rule.reason for rule in matcher.rules] == ["rm"]
+        assert matcher.first("rm x").index == 1
+
+    def test_anchoring_and_match_anywhere(self):
+        matcher = BashMatcher(
+            [
+                {"pattern": r"\bmount\b", "reason": "mount"},
+                {"pattern": r">\s*/etc/", "reason": "redirect", "match_anywhere": True},
+            ],
+            {},
+        )
+        assert matcher.first('git commit -m "fix mount"') is None
+        assert matcher.first("echo x > /etc/hosts").reason == "redirect"
+
+    def test_block_flag_and_default_reason(self):
+        matcher = BashMatcher([{"pattern": r"\bpush\b", "block": True}], {})
+        rule = matcher.first("push")
+        assert rule.block is True
+        assert rule.reason == "Matched damage-control pattern"
+
+    def test_custom_shorthands_expanded(self):
+        matcher = BashMatcher(
+            [{"pattern": r"{env}\bdeploy\b", "reason": "deploy"}],
+            {"env": r"(?:env\s+)?"},
+        )
+        assert matcher.first("env deploy").reason == "deploy"
+
+    def test_compiled_once_per_config(self):
+        config = {"bashToolPatterns": [{"pattern": r"\bx\b", "reason": "x"}]}
+        assert bash_matcher(config) is bash_matcher(config)
+        assert bash_matcher(config) is not bash_matcher(dict(config))
+
+    def test_agrees_with_loop_on_real_config(self):
+        config = load_config()
+        matcher = bash_matcher(config)
+        for command in [
+            "ls -la",
+            "git status && git push --force origin main",
+            "cd repo\nkubectl --context prod delete pod x",
+            "sudo apt install -y jq",
+            'git commit -m "rm -rf is scary"',
+            "echo ok | sudo tee /etc/hosts",
+        ]:
+            rule = matcher.first(command)
+            assert (rule and rule.reason) == _loop_first(config, command), command
+
+
+class TestKeywordPrefilter:
+    """Literal extraction and the Aho-Corasick pass that select candidate rules."""
+
+    @pytest.mark.parametrize(
+        ("pattern", "expected"),
+        [
+            (r"\bgit\s+reset\s+--hard\b", {"--hard"}),
+            (r"\bRM\b", {"rm"}),
+            (r"\b(?:kubectl|oc)\s+x", {"kubectl", "oc"}),
+            (r"(?:foo)+bar", {"foo"}),
+            (r"(?:--force)?\s*x", {"x"}),
+            (r"[a-z]+\s*", None),
+            (r"a|\w+", None),
+        ],
+    )
+    def test_required_literals(self, pattern, expected):
+        result = required_literals(pattern)
+        assert (result if result is None else set(result)) == expected
+
+    def test_prefix_alternation_quirk(self):
+        """Only the first alternative of a top-level `|` gets the prefix."""
+        literals = required_literals(_CMD_POSITION_PREFIX + r"\bshred\b|\bwipefs\b")
+        assert literals == {"shred", "wipefs"}
+
+    def test_automaton_finds_overlapping_keywords(self):
+        automaton = KeywordAutomaton(["he", "she", "his", "hers"])
+        assert automaton.find("ushers") == {"he", "she", "hers"}
+        assert automaton.find("nothing") == set()
+
+    def test_unicode_case_folding(self):
+        """IGNORECASE lets the Kelvin sign match 'k'; the prefilter must too."""
+        matcher = BashMatcher([{"pattern": r"\bkill\b", "reason": "kill"}], {})
+        assert matcher.first("\u212aill 1").reason == "kill"
+
+    def test_unrelated_command_has_no_candidates(self):
+        matcher = bash_matcher(load_config())
+        assert matcher.candidates("ls -la") == []
+        assert matcher.candidates("git reset --hard")
+
+
+class TestCommandSegments:
+    """Segment starts and leading words reproduce _CMD_POSITION_PREFIX."""
+
+    @pytest.mark.parametrize(
+        ("command", "expected"),
+        [
+            ("ls", [0]),
+            ("a;b", [0, 2]),
+            ("a ;  b", [0, 3, 4, 5]),
+            ("a && b", [0, 3, 4, 5]),
+            ("for x in y; do rm x; done", [0, 11, 12, 15, 20, 21]),
+            ("if x\nTHEN y", [0, 5, 10]),
+            ("echo 'a; b'", [0, 8, 9]),
+        ],
+    )
+    def test_segment_starts(self, command, expected):
+        assert segment_starts(command) == expected
+
+    def test_starts_agree_with_prefix(self):
+        """Every offset the prefix can end at, and no other, is a start."""
+        prefix = re.compile(_CMD_POSITION_PREFIX + r"\Z", re.IGNORECASE)
+        command = "x; do  y\n(z) || {elif\tw; done} & else"
+        ends = {
+            end
+            for start in range(len(command) + 1)
+            for end in range(start, len(command) + 1)
+            if prefix.match(command[:end], start)
+        }
+        assert segment_starts(command) == sorted(ends)
+
+    def test_leading_words(self):
+        matcher = BashMatcher(
+            [
+                {"pattern": r"{sudo}\bapt{flags}remove\b", "reason": "apt"},
+                {"pattern": r"\b(?:docker|podman)\s+rm\b", "reason": "rm"},
+            ],
+            {},
+        )
+        assert [rule.leads for rule in matcher.rules] == [
+            ("apt", "sudo"),
+            ("docker", "podman"),
+        ]
+        assert matcher.first("ls; sudo apt remove x").reason == "apt"
+        assert matcher.first("echo podman rm x") is None
+
+    def test_top_level_alternation_stays_unanchored(self):
+        """The prefix only binds the first alternative, as it always has."""
+        matcher = BashMatcher([{"pattern": r"\bshred\b|\bwipefs\b"}], {})
+        assert matcher.rules[0].body is None
+        assert matcher.first("echo shred") is None
+        assert matcher.first("echo wipefs") is not None
+
+
+# ---------------------------------------------------------------------------
+# PathPolicy — compiled path lists
+# ---------------------------------------------------------------------------
+
+
+def _loop_path(entries: list, file_path: str) -> str | None:
+    """First entry the original match_path() loop would report."""
+    for entry in entries:
+        path = entry["path"] if isinstance(entry, dict) else entry
+        if match_path(file_path, path):
+            return path
+    return None
+
+
+class TestPathPolicy:
+    """The indexed path lists report the same entry as the in-order loop."""
+
+    def test_list_order_beats_specificity(self):
+        policy = PathPolicy(["*.key", "~/.ssh/"])
+        assert policy.first(str(Path.home() / ".ssh" / "id.key")).path == "*.key"
+
+    def test_prefix_is_character_level(self):
+        """match_path() uses startswith(), so `~/.ssh/` also covers `~/.sshx`."""
+        policy = PathPolicy(["~/.ssh/"])
+        assert policy.first(str(Path.home() / ".sshx")).index == 0
+        assert policy.first(str(Path.home() / ".ss")) is None
+
+    def test_suffix_glob_case_insensitive(self):
+        policy = PathPolicy(["/etc/", "*.PEM"])
+        assert policy.first("/tmp/server.pem").path == "*.PEM"
+
+    def test_residual_glob_matches_full_path(self):
+        policy = PathPolicy(["**/secrets/"])
+        assert policy.first("app/secrets/x") is None
+        assert policy.first("app/secrets").path == "**/secrets/"
+
+    def test_block_flag_kept(self):
+        policy = PathPolicy([{"path": "~/.aws/", "block": True}])
+        assert policy.first("~/.aws/credentials").block is True
+
+    def test_compiled_once_per_config(self):
+        config = {"zeroAccessPaths": ["*.pem"]}
+        assert path_policy(config, "zeroAccessPaths") is path_policy(
+            config, "zeroAccessPaths"
+        )
+
+    @pytest.mark.parametrize("key", ["zeroAccessPaths", "readOnlyPaths"])
+    def test_agrees_with_loop_on_real_config(self, key):
+        entries = load_config()[key]
+        policy = PathPolicy(entries)
+        home = str(Path.home())
+        for file_path in [
+            f"{home}/.ssh/id_rsa",
+            f"{home}/.sshfoo",
+            "/etc/hosts",
+            "src/app/.env.local",
+            "deploy/prod-secret.yaml",
+            "config/serviceAccountKey.json",
+            "Cargo.lock",
+            "/repo/Cargo.lock",
+            "dist/index.js",
+            "lib/foo.egg-info",
+            "README.md",
+            ".",
+            "..",
+            "~",
+        ]:
+            hit = policy.first(file_path)
+            assert (hit and hit.path) == _loop_path(entries, file_path), file_path
+
+
+class TestPathMentions:
+    """Only entries a command mentions reach the per-path checks."""
+
+    CONFIG = {
+        "zeroAccessPaths": ["~/.ssh/", "*.pem", "secrets/"],
+        "readOnlyPaths": ["/etc/", "*.lock"],
+        "noDeletePaths": ["README.md"],
+    }
+
+    def test_unrelated_command_mentions_nothing(self):
+        assert PathMentions(self.CONFIG).find("git status") == {
+            "zeroAccessPaths": [],
+            "readOnlyPaths": [],
+            "noDeletePaths": [],
+        }
+
+    def test_expanded_and_original_spellings(self):
+        mentions = PathMentions(self.CONFIG)
+        home = str(Path.home())
+        assert mentions.find(f"cat {home}/.ssh/id")["zeroAccessPaths"] == [0]
+        assert mentions.find("cat ~/.ssh/id")["zeroAccessPaths"] == [0]
+
+    def test_glob_literals_fold_case(self):
+        found = PathMentions(self.CONFIG).find("rm KEY.PEM Cargo.LOCK")
+        assert found["zeroAccessPaths"] == [1]
+        assert found["readOnlyPaths"] == [1]
+
+    def test_non_ascii_entry_always_checked(self):
+        mentions = PathMentions({"noDeletePaths": ["ΣΥΝ.md"]})
+        assert mentions.find("ls")["noDeletePaths"] == [0]
+
+    def test_handle_bash_uses_mentions(self, capsys):
+        with pytest.raises(SystemExit) as exc:
+            handle_bash({"command": "rm README.md"}, self.CONFIG)
+        assert exc.value.code == 0
+        reason = json.loads(capsys.readouterr().out)["hookSpecificOutput"][
+            "permissionDecisionReason"
+        ]
+        assert reason == "delete operation on no-delete path README.md"
+
+
+class TestOperationGate:
+    """Only operations a command can contain reach the path templates."""
+
+    def test_read_only_command_has_no_operations(self):
+        gate = OperationGate(READ_ONLY_BLOCKED)
+        for command in ["git status", "rg format src/", "cat ~/.bashrc", "pytest"]:
+            assert gate.present(command) == [], command
+
+    def test_operations_kept_in_template_order(self):
+        present = OperationGate(READ_ONLY_BLOCKED).present("rm -f a && echo b > c")
+        assert [op for _, op in present] == ["write", "delete"]
+
+    def test_case_insensitive_for_glob_checks(self):
+        assert OperationGate(NO_DELETE_BLOCKED).present("RM x.lock")
+
+    def test_gate_does_not_change_decisions(self):
+        config = load_config()
+        gate = OperationGate(READ_ONLY_BLOCKED)
+        for command in [
+            "sed -i s/a/b/ ~/.bashrc",
+            "echo x >> /etc/hosts",
+            "cat /etc/hosts",
+            "chmod 600 Cargo.lock",
+            "cp a.txt README.md",
+        ]:
+            present = gate.present(command)
+            for entry in config["readOnlyPaths"]:
+                path = entry["path"] if isinstance(entry, dict) else entry
+                full = check_path_patterns(
+                    command, path, READ_ONLY_BLOCKED, "read-only path"
+                )
+                gated = check_path_patterns(command, path, present, "read-only path")
+                assert full == gated, (command, path)
+
+
+# ---------------------------------------------------------------------------
+# read_payload
+# ---------------------------------------------------------------------------
+
+
+class TestReadPayload:
+    """The payload scanner keeps what the handlers read and skips the rest."""
+
+    @staticmethod
+    def read(data: dict | str) -> dict:
+        text = data if isinstance(data, str) else json.dumps(data)
+        return damage_control.read_payload(io.StringIO(text))
+
+    def test_keeps_tool_name_and_decision_fields(self):
+        payload = {
+            "session_id": "s",
+            "tool_name": "Write",
+            "tool_input": {"file_path": "/a", "content": "x" * 10_000},
+        }
+        assert self.read(payload) == {
+            "tool_name": "Write",
+            "tool_input": {"file_path": "/a"},
+        }
+
+    def test_escapes_across_chunk_boundaries(self, monkeypatch):
+        monkeypatch.setattr("damage_control._PAYLOAD_CHUNK", 1)
+        content = 'say "hi" \\" \\\\ \u00e9 {[,:]}' * 3
+        payload = {
+            "tool_name": "Edit",
+            "tool_input": {
+                "old_string": content,
+                "edits": [{"new_string": content}, 1, None],
+                "file_path": content,
+            },
+        }
+        assert self.read(payload)["tool_input"] == {"file_path": content}
+
+    def test_last_duplicate_wins(self):
+        text = '{"tool_name": "Read", "tool_name": "Bash", "tool_input": {}}'
+        assert self.read(text)["tool_name"] == "Bash"
+
+    @pytest.mark.parametrize(
+        "text",
+        [
+            "",
+            "[]",
+            '{"tool_name": "Bash"',
+            '{"tool_input": {"content": "x}',
+            '{"tool_name": "Bash"} garbage',
+            '{"tool_name": "Bash"}{}',
+            '{"a": tru}',
+            '{"tool_input": {"command": "ls", "timeout": 1e}}',
+        ],
+    )
+    def test_malformed_payload_raises(self, text):
+        with pytest.raises(json.JSONDecodeError):
+            self.read(text)
+
+
+# ---------------------------------------------------------------------------
+# main
+# ---------------------------------------------------------------------------
+
+
+class TestMain:
+    """Verify the main dispatcher."""
+
+    @pytest.fixture(autouse=True)
+    def _no_pattern_cache(self, tmp_path, monkeypatch):
+        # Without a current pattern cache main() has no policy to memoize under.
+        monkeypatch.setattr("tempfile.tempdir", str(tmp_path))
+
+    def test_valid_json_known_tool(self, monkeypatch):
+        input_data = json.dumps({"tool_name": "Bash", "tool_input": {"command": ""}})
+        monkeypatch.setattr("sys.stdin", io.StringIO(input_data))
+        monkeypatch.setattr("damage_control.load_config", lambda sections=None: {})
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+        assert exc_info.value.code == 0
+
+    def test_valid_json_unknown_tool(self, monkeypatch):
+        input_data = json.dumps({"tool_name": "Unknown", "tool_input": {}})
+        monkeypatch.setattr("sys.stdin", io.StringIO(input_data))
+        monkeypatch.setattr("damage_control.load_config", lambda sections=None: {})
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+        assert exc_info.value.code == 0
+
+    def test_loads_only_the_tools_sections(self, monkeypatch):
+        input_data = json.dumps({"tool_name": "Read", "tool_input": {}})
+        monkeypatch.setattr("sys.stdin", io.StringIO(input_data))
+        loaded = []
+        monkeypatch.setattr(
+            "damage_control.load_config",
+            lambda sections=None: loaded.append(sections) or {},
+        )
+        with pytest.raises(SystemExit):
+            main()
+        assert loaded == [("zeroAccessPaths",)]
+
+    def test_invalid_json(self, monkeypatch, capsys):
+        monkeypatch.setattr("sys.stdin", io.StringIO("not json"))
+        monkeypatch.setattr("damage_control.load_config", lambda sections=None: {})
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+        assert exc_info.value.code == 1
+        captured = capsys.readouterr()
+        assert "Error" in captured.err
+
+    def test_empty_stdin(self, monkeypatch):
+        monkeypatch.setattr("sys.stdin", io.StringIO(""))
+        monkeypatch.setattr("damage_control.load_config", lambda sections=None: {})
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+        assert exc_info.value.code == 1
@@ -0,0 +1,76 @@
+"""The optimized engine decides like reference.py (see equivalence.py).
+
+Select these alone with `pytest -m equivalence`; `uv run equivalence.py`
+fuzzes for longer.
+"""
+
+import os
+from pathlib import Path
+
+import equivalence
+import pytest
+from equivalence import check, first_divergence, fuzzer, minimize
+from policy_diff import corpus_inputs, transcript_inputs
+
+from tests.conftest import dc
+
+pytestmark = pytest.mark.equivalence
+
+CHUNKS = 8
+FUZZ_BATCHES = 4
+
+
+@pytest.fixture(scope="module")
+def config():
+    return dc.load_config()
+
+
+@pytest.mark.parametrize("chunk", range(CHUNKS))
+def test_corpus(config, chunk):
+    inputs = list(dict.fromkeys(corpus_inputs()))[chunk::CHUNKS]
+    _, found = first_divergence(iter(inputs), config)
+    assert found is None, found
+
+
+@pytest.mark.parametrize("batch", range(FUZZ_BATCHES))
+def test_fuzz(config, batch):
+    inputs = fuzzer(0, batch, config).inputs(equivalence.BATCH)
+    _, found = first_divergence(inputs, config)
+    assert found is None, found
+
+
+@pytest.mark.skipif(
+    not os.environ.get("DAMAGE_CONTROL_TRANSCRIPTS"),
+    reason="set DAMAGE_CONTROL_TRANSCRIPTS to a transcript directory",
+)
+def test_transcripts(config):
+    directory = Path(os.environ["DAMAGE_CONTROL_TRANSCRIPTS"])
+    inputs = (item for item in dict.fromkeys(transcript_inputs(directory)) if item[0])
+    _, found = first_divergence(inputs, config)
+    assert found is None, found
+
+
+def test_divergence_minimized(config, monkeypatch):
+    """A planted bug (pushes allowed) is reported with a short reproducer."""
+    bash = dc.EVALUATORS["Bash"]
+
+    def buggy(tool_input, config):
+        if "push" in tool_input["command"]:
+            return dc.Decision("allow")
+        return bash(tool_input, config)
+
+    monkeypatch.setitem(dc.EVALUATORS, "Bash", buggy)
+    original = "cd repo && make test && git push --force origin main"
+    found = check("Bash", original, config)
+    assert found is not None
+    smallest = minimize(found, config)
+    assert "push" in smallest.value
+    assert len(smallest.value) < len("git push --force")
+    assert check("Bash", smallest.value, config) is not None
+    report = smallest.report(original)
+    assert f"reproduce: assert_equivalent('Bash', {smallest.value!r})" in report
+
+
+def test_same_error_is_agreement(config):
+    """An input both engines fail on the same way is not a divergence."""
+    assert check("Read", "~no-such-user-here/.env", config) is None
@@ -2,6 +2,8 @@
 
 import json
 
+import pytest
+
 from tests.conftest import assert_allows, assert_asks, run_hook
 
 # =============================================================================
@@ -12,6 +14,7 @@ from tests.conftest import assert_allows, assert_asks, run_hook
 class TestBlockRm:
     """Tests for rm with recursive/force flags."""
 
+    @pytest.mark.e2e
     def test_block_rm_rf(self):
         assert_asks('Bash', {'command': 'rm -rf /'})
 
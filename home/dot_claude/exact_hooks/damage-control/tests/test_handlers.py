@@ -1,15 +1,14 @@
 """Tests for Read, Edit, Write, Grep handlers and the dispatcher."""
 
-import subprocess
-
 import pytest
 
-from tests.conftest import HOME, SCRIPT, assert_asks, dc, run_hook
+from tests.conftest import HOME, assert_asks, dc, run_hook, run_payload
 
 
 class TestReadHandler:
     # --- Zero-access asks ---
 
+    @pytest.mark.e2e
     def test_block_ssh_key(self):
         reason = assert_asks("Read", {"file_path": f"{HOME}/.ssh/id_rsa"})
         assert "zero-access" in reason.lower()
@@ -276,6 +275,7 @@ class TestWriteHandler:
 
 
 class TestDispatcher:
+    @pytest.mark.e2e
     def test_unknown_tool_allowed(self):
         code, stdout, _ = run_hook("WebSearch", {"query": "test"})
         assert code == 0
@@ -285,26 +285,15 @@ class TestDispatcher:
         code, _, _ = run_hook("", {})
         assert code == 0
 
+    @pytest.mark.e2e
     def test_invalid_json(self):
-        result = subprocess.run(
-            ["uv", "run", SCRIPT],
-            input="not json",
-            capture_output=True,
-            text=True,
-            timeout=15,
-        )
-        assert result.returncode == 1
-        assert "Error" in result.stderr
+        code, _, stderr = run_payload("not json")
+        assert code == 1
+        assert "Error" in stderr
 
     def test_empty_stdin(self):
-        result = subprocess.run(
-            ["uv", "run", SCRIPT],
-            input="",
-            capture_output=True,
-            text=True,
-            timeout=15,
-        )
-        assert result.returncode == 1
+        code, _, _ = run_payload("")
+        assert code == 1
 
     def test_context_truncation(self, capsys):
         """The _block helper truncates long context in stderr output.
@@ -0,0 +1,135 @@
+"""Import-time budget: what loading damage_control and a warm call import.
+
+Every hook call starts a fresh interpreter, so each module imported at the
+top of damage_control.py is paid for on every tool call. A module that only
+some code paths need is imported inside them instead; these tests fail when
+a new top-level import (or one on the warm path) slips in.
+
+The time budget is wall-clock, so it is marked `import_time` and CI runs it
+on its own, after the parallel run (`pytest -m import_time`).
+"""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from tests.conftest import LAUNCHER, SCRIPT
+
+# Modules (by top-level name) `import damage_control` may load beyond
+# interpreter startup: its own imports and what they pull in. Underscore-
+# prefixed C accelerators are not listed. A Python version whose stdlib
+# pulls in more fails here and has to be added.
+ALLOWED = {
+    "damage_control",
+    # direct imports
+    "contextlib",
+    "functools",
+    "io",
+    "json",
+    "os",
+    "pathlib",
+    "re",
+    "sys",
+    "time",
+    "typing",
+    # pulled in by those
+    "collections",
+    "copyreg",
+    "enum",
+    "errno",
+    "fnmatch",
+    "glob",
+    "grp",
+    "heapq",
+    "ipaddress",
+    "itertools",
+    "keyword",
+    "math",
+    "nt",
+    "ntpath",
+    "operator",
+    "pwd",
+    "reprlib",
+    "sre_compile",
+    "sre_constants",
+    "sre_parse",
+    "types",
+    "urllib",
+    "warnings",
+}
+
+# Microseconds `-X importtime` may report for damage_control, from cached
+# bytecode, with no other tests competing for the CPU. Generous for slow CI
+# runners: about a third of this on a laptop.
+BUDGET_US = 75_000
+
+# Modules a warm hook call must not need: each costs milliseconds.
+HEAVY = {"yaml", "tempfile", "shutil", "random", "subprocess", "socket", "threading"}
+
+
+def _env(tmp_path: Path) -> dict:
+    """Hook environment: bytecode cached (as installed) and caches in *tmp_path*."""
+    env = {**os.environ, "TMPDIR": str(tmp_path), "XDG_CACHE_HOME": str(tmp_path)}
+    env["PYTHONPYCACHEPREFIX"] = str(tmp_path / "pycache")
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    return env
+
+
+def _imports(args: list, env: dict, payload: str = "") -> dict:
+    """{module: cumulative microseconds} from `python -X importtime *args*`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        check=False,
+        input=payload,
+        capture_output=True,
+        text=True,
+        cwd=Path(SCRIPT).parent,
+        env=env,
+        timeout=30,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_import_loads_only_allowed_modules(tmp_path):
+    startup = _imports(["-c", "pass"], _env(tmp_path))
+    loaded = _imports(["-c", "import damage_control"], _env(tmp_path))
+    added = {name.split(".")[0] for name in loaded if name not in startup}
+    unexpected = {name for name in added - ALLOWED if not name.startswith("_")}
+    assert not unexpected, f"new top-level imports: {sorted(unexpected)}"
+
+
+@pytest.mark.import_time
+def test_import_within_budget(tmp_path):
+    _imports(["-c", "import damage_control"], _env(tmp_path))  # writes the .pyc
+    # The fastest of a few runs: the rest of the machine competes for the CPU.
+    fastest = min(
+        _imports(["-c", "import damage_control"], _env(tmp_path))["damage_control"]
+        for _ in range(5)
+    )
+    assert fastest <= BUDGET_US
+
+
+def test_warm_calls_skip_heavy_modules(tmp_path):
+    env = _env(tmp_path)
+    startup = _imports(["-c", "pass"], env)
+    cold = {"tool_name": "Bash", "tool_input": {"command": "ls"}}
+    _imports([LAUNCHER], env, json.dumps(cold))  # builds the cache
+    for payload in [
+        {"tool_name": "Bash", "tool_input": {"command": "git status"}},
+        {"tool_name": "Read", "tool_input": {"file_path": "/tmp/notes.txt"}},
+    ]:
+        for call in ("policy", "memo"):  # the second call repeats the first
+            loaded = _imports([LAUNCHER], env, json.dumps(payload))
+            added = {name.split(".")[0] for name in loaded if name not in startup}
+            heavy = sorted(HEAVY & added)
+            assert not heavy, f"warm {payload['tool_name']} ({call}) imports {heavy}"
@@ -0,0 +1,77 @@
+"""launcher.py decides like damage_control.py and runs it from cached bytecode."""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from tests.conftest import LAUNCHER, SCRIPT, fake_uv, private_caches
+
+
+@pytest.fixture(autouse=True)
+def _private_caches(tmp_path, monkeypatch):
+    private_caches(monkeypatch, tmp_path)
+
+
+def _run(script: str, payload: dict, env: dict) -> tuple:
+    result = subprocess.run(
+        [sys.executable, script],
+        check=False,
+        input=json.dumps(payload),
+        capture_output=True,
+        text=True,
+        env=env,
+        timeout=30,
+    )
+    return result.returncode, result.stdout, result.stderr
+
+
+def test_same_decisions_as_script(tmp_path):
+    env = {**os.environ, "PYTHONPYCACHEPREFIX": str(tmp_path / "pycache")}
+    for command in ["git status", "rm -rf /", "git push --force origin main"]:
+        payload = {"tool_name": "Bash", "tool_input": {"command": command}}
+        assert _run(LAUNCHER, payload, env) == _run(SCRIPT, payload, env), command
+
+
+def test_module_bytecode_is_cached(tmp_path):
+    env = {**os.environ, "PYTHONPYCACHEPREFIX": str(tmp_path)}
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    payload = {"tool_name": "Read", "tool_input": {"file_path": "/tmp/x"}}
+    _run(LAUNCHER, payload, env)
+    cached = {p.name.split(".")[0] for p in tmp_path.rglob("*.pyc")}
+    assert "damage_control" in cached
+    assert "launcher" not in cached  # the few lines left compile per call
+
+
+def _run_without_yaml(payload: dict, env: dict) -> tuple:
+    """Run launcher.py with site-packages (and so PyYAML) out of reach."""
+    result = subprocess.run(
+        [sys.executable, "-S", LAUNCHER],
+        check=False,
+        input=json.dumps(payload),
+        capture_output=True,
+        text=True,
+        env=env,
+        timeout=30,
+    )
+    return result.returncode, result.stdout, result.stderr
+
+
+def test_warm_cache_runs_without_uv(tmp_path):
+    env = dict(os.environ)
+    env["PATH"] = f"{fake_uv(tmp_path)}:{env['PATH']}"
+    payload = {"tool_name": "Bash", "tool_input": {"command": "rm -rf /"}}
+    expected = _run(SCRIPT, payload, env)  # builds the cache in tmp_path
+    assert _run_without_yaml(payload, env) == expected
+    assert not (tmp_path / "uv.log").exists()
+
+
+def test_cold_cache_reexecs_through_uv(tmp_path):
+    env = dict(os.environ)
+    env["PATH"] = f"{fake_uv(tmp_path)}:{env['PATH']}"
+    payload = {"tool_name": "Bash", "tool_input": {"command": "rm -rf /"}}
+    decision = _run_without_yaml(payload, env)
+    assert decision == _run(SCRIPT, payload, env)
+    assert (tmp_path / "uv.log").read_text() == f"run --script {LAUNCHER}\n"
@@ -0,0 +1,114 @@
+"""lint.py: broken, duplicate, subsumed and shadowed pattern entries."""
+
+import lint
+import pytest
+import reference
+import yaml
+
+from tests.conftest import dc
+
+GIT = {
+    "shorthands": {"push": r"push\b"},
+    "bashToolPatterns": [
+        {"pattern": r"\bgit{flags}push\b", "reason": "pushing"},
+        {"pattern": r"\bgit\s+(reset", "reason": "broken"},
+        {"pattern": r"\bgit{flags}{push}", "reason": "pushing again"},
+        {"pattern": r"\bgit{flags}push\s+--force\b", "reason": "force push"},
+    ],
+}
+PATHS = {
+    "bashToolPatterns": [{"pattern": r"\bgit{flags}push\b", "reason": "pushing"}],
+    "zeroAccessPaths": ["~/.aws/", ".secret", "~/.aws/credentials", ".secrets"],
+    "readOnlyPaths": ["~/.aws/config", "/etc/", "*.PEM", ".secret/x"],
+    "noDeletePaths": ["/etc/hosts", "*.pem", "~/.aws", "build.gradle"],
+}
+
+
+@pytest.fixture
+def patterns(tmp_path, monkeypatch):
+    monkeypatch.setattr("tempfile.tempdir", str(tmp_path))
+    directory = tmp_path / "patterns"
+    directory.mkdir()
+    (directory / "git.yaml").write_text(yaml.safe_dump(GIT))
+    (directory / "paths.yaml").write_text(yaml.safe_dump(PATHS))
+    return directory
+
+
+def _found(findings, kind):
+    return {finding.rule: finding for finding in findings if finding.kind == kind}
+
+
+def test_broken_regex(patterns):
+    found = _found(lint.lint(patterns), "broken")
+    assert list(found) == ["bashToolPatterns[1]"]
+    assert found["bashToolPatterns[1]"].file == "patterns/git.yaml"
+    assert "does not compile" in found["bashToolPatterns[1]"].message
+
+
+def test_duplicates_across_files(patterns):
+    found = _found(lint.lint(patterns), "duplicate")
+    assert set(found) == {
+        "bashToolPatterns[2]",
+        "bashToolPatterns[4]",
+        "noDeletePaths[1]",  # *.pem is the read-only *.PEM: globs ignore case
+    }
+    exact = found["bashToolPatterns[4]"]  # the same mapping in paths.yaml
+    assert exact.file == "patterns/paths.yaml"
+    assert exact.message.startswith("repeats bashToolPatterns[0]")
+    assert "(patterns/git.yaml)" in exact.message
+    assert "expands like" in found["bashToolPatterns[2]"].message
+
+
+def test_subsumed_paths(patterns):
+    found = _found(lint.lint(patterns), "subsumed")
+    assert set(found) == {
+        "zeroAccessPaths[2]",  # ~/.aws/credentials, a prefix-match of ~/.aws/
+        "zeroAccessPaths[3]",  # .secrets, a prefix-match of .secret
+        "readOnlyPaths[0]",  # ~/.aws/config, a prefix-match of the zero-access ~/.aws/
+        "noDeletePaths[0]",  # /etc/hosts, a prefix-match of the read-only /etc/
+    }
+    # A relative zero-access entry only matches at a path boundary, which
+    # a read-only match (`>.secret/x`) does not promise.
+    assert "readOnlyPaths[3]" not in found
+    # ~/.aws also matches ~/.awsx, which ~/.aws/ does not.
+    assert "noDeletePaths[2]" not in found
+    message = found["zeroAccessPaths[3]"].message
+    assert message.startswith("'.secrets' is a prefix-match of zeroAccessPaths[1]")
+
+
+def test_shadowed_on_commands(patterns):
+    commands = ["git push --force origin main", "git push", "ls"]
+    found = _found(lint.lint(patterns, commands), "shadowed")
+    assert list(found) == ["bashToolPatterns[3]"]
+    assert (
+        "matched first by bashToolPatterns[0] (1)"
+        in found["bashToolPatterns[3]"].message
+    )
+    # Without a command to go on, nothing is shadowed.
+    assert not _found(lint.lint(patterns), "shadowed")
+
+
+def test_compiled_rules_leave_out_unreachable(patterns):
+    config = dc.load_patterns_dir(patterns)
+    ir = config[dc._IR_KEY]
+    assert [record[0] for record in ir["bash"]] == [0, 3]
+    assert ir["zeroAccessPaths"][2] is None
+    assert ir["mentions"]["noDeletePaths"][0] == []
+    inputs = [
+        ("Bash", "git push origin main"),
+        ("Bash", "cat ~/.aws/credentials"),
+        ("Bash", "cat .secrets/token"),
+        ("Bash", "echo x > ~/.aws/config"),
+        ("Bash", "rm /etc/hosts"),
+        ("Bash", "rm key.pem"),
+        ("Bash", "rm ~/.awsx"),
+        ("Bash", "echo >.secret/x"),
+        ("Edit", "~/.aws/config"),
+        ("Write", "/etc/hosts"),
+        ("Read", "~/.aws/credentials"),
+        ("Grep", ".secrets"),
+    ]
+    for tool_name, value in inputs:
+        field = dc._DECISION_FIELDS[tool_name]
+        payload = {"tool_name": tool_name, "tool_input": {field: value}}
+        assert dc.evaluate(payload, config) == reference.evaluate(payload, config)
@@ -0,0 +1,121 @@
+"""policy_diff.py: the inputs two patterns directories decide differently."""
+
+import policy_diff
+import pytest
+import yaml
+
+BASE = {
+    "bashToolPatterns": [
+        {"pattern": r"\bgit{flags}push\b", "reason": "pushing"},
+        {"pattern": r"\brm\s+-rf\b", "reason": "recursive delete"},
+        {"pattern": r"\bcurl\b", "reason": "network"},
+    ],
+    "zeroAccessPaths": ["~/.ssh/"],
+    "readOnlyPaths": ["/etc/"],
+}
+INPUTS = [
+    ("Bash", "git push origin main"),
+    ("Bash", "git -C repo push"),
+    ("Bash", "rm -rf build"),
+    ("Bash", "curl https://example.com"),
+    ("Bash", "ls -la"),
+    ("Bash", "cat ~/.ssh/config"),
+    ("Bash", "sed -i s/a/b/ /etc/hosts"),
+    ("Edit", "/etc/hosts"),
+    ("Read", "~/.ssh/id_rsa"),
+    ("Grep", "/srv"),
+]
+
+
+def _write(directory, config):
+    directory.mkdir()
+    (directory / "rules.yaml").write_text(yaml.safe_dump(config))
+    return directory
+
+
+def _edited(**changes):
+    config = {key: list(value) for key, value in BASE.items()}
+    config.update(changes)
+    return config
+
+
+@pytest.fixture(autouse=True)
+def _pattern_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr("tempfile.tempdir", str(tmp_path))
+
+
+def _brute_force(base_dir, head_dir):
+    policy_diff._init_worker(base_dir, head_dir)
+    return policy_diff._diff_chunk(INPUTS)
+
+
+EDITS = {
+    "block flag": _edited(
+        bashToolPatterns=[
+            {"pattern": r"\bgit{flags}push\b", "reason": "pushing", "block": True},
+            *BASE["bashToolPatterns"][1:],
+        ]
+    ),
+    "added rule": _edited(
+        bashToolPatterns=[
+            {"pattern": r"\bls\b", "reason": "listing"},
+            *BASE["bashToolPatterns"],
+        ]
+    ),
+    "removed rule": _edited(bashToolPatterns=BASE["bashToolPatterns"][:2]),
+    "reordered": _edited(bashToolPatterns=BASE["bashToolPatterns"][::-1]),
+    "path added": _edited(readOnlyPaths=["/etc/", "/srv"]),
+    "shorthand": _edited(shorthands={"flags": r"\s+"}),
+}
+
+
+@pytest.mark.parametrize("edit", EDITS)
+def test_pruning_misses_no_change(tmp_path, edit):
+    base_dir = _write(tmp_path / "base", BASE)
+    head_dir = _write(tmp_path / "head", EDITS[edit])
+    found, _ = policy_diff.diff(INPUTS, base_dir, head_dir, jobs=1)
+    assert found == _brute_force(base_dir, head_dir)
+
+
+def test_reports_block_flag_change(tmp_path):
+    base_dir = _write(tmp_path / "base", BASE)
+    head_dir = _write(tmp_path / "head", EDITS["block flag"])
+    found, evaluated = policy_diff.diff(INPUTS, base_dir, head_dir, jobs=1)
+    changed = [(tool, value, old.action, new.action) for tool, value, old, new in found]
+    assert changed == [
+        ("Bash", "git push origin main", "ask", "block"),
+        ("Bash", "git -C repo push", "ask", "block"),
+    ]
+    assert evaluated == 2  # only the commands the edited rule matches
+    text = policy_diff.report(found)
+    assert "head bashToolPatterns[0]: pushing" in text
+    assert "ask -> block  Bash  'git push origin main'" in text
+
+
+def test_unchanged_keys_skip_tools(tmp_path):
+    base_dir = _write(tmp_path / "base", BASE)
+    head_dir = _write(tmp_path / "head", EDITS["added rule"])
+    _, evaluated = policy_diff.diff(INPUTS, base_dir, head_dir, jobs=1)
+    assert evaluated == 1  # `ls -la`; no path list changed
+
+
+def test_changed_rules_none_when_reordered():
+    head = EDITS["reordered"]
+    assert policy_diff._changed_rules(BASE, head) is None
+    added = EDITS["added rule"]
+    assert policy_diff._changed_rules(BASE, added) == [
+        {"pattern": r"\bls\b", "reason": "listing"}
+    ]
+
+
+def test_checkout_extracts_patterns(tmp_path):
+    patterns = policy_diff.checkout("HEAD", tmp_path)
+    assert (patterns / "git.yaml").is_file()
+
+
+def test_remove_cache_leaves_no_files(tmp_path):
+    base_dir = _write(tmp_path / "base", BASE)
+    policy_diff.diff(INPUTS, base_dir, base_dir, jobs=1)
+    assert list(tmp_path.glob("damage-control-*"))
+    policy_diff._remove_cache(base_dir)
+    assert not list(tmp_path.glob("damage-control-*"))
@@ -0,0 +1,104 @@
+"""replay.py: recorded tool calls re-evaluated against a patterns directory."""
+
+import json
+
+import pytest
+import replay
+
+PATTERNS = """\
+bashToolPatterns:
+  - pattern: '\\bgit\\s+push\\b'
+    reason: pushing
+  - pattern: '\\brm\\s+-rf\\b'
+    reason: recursive delete
+    block: true
+zeroAccessPaths:
+  - ~/.ssh/
+"""
+
+
+def _assistant(*blocks: dict) -> str:
+    return json.dumps({"type": "assistant", "message": {"content": list(blocks)}})
+
+
+def _tool_use(name: str, tool_input: dict) -> dict:
+    return {"type": "tool_use", "id": "toolu_1", "name": name, "input": tool_input}
+
+
+@pytest.fixture
+def patterns(tmp_path, monkeypatch):
+    monkeypatch.setattr("tempfile.tempdir", str(tmp_path))  # pattern cache
+    directory = tmp_path / "patterns"
+    directory.mkdir()
+    (directory / "rules.yaml").write_text(PATTERNS)
+    return directory
+
+
+@pytest.fixture
+def transcripts(tmp_path):
+    project = tmp_path / "projects" / "-home-me-repo"
+    (project / "subagents").mkdir(parents=True)
+    (project / "session-a.jsonl").write_text(
+        "\n".join(
+            [
+                json.dumps({"type": "user", "message": {"content": "push it"}}),
+                _assistant(
+                    {"type": "text", "text": "pushing"},
+                    _tool_use("Bash", {"command": "git push origin main"}),
+                ),
+                _assistant(_tool_use("Bash", {"command": "ls"})),
+                '{"type": "assistant", "message": {"content": [{"type": "tool_use"',
+            ]
+        )
+        + "\n"
+    )
+    (project / "subagents" / "agent-b.jsonl").write_text(
+        "\n".join(
+            [
+                _assistant(
+                    _tool_use("Read", {"file_path": "~/.ssh/id_rsa"}),
+                    _tool_use("Bash", {"command": "rm -rf build"}),
+                ),
+                _assistant(_tool_use("WebFetch", {"url": "https://example.com"})),
+            ]
+        )
+        + "\n"
+    )
+    return tmp_path / "projects"
+
+
+def test_tool_calls_takes_decided_tools(transcripts):
+    calls = list(replay.tool_calls(transcripts / "-home-me-repo" / "session-a.jsonl"))
+    assert calls == [
+        ("Bash", {"command": "git push origin main"}),
+        ("Bash", {"command": "ls"}),
+        None,  # the truncated last line
+    ]
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_replay_counts_per_rule(transcripts, patterns, jobs):
+    tally = replay.replay(transcripts, patterns, jobs=jobs)
+    assert tally.calls == {"allow": 1, "ask": 2, "block": 1}
+    assert tally.rules == {
+        ("bashToolPatterns[0]", "ask"): 1,
+        ("bashToolPatterns[1]", "block"): 1,
+        ("zeroAccessPaths[0]", "ask"): 1,
+    }
+    assert tally.skipped == 1
+    assert len(tally.slowest) == 4
+
+
+def test_slowest_kept_to_top(transcripts, patterns):
+    tally = replay.replay(transcripts, patterns, jobs=1, top=2)
+    assert len(tally.slowest) == 2
+    assert min(tally.slowest) == tally.slowest[0]
+
+
+def test_report_names_rules(transcripts, patterns):
+    tally = replay.replay(transcripts, patterns, jobs=1)
+    text = replay.report(tally, replay.dc.load_patterns_dir(patterns))
+    assert text.startswith("4 tool calls")
+    assert "bashToolPatterns[0]  pushing" in text
+    assert "zeroAccessPaths[0]  ~/.ssh/" in text
+    assert "'rm -rf build'" in text